@@ -1,12 +1,12 @@
 // src/App.jsx
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import {
-  getProjects,getTasksForProject,
+  getTasksForProject,
   createProject,createTask,
   updateTask,deleteTask,
   getBOMForProject,createBOMItem,
   deleteBOMItem,importBOMFromExcel,
-  login,logout,getCurrentUser
+  login,logout,getDashboardBootstrap
 } from './api';
 import './App.css';
 
@@ -24,6 +24,10 @@ function App() {
   const [tasks, setTasks] = useState([]);
   const [tasksLoading, setTasksLoading] = useState(false);
   const [tasksError, setTasksError] = useState(null);
+  const [overview, setOverview] = useState(null);
+  // Project whose tasks + overview came with the bootstrap response, so
+  // the selection effect below only has to fetch its BOM
+  const bootstrappedProjectRef = useRef(null);
 
   const [bomItems, setBomItems] = useState([]);
   const [bomLoading, setBomLoading] = useState(false);
@@ -34,73 +38,116 @@ function App() {
     setBomItems((prev) => [...prev, item]); // append at bottom
   };
 
-  // 1) Check auth once on mount
-  useEffect(() => {
-    async function checkAuth() {
-      try {
-        const me = await getCurrentUser();
-        if (me && me.is_authenticated) {
-          setCurrentUser(me);
-        } else {
-          setCurrentUser(null);
-        }
-      } finally {
-        setCheckingAuth(false);
-      }
+  // Projects, active project, its tasks and overview from one bootstrap response
+  function applyBootstrap(data) {
+    const projectList = data?.projects || [];
+    setProjects(projectList);
+    const active = projectList.find((p) => p.id === data?.active_project);
+    if (!active) return;
+    bootstrappedProjectRef.current = active.id;
+    setSelectedProjectId(active.id);
+    setSelectedProjectName(active.name);
+    setTasks(data.tasks?.results || []);
+    setOverview(data.overview || null);
+    setTasksError(null);
+  }
+
+  // Re-read only the overview counters after a task write
+  async function refreshOverview() {
+    if (!selectedProjectId) return;
+    try {
+      const data = await getDashboardBootstrap({
+        projectId: selectedProjectId,
+        sections: ['overview'],
+      });
+      setOverview(data?.overview || null);
+    } catch (err) {
+      console.error('Failed to refresh overview:', err);
     }
-    checkAuth();
-  }, []);
+  }
 
-  // 2) Load projects on first render (after component mounts)
+  // 1) Check auth, load projects and the first project's tasks + overview
+  //    once on mount (single bootstrap request)
   useEffect(() => {
     async function load() {
       setProjectsLoading(true);
       setProjectsError(null);
       try {
-        const data = await getProjects();
-        setProjects(data);
+        const data = await getDashboardBootstrap();
+        if (data?.user?.is_authenticated) {
+          setCurrentUser(data.user);
+          applyBootstrap(data);
+        } else {
+          setCurrentUser(null);
+        }
       } catch (err) {
         console.error(err);
+        setCurrentUser(null);
         setProjectsError('Failed to load projects');
       } finally {
+        setCheckingAuth(false);
         setProjectsLoading(false);
       }
     }
     load();
   }, []);
 
-  // 3) Load tasks + BOM whenever selected project changes
+  // 3) Load tasks + overview (bootstrap sections) and BOM whenever the
+  //    selected project changes; the bootstrapped project only needs its BOM
   useEffect(() => {
     if (!selectedProjectId) return;
+    const bootstrapped = bootstrappedProjectRef.current === selectedProjectId;
+    bootstrappedProjectRef.current = null;
 
-    async function loadTasksAndBOM() {
-      // ---- Tasks ----
+    async function loadTasks() {
+      if (bootstrapped) return;
       setTasksLoading(true);
       setTasksError(null);
+      setOverview(null);
+      try {
+        const data = await getDashboardBootstrap({
+          projectId: selectedProjectId,
+          sections: ['overview', 'tasks'],
+        });
+        setTasks(data?.tasks?.results || []);
+        setOverview(data?.overview || null);
+      } catch (err) {
+        console.error(err);
+        setTasksError('Failed to load tasks');
+      } finally {
+        setTasksLoading(false);
+      }
+    }
 
-      // ---- BOM ----
+    async function loadBOM() {
       setBomLoading(true);
       setBomError(null);
-
       try {
-        const tasksData = await getTasksForProject(selectedProjectId);
-        setTasks(tasksData);
-
-        const bomData = await getBOMForProject(selectedProjectId);
-        setBomItems(bomData);
+        setBomItems(await getBOMForProject(selectedProjectId));
       } catch (err) {
         console.error(err);
-        setTasksError('Failed to load tasks');
         setBomError('Failed to load BOM');
       } finally {
-        setTasksLoading(false);
         setBomLoading(false);
       }
     }
 
-    loadTasksAndBOM();
+    // In parallel instead of one after the other
+    loadTasks();
+    loadBOM();
   }, [selectedProjectId]);
 
+  async function handleLoggedIn(user) {
+    setCurrentUser(user);
+    try {
+      const data = await getDashboardBootstrap({ sections: ['projects', 'overview', 'tasks'] });
+      applyBootstrap(data);
+    } catch (err) {
+      console.error(err);
+      setProjectsError('Failed to load projects');
+    }
+  }
+
   async function handleLogout() {
     try {
       await logout();
@@ -111,6 +158,7 @@ function App() {
       setSelectedProjectId(null);
       setSelectedProjectName('');
       setTasks([]);
+      setOverview(null);
       setBomItems([]);
     }
   }
@@ -128,6 +176,7 @@ function App() {
 
   const handleTaskCreated = (task) => {
     setTasks((prev) => [task, ...prev]); // newest at top
+    refreshOverview();
   };
 
   async function handleDeleteTask(taskId) {
@@ -138,6 +187,7 @@ function App() {
 
     try {
       await deleteTask(taskId);
+      refreshOverview();
     } catch (err) {
       console.error('Failed to delete task:', err);
       alert('Failed to delete task on server. Reloading tasks.');
@@ -165,6 +215,7 @@ function App() {
           prev.map((t) => (t.id === updated.id ? updated : t))
         );
       }
+      if ('status' in patchData || 'priority' in patchData) refreshOverview();
     } catch (err) {
       console.error('Failed to update task:', err);
       alert('Failed to update task on server. Please check login and try again.');
@@ -215,7 +266,7 @@ function App() {
   }
 
   if (!currentUser) {
-    return <LoginScreen onLoggedIn={setCurrentUser} />;
+    return <LoginScreen onLoggedIn={handleLoggedIn} />;
   }
 
   // 5) Main UI
@@ -266,6 +317,12 @@ function App() {
               ? `Tasks for: ${selectedProjectName}`
               : 'Select a project to view tasks'}
           </h2>
+          {selectedProjectId && overview && (
+            <div className="info" style={{ marginBottom: '8px' }}>
+              {overview.total_tasks} tasks · {overview.by_status?.DONE || 0} done
+              {overview.archived_tasks ? ` (${overview.archived_tasks} archived)` : ''}
+            </div>
+          )}
 
           {selectedProjectId && (
             <div style={{ marginBottom: '16px' }}>
@@ -3,18 +3,33 @@
 // Generic helper to call JSON APIs with strong logging
 // src/api.js
 
+// ETag / Last-Modified of GET responses we already have, keyed by URL.
+// Sent back as If-None-Match / If-Modified-Since; on 304 we reuse the body.
+const validatorCache = new Map();
+
 // Generic helper to call JSON APIs with strong logging
 async function fetchJSON(url, options = {}) {
+  const method = (options.method || "GET").toUpperCase();
+  const cached = method === "GET" ? validatorCache.get(url) : undefined;
+  const conditionalHeaders = {};
+  if (cached?.etag) conditionalHeaders["If-None-Match"] = cached.etag;
+  if (cached?.lastModified) conditionalHeaders["If-Modified-Since"] = cached.lastModified;
+
   const response = await fetch(url, {
     credentials: "include",           // send Django session cookie
     ...options,                       // method, body, etc.
     headers: {
       Accept: "application/json",
       "Content-Type": "application/json",
+      ...conditionalHeaders,
       ...(options.headers || {}),
     },
   });
 
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+
   // Read raw text first for easier debugging
   const text = await response.text();
 
@@ -29,7 +44,13 @@ async function fetchJSON(url, options = {}) {
   }
 
   try {
-    return JSON.parse(text);
+    const data = JSON.parse(text);
+    const etag = response.headers.get("ETag");
+    const lastModified = response.headers.get("Last-Modified");
+    if (method === "GET" && (etag || lastModified)) {
+      validatorCache.set(url, { etag, lastModified, data });
+    }
+    return data;
   } catch (e) {
     console.error("JSON parse error for URL:", url);
     console.error("Raw response text:", text);
@@ -37,6 +58,19 @@ async function fetchJSON(url, options = {}) {
   }
 }
 
+// ---------- BOOTSTRAP ----------
+
+// GET /api/ver2/bootstrap/
+// One request for user + project list + overview + first task page.
+// Pass sections (e.g. ["tasks", "overview"]) to refresh only those parts.
+export async function getDashboardBootstrap({ projectId, sections } = {}) {
+  const params = new URLSearchParams();
+  if (projectId) params.set("project", projectId);
+  if (sections && sections.length) params.set("sections", sections.join(","));
+  const query = params.toString();
+  return fetchJSON(`/api/ver2/bootstrap/${query ? `?${query}` : ""}`);
+}
+
 // ---------- PROJECTS ----------
 
 // ---------- PROJECTS ----------
@@ -147,6 +181,38 @@ export async function getBOMForProject(projectId) {
   return Array.isArray(data) ? data : [];
 }
 
+// GET /api/ver2/projects/<project_id>/bom/?stream=1
+// Streams BOM rows as NDJSON; onRows(batch) is called as lines arrive
+// so large BOMs can start rendering before the download finishes.
+export async function streamBOMForProject(projectId, onRows) {
+  const response = await fetch(`/api/ver2/projects/${projectId}/bom/?stream=1`, {
+    credentials: "include",
+    headers: { Accept: "application/x-ndjson" },
+  });
+  if (!response.ok) {
+    const text = await response.text().catch(() => "");
+    console.error("BOM stream failed:", response.status, text);
+    throw new Error(`HTTP ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  let total = 0;
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffered.split("\n");
+    buffered = done ? "" : lines.pop();
+    const rows = lines.filter((line) => line).map((line) => JSON.parse(line));
+    if (rows.length) {
+      total += rows.length;
+      onRows(rows);
+    }
+    if (done) return total;
+  }
+}
+
 // POST /api/ver2/projects/<project_id>/bom/
 export async function createBOMItem(projectId, bomData) {
   const url = `/api/ver2/projects/${projectId}/bom/`;
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
 ]
@@ -44,19 +45,61 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
-    ]
+    ],
+    # orjson-backed JSON (falls back to the stock encoder if orjson is missing)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Rows fetched per server-side cursor round trip for NDJSON streaming
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", "2000"))
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Outermost after security: compresses what everything below produced
+    'core.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
+    'core.admission.AdmissionControlMiddleware',
+    'core.history.HistoryMiddleware',
 ]
 
+# Admission control (core.admission): concurrency limits per class of URL
+# names, per worker process. Busy -> 503, one client over per_user -> 429,
+# both at once (no queueing) with Retry-After. Endpoints not listed are
+# never limited; "methods" restricts a class to some HTTP methods.
+ADMISSION_CONTROL = {
+    "bom-io": {
+        "urls": ["project-bom-import", "project-bom-export", "project-task-import"],
+        "max_concurrent": 2, "per_user": 1, "retry_after": 10,
+    },
+    "analytics": {
+        "urls": ["project-bom-explode", "project-bom-what-if", "project-clone",
+                 "part-search", "bom-rollup"],
+        "max_concurrent": 4, "per_user": 2, "retry_after": 5,
+    },
+    "lists": {
+        "urls": ["task-list", "project_tasks", "project-bom", "task-due"],
+        # Reads only: creating a BOM row is cheap
+        "methods": ["GET", "HEAD"],
+        "max_concurrent": 8, "per_user": 4, "retry_after": 2,
+    },
+}
+if os.environ.get("ADMISSION_CONTROL", "1") != "1":
+    ADMISSION_CONTROL = {}
+
 ROOT_URLCONF = 'askflow.urls'
 
 TEMPLATES = [
@@ -92,6 +135,95 @@ DATABASES = {
     }
 }
 
+# Read replicas (core.db_router): DB_REPLICA_HOSTS="replica1,replica2:5433".
+# Safe API reads go to a replica unless it lags or the client just wrote.
+REPLICA_DATABASES = []
+for i, replica in enumerate(filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), 1):
+    host, _, port = replica.strip().partition(":")
+    DATABASES[f"replica{i}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(f"replica{i}")
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+# Only these apps' models are read from replicas (auth / sessions stay on the primary)
+REPLICA_APPS = {"core"}
+# After a write, the client reads from the primary for this long
+READ_YOUR_WRITES_SECONDS = int(os.environ.get("READ_YOUR_WRITES_SECONDS", "5"))
+# Replicas further behind than this are skipped until they catch up
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "2"))
+REPLICA_LAG_CHECK_SECONDS = float(os.environ.get("REPLICA_LAG_CHECK_SECONDS", "5"))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# locmem by default; point CACHE_BACKEND / CACHE_LOCATION at a shared
+# backend (file, redis, memcached) to share cached responses between workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "askflow"),
+    }
+}
+
+# Versioned response cache for project lists / overviews (core.response_cache)
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", "300"))
+# How long other requests wait for the one recomputing a missing entry
+RESPONSE_CACHE_LOCK_TIMEOUT = 5
+
+# Keep the precomputed BOM cost rollup table (core.models.BOMRollup) in sync
+BOM_ROLLUP_TABLE = os.environ.get("BOM_ROLLUP_TABLE", "1") == "1"
+
+# BOM what-if (core.whatif): per-process cache of BOM column arrays, in bytes
+WHATIF_CACHE_BYTES = int(os.environ.get("WHATIF_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# Project deletion (core.purge): rows deleted per transaction, and an
+# optional pause between batches to leave room for other writers
+PROJECT_DELETE_BATCH_SIZE = int(os.environ.get("PROJECT_DELETE_BATCH_SIZE", "2000"))
+PROJECT_DELETE_BATCH_PAUSE = float(os.environ.get("PROJECT_DELETE_BATCH_PAUSE", "0"))
+# Return 202 and purge in the background unless ?async=0 is passed
+PROJECT_DELETE_ASYNC = os.environ.get("PROJECT_DELETE_ASYNC", "0") == "1"
+
+# Paginated lists and admin changelists report the Postgres planner's row
+# estimate instead of an exact COUNT(*) above this many rows (0 = always exact)
+COUNT_ESTIMATE_THRESHOLD = int(os.environ.get("COUNT_ESTIMATE_THRESHOLD", "100000"))
+
+# Task rank keys (core.ranking) longer than this trigger a background
+# rebalance of the project's keys
+TASK_RANK_MAX_LENGTH = int(os.environ.get("TASK_RANK_MAX_LENGTH", "24"))
+
+# Task / BOM change history (core.history), written in the same transaction
+# as each change (history.buffered() batches them into one INSERT)
+CHANGE_HISTORY = os.environ.get("CHANGE_HISTORY", "1") == "1"
+
+# Response compression (core.compression), negotiated by Accept-Encoding.
+# Codecs in preference order; zstd / br are used only when the zstandard /
+# brotli packages are installed. Higher levels trade CPU for bandwidth.
+COMPRESSION = os.environ.get("COMPRESSION", "1") == "1"
+COMPRESSION_CODECS = os.environ.get("COMPRESSION_CODECS", "zstd,br,gzip").split(",")
+COMPRESSION_LEVELS = {
+    "gzip": int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6")),
+    "br": int(os.environ.get("COMPRESSION_BR_LEVEL", "4")),
+    "zstd": int(os.environ.get("COMPRESSION_ZSTD_LEVEL", "3")),
+}
+# Bodies smaller than this are sent as they are
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+
+# BOM import (core.bom_import): worker processes parsing sheets in
+# parallel (1 = parse in the request thread), rows per INSERT.
+# The pool is per server process: with gunicorn that is up to
+# workers x BOM_IMPORT_WORKERS parser processes, so keep it small
+BOM_IMPORT_WORKERS = int(os.environ.get("BOM_IMPORT_WORKERS", "2"))
+BOM_IMPORT_BATCH_SIZE = int(os.environ.get("BOM_IMPORT_BATCH_SIZE", "2000"))
+
+# Overdue / due-soon digests (core.digest, manage.py task_digest)
+TASK_DIGEST_DUE_WITHIN_DAYS = int(os.environ.get("TASK_DIGEST_DUE_WITHIN_DAYS", "3"))
+TASK_DIGEST_MAX_TASKS = int(os.environ.get("TASK_DIGEST_MAX_TASKS", "100"))
+TASK_DIGEST_RETENTION_DAYS = int(os.environ.get("TASK_DIGEST_RETENTION_DAYS", "30"))
 
 
 # Password validation
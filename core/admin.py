@@ -1,22 +1,175 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
-from .models import Project,Task,BOM
+from django.contrib.admin.views.main import ERROR_FLAG,PAGE_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db import transaction
+from .models import Project,Task,BOM,BOMRollup
+from .purge import CHILD_MODELS,delete_project
+from .counting import EstimatedCountPaginator
+from . import history
 # Register your models here.
 
+
+def project_autocomplete(model, admin_site, attrs=None):
+    """
+    The admin's select2 autocomplete widget for model.project, served by
+    ProjectAdmin.search_fields (the model admin needs "project" in
+    autocomplete_fields).
+    """
+    return AutocompleteSelect(model._meta.get_field("project"), admin_site, attrs=attrs)
+
+
+class ProjectFilter(admin.SimpleListFilter):
+    """
+    Filter by project picked in an autocomplete box, which queries projects
+    by name as the user types. The stock RelatedFieldListFilter loads and
+    lists every project on each changelist page.
+    """
+    title = "project"
+    parameter_name = "project"
+    template = "admin/core/project_filter.html"
+
+    def __init__(self, request, params, model, model_admin):
+        self.model = model
+        self.admin_site = model_admin.admin_site
+        super().__init__(request, params, model, model_admin)
+
+    def autocomplete(self):
+        """The rendered autocomplete <select>; picking a project submits the form."""
+        field = forms.ModelChoiceField(
+            Project.all_objects.all(), required=False,
+            widget=project_autocomplete(self.model, self.admin_site,
+                                        attrs={"onchange": "this.form.submit()"}),
+        )
+        value = self.value()
+        return field.widget.render(self.parameter_name, value if value and value.isdigit() else None)
+
+    def lookups(self, request, model_admin):
+        # Only the selected project, so the sidebar shows its name
+        value = self.value()
+        if value and value.isdigit():
+            name = Project.all_objects.filter(pk=value).values_list("name", flat=True).first()
+            if name is not None:
+                return [(value, name)]
+        return []
+
+    def has_output(self):
+        return True
+
+    def hidden_params(self):
+        """
+        (name, value) of the current query string, minus this filter and
+        the page, re-sent by the autocomplete form so other filters, search
+        and ordering are kept.
+        """
+        skip = (self.parameter_name, PAGE_VAR, ERROR_FLAG)
+        return [
+            (name, value)
+            for name, values in self.request.GET.lists() if name not in skip
+            for value in values
+        ]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(project_id=value)
+        return queryset
+
+
+class CategoryFilter(admin.SimpleListFilter):
+    """BOM categories from the small rollup table, not DISTINCT over all BOM rows."""
+    title = "category"
+    parameter_name = "category"
+
+    def lookups(self, request, model_admin):
+        rows = BOMRollup.objects if settings.BOM_ROLLUP_TABLE else BOM.objects
+        categories = rows.order_by("category").values_list("category", flat=True).distinct()
+        return [(category, category) for category in categories]
+
+    def queryset(self, request, queryset):
+        if self.value() is not None:
+            return queryset.filter(category=self.value())
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    # Planner estimates instead of COUNT(*) on big tables (core.counting),
+    # and no second unfiltered count for "N total"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ("project",)
+    autocomplete_fields = ("project",)
+
+    @property
+    def media(self):
+        # select2 and autocomplete.js for ProjectFilter's box
+        return super().media + project_autocomplete(self.model, self.admin_site).media
+
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
     list_display = ("id","name","created_at")
     search_fields= ("name",)
+
+    # Deletes go through core.purge: batched set-based deletes instead of
+    # the collector loading every task and BOM line
+
+    def delete_model(self, request, obj):
+        delete_project(obj)
+
+    def delete_queryset(self, request, queryset):
+        for project in queryset:
+            delete_project(project)
+
+    def get_deleted_objects(self, objs, request):
+        # The stock confirmation page collects (and lists) every child row;
+        # show per-model counts instead
+        projects = list(objs)
+        ids = [project.pk for project in projects]
+        model_count = {Project._meta.verbose_name_plural: len(projects)}
+        perms_needed = set()
+        for model in CHILD_MODELS:
+            count = model.objects.filter(project_id__in=ids).count()
+            if not count:
+                continue
+            model_count[model._meta.verbose_name_plural] = count
+            model_admin = self.admin_site._registry.get(model)
+            if model_admin and not model_admin.has_delete_permission(request):
+                perms_needed.add(model._meta.verbose_name)
+        return [str(project) for project in projects], model_count, perms_needed, []
+
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(LargeTableAdmin):
     list_display = ("id","title",
                     "project","status","due_date",
                     "created_at")
-    list_filter = ("status","project")
-    search_fields = ("project",)
+    list_filter = ("status",ProjectFilter)
+    # "project" as in the original; a bare ForeignKey has no icontains
+    # lookup (FieldError on every search), so search its name
+    search_fields = ("project__name",)
+
+    def delete_queryset(self, request, queryset):
+        # queryset.delete() skips Task.delete(); keep project versions and
+        # the change history current
+        rows = list(queryset.values_list("id", "project_id"))
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+            history.record_many([(project_id, history.TASK, pk, history.DELETE, {}, request.user.pk)
+                                 for pk, project_id in rows])
+        Project.touch(*{project_id for _, project_id in rows})
 
 @admin.register(BOM)
-class BOMAdmin(admin.ModelAdmin):
+class BOMAdmin(LargeTableAdmin):
     list_display = ("project", "category", "model", "qty", "price", "created_at")
-    list_filter = ("project", "category")
+    list_filter = (ProjectFilter, CategoryFilter)
     search_fields = ("model", "description")
 
+    def delete_queryset(self, request, queryset):
+        rows = list(queryset.values_list("id", "project_id", "category", "qty", "price"))
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+            BOMRollup.apply_deltas(BOMRollup.deltas(removed=[row[1:] for row in rows]))
+            history.record_many([(row[1], history.BOM, row[0], history.DELETE, {}, request.user.pk)
+                                 for row in rows])
+        Project.touch(*{row[1] for row in rows}, bom=True)
+
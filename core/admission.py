@@ -0,0 +1,159 @@
+"""
+Admission control for expensive endpoints.
+
+settings.ADMISSION_CONTROL groups URL names (core/urls.py) into classes,
+each with its own limits inside one worker process:
+
+    methods         optional: only these HTTP methods belong to the class
+    max_concurrent  requests of the class running at once
+    per_user        of those, at most this many for one client
+    retry_after     Retry-After sent with the rejection
+
+Requests are never queued: a client over per_user gets 429 and a full
+class gets 503, both at once, so a worker is never parked waiting for a
+slot and cheap endpoints (not in any class) keep their latency. Streaming
+responses hold their slot until the stream is closed.
+
+Clients are keyed by their session user, or else by client IP. Basic auth
+is only verified later, in the view, so its username is not trusted
+here: Basic auth clients are limited per IP.
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.http import JsonResponse
+
+ADMITTED = "admitted"
+USER_LIMIT = "user_limit"
+SATURATED = "saturated"
+
+
+class AdmissionGate:
+    def __init__(self, max_concurrent, per_user, retry_after):
+        self.max_concurrent = max_concurrent
+        self.per_user = per_user
+        self.retry_after = retry_after
+        self.active = 0
+        self.by_user = Counter()
+        self.lock = threading.Lock()
+
+    def acquire(self, user_key):
+        """Takes a slot without waiting; returns ADMITTED or why not."""
+        with self.lock:
+            if self.by_user[user_key] >= self.per_user:
+                return USER_LIMIT
+            if self.active >= self.max_concurrent:
+                return SATURATED
+            self.active += 1
+            self.by_user[user_key] += 1
+            return ADMITTED
+
+    def release(self, user_key):
+        with self.lock:
+            self.active -= 1
+            self.by_user[user_key] -= 1
+            if self.by_user[user_key] <= 0:
+                del self.by_user[user_key]
+
+
+_gates = {}
+_url_classes = {}
+_class_methods = {}
+
+
+def load_gates():
+    """(Re)build the gates from settings.ADMISSION_CONTROL."""
+    _gates.clear()
+    _url_classes.clear()
+    _class_methods.clear()
+    for name, config in settings.ADMISSION_CONTROL.items():
+        config = dict(config)
+        for url_name in config.pop("urls"):
+            _url_classes[url_name] = name
+        methods = config.pop("methods", None)
+        if methods:
+            _class_methods[name] = {method.upper() for method in methods}
+        _gates[name] = AdmissionGate(**config)
+
+
+def _user_key(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR')}"
+
+
+def _reject(gate, outcome):
+    if outcome == USER_LIMIT:
+        response = JsonResponse(
+            {"detail": "Too many concurrent requests of this kind; retry later."},
+            status=429,
+        )
+    else:
+        response = JsonResponse(
+            {"detail": "Server is busy with similar requests; retry later."},
+            status=503,
+        )
+    response["Retry-After"] = str(gate.retry_after)
+    return response
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        load_gates()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        release = getattr(request, "_admission_release", None)
+        if release is None:
+            return response
+        if response.streaming:
+            response.streaming_content = ReleasingIterator(response.streaming_content, release)
+        else:
+            release()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        name = _url_classes.get(match.url_name) if match else None
+        if name is None:
+            return None
+        if name in _class_methods and request.method not in _class_methods[name]:
+            return None
+        gate = _gates[name]
+        user_key = _user_key(request)
+        outcome = gate.acquire(user_key)
+        if outcome != ADMITTED:
+            return _reject(gate, outcome)
+        request._admission_release = lambda: gate.release(user_key)
+        return None
+
+
+class ReleasingIterator:
+    """
+    Streaming content that gives the slot back when the stream ends or the
+    response is closed (also when the body was never read).
+    """
+
+    def __init__(self, content, release):
+        self.content = iter(content)
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.content)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+        if hasattr(self.content, "close"):
+            self.content.close()
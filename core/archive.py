@@ -0,0 +1,109 @@
+"""
+Hot / cold storage for completed tasks.
+
+`manage.py archive_tasks --older-than DAYS` moves DONE tasks whose last
+change is older than DAYS from core_task into core_archivedtask, one
+batch per transaction:
+
+    INSERT INTO archive SELECT ... FROM task WHERE id IN (batch)
+    add the batch's (project, status, priority) counts to TaskArchiveCount
+    DELETE FROM task WHERE id IN (batch)
+
+API reads then only touch the (small) hot table unless they ask for
+?include_archived=1, and overviews add the archived counts from
+TaskArchiveCount.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import ArchivedTask, Project, Task, TaskArchiveCount
+
+COPY_SQL = """
+INSERT INTO {archive} (id, project_id, title, priority, status, due_date, created_at, updated_at, rank, archived_at)
+SELECT id, project_id, title, priority, status, due_date, created_at, updated_at, rank, %s
+FROM {task}
+WHERE id IN ({ids})
+"""
+
+
+def archivable_tasks(older_than_days, project_ids=None):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    qs = Task.objects.filter(status=Task.Status.DONE, updated_at__lt=cutoff)
+    if project_ids:
+        qs = qs.filter(project_id__in=project_ids)
+    return qs
+
+
+def archive_tasks(older_than_days, batch_size=1000, project_ids=None):
+    """Move old DONE tasks to the archive. Returns the number moved."""
+    quote = connection.ops.quote_name
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                archivable_tasks(older_than_days, project_ids)
+                .select_for_update().order_by("id").values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return total
+            batch = Task.objects.filter(id__in=ids)
+            counts = Counter({
+                (row["project_id"], row["status"], row["priority"]): row["n"]
+                for row in batch.order_by().values("project_id", "status", "priority")
+                .annotate(n=Count("id"))
+            })
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    COPY_SQL.format(
+                        archive=quote(ArchivedTask._meta.db_table),
+                        task=quote(Task._meta.db_table),
+                        ids=", ".join(["%s"] * len(ids)),
+                    ),
+                    [timezone.now(), *ids],
+                )
+            add_archive_counts(counts)
+            batch.delete()
+            Project.touch(*{project_id for project_id, _, _ in counts})
+        total += len(ids)
+
+
+def add_archive_counts(counts):
+    """One UPDATE (or INSERT for a new group) per (project, status, priority)."""
+    for (project_id, status_code, priority), n in counts.items():
+        rows = TaskArchiveCount.objects.filter(
+            project_id=project_id, status=status_code, priority=priority,
+        )
+        if rows.update(task_count=F("task_count") + n):
+            continue
+        try:
+            with transaction.atomic():
+                TaskArchiveCount.objects.create(
+                    project_id=project_id, status=status_code,
+                    priority=priority, task_count=n,
+                )
+        except IntegrityError:
+            # Another archiver created the group first
+            rows.update(task_count=F("task_count") + n)
+
+
+def archived_counters(project_id):
+    """
+    Archived task counters of one project, shaped like
+    core.views.task_counters(): total / by_status / by_priority.
+    """
+    rows = (TaskArchiveCount.objects.filter(project_id=project_id)
+            .values_list("status", "priority", "task_count"))
+    by_status = dict.fromkeys(Task.Status.values, 0)
+    by_priority = dict.fromkeys(Task.Priority.values, 0)
+    for status_code, priority, n in rows:
+        by_status[status_code] = by_status.get(status_code, 0) + n
+        by_priority[priority] = by_priority.get(priority, 0) + n
+    return {
+        "total_tasks": sum(by_status.values()),
+        "by_status": by_status,
+        "by_priority": by_priority,
+    }
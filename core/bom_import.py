@@ -0,0 +1,421 @@
+"""
+Parallel BOM import from Excel workbooks, CSV and Arrow files, and task
+import from CSV and Arrow files.
+
+Parsing .xlsx with openpyxl is CPU-bound and holds the GIL, so sheets are
+parsed in a pool of worker processes, one job per (file, sheet):
+
+    1. list the sheets of every uploaded file (read-only mode, cheap)
+    2. parse + validate each sheet in a worker; workers get the file path
+       (or the bytes of small in-memory uploads) and return plain tuples
+    3. insert the valid rows into the project in one transaction with
+       batched INSERTs (merge_rows)
+
+CSV and Arrow (IPC stream) files are one job each, with the same header
+as the Excel sheets. A single job is parsed inline, without the pool. Workers never touch the
+database; this module imports no models at import time so spawned
+workers start quickly.
+
+Task files use the columns of the task list export; only title,
+priority, status and due_date are read (parse_tasks / merge_tasks).
+"""
+import csv
+import datetime
+import io
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from multiprocessing import get_context
+
+from django.conf import settings
+
+EXPECTED_HEADER = ["Category", "Model", "Description", "Qty", "Param1", "Param2", "Price"]
+# BOM fields under those titles; also the column order of the exports
+COLUMNS = ("category", "model", "description", "qty", "param1", "param2", "price")
+# (column, max_length) of the BOM CharFields
+MAX_LENGTHS = ((0, 200), (1, 199), (4, 100), (5, 100))
+PRICE_LIMIT = Decimal(10) ** 10  # DecimalField(max_digits=13, decimal_places=3)
+MAX_ERRORS = 20  # row errors reported per sheet
+# Task fields read from an imported task file, by export column name
+TASK_COLUMNS = ("title", "priority", "status", "due_date")
+TASK_TITLE_LENGTH = 200
+
+READ_ERROR = "Could not read Excel file. Make sure it is a .xlsx file."
+SHEET_ERROR = "Could not read this sheet."
+CHARTSHEET_ERROR = "Not a worksheet (chart sheet)."
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _open(source):
+    from openpyxl import load_workbook
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return load_workbook(filename=source, read_only=True, data_only=True)
+
+
+def sheet_names(source):
+    """Names of the worksheets of a workbook (path or bytes)."""
+    wb = _open(source)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def _exact_qty(qty):
+    # CSV / Arrow (the round trip of the exports): an empty cell means 1,
+    # 0 stays 0, and 2 / "2" / "2.0" are 2
+    if qty == "":
+        return 1
+    try:
+        number = Decimal(str(qty).strip())
+    except InvalidOperation:
+        number = None
+    if number is None or not number.is_finite() or number != number.to_integral_value():
+        raise ValueError(f"Qty {qty!r} is not a whole number")
+    return int(number)
+
+
+def parse_row(row, exact_qty=False):
+    """
+    A BOM values tuple for one sheet row; raises ValueError when invalid.
+    Excel sheets keep the original rule (empty or 0 means 1, 2.5 is
+    truncated); exact_qty applies the CSV / Arrow rule (_exact_qty).
+    """
+    row = (tuple(row) + (None,) * 7)[:7]
+    category, model, description, qty, param1, param2, price = (
+        "" if value is None else value for value in row
+    )
+    values = [str(category), str(model), str(description), qty, str(param1), str(param2), price]
+    for column, max_length in MAX_LENGTHS:
+        if len(values[column]) > max_length:
+            raise ValueError(f"{EXPECTED_HEADER[column]} is longer than {max_length} characters")
+    if exact_qty:
+        values[3] = _exact_qty(qty)
+    else:
+        try:
+            values[3] = int(qty or 1)
+        except (TypeError, ValueError):
+            raise ValueError(f"Qty {qty!r} is not a whole number")
+    if values[3] < 0:
+        raise ValueError("Qty must not be negative")
+    if price == "":
+        values[6] = None
+    else:
+        try:
+            values[6] = Decimal(str(price)).quantize(Decimal("0.001"))
+        except InvalidOperation:
+            raise ValueError(f"Price {price!r} is not a number")
+        if abs(values[6]) >= PRICE_LIMIT:
+            raise ValueError(f"Price {price!r} is too large")
+    return tuple(values)
+
+
+def file_format(file_name):
+    """Import format of an upload, from its file name: csv, arrow or xlsx."""
+    name = file_name.lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".arrow", ".arrows")):
+        return "arrow"
+    return "xlsx"
+
+
+def _new_result(file_name, sheet):
+    return {"file": file_name, "sheet": sheet, "rows": [], "skipped": 0,
+            "errors": [], "detail": None}
+
+
+def bom_rows(exact_qty=False):
+    """Header check of BOM files: returns header -> row parser."""
+    def parser(header):
+        if list(header[:7]) != EXPECTED_HEADER:
+            raise ValueError("Unexpected header row. Expected: " + " | ".join(EXPECTED_HEADER))
+        return partial(parse_row, exact_qty=exact_qty)
+    return parser
+
+
+def task_rows(header):
+    """Header check of task files: returns the row parser."""
+    positions = {name: i for i, name in enumerate(header)}
+    if "title" not in positions:
+        raise ValueError("Missing title column. Expected the columns of the task export.")
+    return partial(parse_task_row, positions=tuple(positions.get(name) for name in TASK_COLUMNS))
+
+
+def parse_task_row(row, positions):
+    """(title, priority, status, due_date) for one task row; ValueError when invalid."""
+    from .models import Task
+
+    title, priority, status, due_date = (
+        None if i is None or i >= len(row) else row[i] for i in positions
+    )
+    title = "" if title is None else str(title).strip()
+    if not title:
+        raise ValueError("Title is required")
+    if len(title) > TASK_TITLE_LENGTH:
+        raise ValueError(f"Title is longer than {TASK_TITLE_LENGTH} characters")
+    priority = priority or Task.Priority.MEDIUM
+    if priority not in Task.Priority.values:
+        raise ValueError(f"Priority {priority!r} is not one of {', '.join(Task.Priority.values)}")
+    status = status or Task.Status.TODO
+    if status not in Task.Status.values:
+        raise ValueError(f"Status {status!r} is not one of {', '.join(Task.Status.values)}")
+    if due_date in (None, ""):
+        due_date = None
+    elif isinstance(due_date, datetime.datetime):
+        due_date = due_date.date()
+    elif not isinstance(due_date, datetime.date):
+        try:
+            due_date = datetime.date.fromisoformat(str(due_date).strip())
+        except ValueError:
+            raise ValueError(f"Due date {due_date!r} is not a YYYY-MM-DD date")
+    return (title, str(priority), str(status), due_date)
+
+
+def _collect(result, header, rows, parser=bom_rows()):
+    """
+    Check the header with parser (see bom_rows), then validate rows
+    (numbered like sheet rows).
+    """
+    if header is None:
+        result["detail"] = "Sheet is empty"
+        return result
+    try:
+        parse = parser(header)
+    except ValueError as exc:
+        result["detail"] = str(exc)
+        return result
+    for number, row in enumerate(rows, start=2):
+        if not row or all(v in (None, "", 0) for v in row):
+            continue
+        try:
+            result["rows"].append(parse(row))
+        except ValueError as exc:
+            result["skipped"] += 1
+            if len(result["errors"]) < MAX_ERRORS:
+                result["errors"].append(f"row {number}: {exc}")
+    return result
+
+
+def parse_sheet(source, file_name, sheet=None):
+    """
+    Worker job: read and validate one sheet (the active one if sheet is
+    None), or a whole CSV / Arrow file.
+    Returns {"file", "sheet", "rows", "skipped", "errors", "detail"};
+    "detail" is set when the whole sheet was rejected. Errors stay in the
+    result of their sheet, so one bad sheet does not fail the others.
+    """
+    kind = file_format(file_name)
+    if kind == "csv":
+        return _parse_csv(source, file_name, bom_rows(exact_qty=True))
+    if kind == "arrow":
+        return _parse_arrow(source, file_name, bom_rows(exact_qty=True))
+    result = _new_result(file_name, sheet)
+    try:
+        wb = _open(source)
+    except Exception:
+        result["detail"] = READ_ERROR
+        return result
+    try:
+        ws = wb[sheet] if sheet is not None else wb.active
+        result["sheet"] = ws.title
+        if not hasattr(ws, "iter_rows"):
+            result["detail"] = CHARTSHEET_ERROR
+            return result
+        rows = ws.iter_rows(values_only=True)
+        return _collect(result, next(rows, None), rows)
+    except Exception:
+        # Corrupt sheet XML surfaces while iterating; drop its partial rows
+        result.update(rows=[], skipped=0, errors=[], detail=SHEET_ERROR)
+        return result
+    finally:
+        wb.close()
+
+
+def parse_tasks(source, file_name):
+    """Read and validate a task file (.csv or .arrow); same result as parse_sheet."""
+    kind = file_format(file_name)
+    if kind == "csv":
+        return _parse_csv(source, file_name, task_rows)
+    if kind == "arrow":
+        return _parse_arrow(source, file_name, task_rows)
+    result = _new_result(file_name, None)
+    result["detail"] = "Task files must be .csv or .arrow (the task export formats)."
+    return result
+
+
+def _parse_csv(source, file_name, parser):
+    result = _new_result(file_name, None)
+    if isinstance(source, bytes):
+        stream = io.TextIOWrapper(io.BytesIO(source), encoding="utf-8-sig", newline="")
+    else:
+        stream = open(source, encoding="utf-8-sig", newline="")
+    try:
+        rows = csv.reader(stream)
+        return _collect(result, next(rows, None), rows, parser)
+    except (UnicodeDecodeError, csv.Error):
+        result["detail"] = "Could not read CSV file. Make sure it is UTF-8 encoded."
+        return result
+    finally:
+        stream.close()
+
+
+def _parse_arrow(source, file_name, parser):
+    """Arrow IPC stream with the column names of the exports."""
+    result = _new_result(file_name, None)
+    try:
+        import pyarrow as pa
+    except ImportError:
+        result["detail"] = "Arrow files are not supported on this server."
+        return result
+    try:
+        reader = pa.ipc.open_stream(pa.py_buffer(source) if isinstance(source, bytes)
+                                    else pa.memory_map(source))
+    except (pa.ArrowInvalid, OSError):
+        result["detail"] = "Could not read Arrow file. Expected an Arrow IPC stream."
+        return result
+    header = reader.schema.names
+
+    def rows():
+        for batch in reader:
+            columns = [column.to_pylist() for column in batch.columns]
+            yield from zip(*columns)
+
+    return _collect(result, header, rows(), parser)
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.BOM_IMPORT_WORKERS,
+                # Workers must not inherit the server's threads and DB connections
+                mp_context=get_context("spawn"),
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def run_jobs(jobs):
+    """
+    jobs: (source, file_name, sheet) tuples. Returns parse_sheet() results
+    in job order, parsed in the process pool when there is more than one job.
+    """
+    if len(jobs) <= 1 or settings.BOM_IMPORT_WORKERS <= 1:
+        return [parse_sheet(*job) for job in jobs]
+    try:
+        futures = [get_pool().submit(parse_sheet, *job) for job in jobs]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool next time
+        _reset_pool()
+        raise
+
+
+def build_jobs(files, all_sheets):
+    """
+    files: uploaded files. Returns (jobs, unreadable) where unreadable are
+    results for files that could not be opened.
+    """
+    jobs, unreadable = [], []
+    for file_obj in files:
+        if hasattr(file_obj, "temporary_file_path"):
+            source = file_obj.temporary_file_path()  # large upload, already on disk
+        else:
+            source = file_obj.read()
+        if not all_sheets or file_format(file_obj.name) != "xlsx":
+            jobs.append((source, file_obj.name, None))
+            continue
+        try:
+            names = sheet_names(source)
+        except Exception:
+            unreadable.append({"file": file_obj.name, "sheet": None, "rows": [], "skipped": 0,
+                               "errors": [], "detail": READ_ERROR})
+            continue
+        jobs.extend((source, file_obj.name, name) for name in names)
+    return jobs, unreadable
+
+
+def merge_rows(project, rows, user_id=None):
+    """
+    Insert parsed rows into the project: one transaction, batched INSERTs,
+    one rollup update per category and one history INSERT. Returns the count.
+    """
+    from django.db import transaction
+
+    from . import history
+    from .models import BOM, BOMRollup, Project
+
+    items = [
+        BOM(project=project, category=category, model=model, description=description,
+            qty=qty, param1=param1, param2=param2, price=price)
+        for category, model, description, qty, param1, param2, price in rows
+    ]
+    with transaction.atomic():
+        BOM.objects.bulk_create(items, batch_size=settings.BOM_IMPORT_BATCH_SIZE)
+        # bulk_create skips BOM.save(): update the cost rollup in one
+        # statement per category and bump the project version here
+        BOMRollup.apply_deltas(
+            BOMRollup.deltas(added=[item.rollup_values() for item in items])
+        )
+        history.record_many([
+            (project.id, history.BOM, item.pk, history.CREATE, {}, user_id)
+            for item in items
+        ])
+    Project.touch(project.id, bom=True)
+    return len(items)
+
+
+def merge_tasks(project, rows, user_id=None):
+    """
+    Insert parsed task rows at the end of the project's board: one
+    transaction, batched INSERTs and one history INSERT. Returns the count.
+    """
+    from django.db import transaction
+
+    from . import history
+    from .models import Project, Task
+    from .ranking import append_ranks
+
+    with transaction.atomic():
+        ranks = append_ranks(project.id, len(rows))
+        items = [
+            Task(project=project, title=title, priority=priority, status=status,
+                 due_date=due_date, rank=rank)
+            for (title, priority, status, due_date), rank in zip(rows, ranks)
+        ]
+        # bulk_create skips Task.save(); the ranks are set above
+        Task.objects.bulk_create(items, batch_size=settings.BOM_IMPORT_BATCH_SIZE)
+        history.record_many([
+            (project.id, history.TASK, item.pk, history.CREATE, {}, user_id)
+            for item in items
+        ])
+    Project.touch(project.id)
+    return len(items)
+
+
+def sheet_report(result, imported):
+    report = {
+        "file": result["file"],
+        "sheet": result["sheet"],
+        "imported": imported,
+        "skipped": result["skipped"],
+        "errors": result["errors"],
+    }
+    if result["detail"]:
+        report["detail"] = result["detail"]
+    return report
@@ -0,0 +1,163 @@
+"""
+Multi-level BOM explosion.
+
+Starting from the top-level lines of a project (lines that are no
+BOMLink child), quantities are multiplied down the BOMLink edges and
+summed per leaf line (lines without children).
+
+The walk goes one level at a time and each level is one set-based query:
+the frontier (distinct line, summed quantity) is joined to BOMLink and
+grouped by child, so a sub-assembly shared by N parents is expanded once
+per level, not once per path, and the aggregation happens in the
+database. Only the frontier of the current level is held in Python.
+
+- Links on a cycle (the parent is reachable from the child) are found
+  with one recursive query and not followed; they are counted in
+  `cycles`. Lines whose links are all cut contribute nothing.
+- Assemblies still having children at MAX_DEPTH are not expanded; they
+  are counted in `truncated`, and their parts are missing from the totals.
+"""
+from collections import defaultdict
+
+from django.db import connection
+
+from .models import BOM, BOMLink
+
+MAX_DEPTH = 100
+
+# Frontier lines sent per level query (two parameters each)
+FRONTIER_CHUNK = 500
+
+REACHABLE_SQL = """
+WITH RECURSIVE down (line_id) AS (
+    SELECT CAST(%(start)s AS bigint)
+    UNION
+    SELECT l.child_id
+    FROM down d JOIN {link} l ON l.parent_id = d.line_id
+)
+SELECT 1 FROM down WHERE line_id = %(target)s LIMIT 1
+"""
+
+# Only lines that are both a child and a parent can lie on a cycle; UNION
+# de-duplicates (origin, line) pairs, so this terminates on any graph.
+CYCLE_LINKS_SQL = """
+WITH RECURSIVE reach (origin, line_id) AS (
+    SELECT DISTINCT c.child_id, c.child_id
+    FROM {link} c JOIN {link} p ON p.parent_id = c.child_id
+    WHERE c.project_id = %(project)s
+    UNION
+    SELECT r.origin, l.child_id
+    FROM reach r JOIN {link} l ON l.parent_id = r.line_id
+)
+SELECT l.id
+FROM {link} l JOIN reach r ON r.origin = l.child_id AND r.line_id = l.parent_id
+WHERE l.project_id = %(project)s
+"""
+
+TOP_LINES_SQL = """
+SELECT b.id, b.qty
+FROM {bom} b
+WHERE b.project_id = %s
+  AND NOT EXISTS (SELECT 1 FROM {link} l WHERE l.child_id = b.id)
+"""
+
+FRONTIER_CTE = "WITH frontier (line_id, qty) AS (VALUES {values})\n"
+
+EXPAND_SQL = FRONTIER_CTE + """
+SELECT l.child_id, SUM(f.qty * l.qty)
+FROM frontier f JOIN {link} l ON l.parent_id = f.line_id
+{exclude}
+GROUP BY l.child_id
+"""
+
+LEAVES_SQL = FRONTIER_CTE + """
+SELECT f.line_id, f.qty
+FROM frontier f
+WHERE NOT EXISTS (SELECT 1 FROM {link} l WHERE l.parent_id = f.line_id)
+"""
+
+
+def _sql(template, **extra):
+    return template.format(link=connection.ops.quote_name(BOMLink._meta.db_table),
+                           bom=connection.ops.quote_name(BOM._meta.db_table), **extra)
+
+
+def _per_frontier(cursor, template, frontier, exclude=()):
+    """
+    Runs a frontier query in chunks of FRONTIER_CHUNK lines and sums the
+    (line_id, qty) rows; chunks can return the same child line.
+    """
+    exclude_sql = ""
+    if exclude:
+        exclude_sql = "WHERE l.id NOT IN ({})".format(", ".join(["%s"] * len(exclude)))
+    totals = defaultdict(int)
+    items = list(frontier.items())
+    for i in range(0, len(items), FRONTIER_CHUNK):
+        chunk = items[i:i + FRONTIER_CHUNK]
+        values = ", ".join(["(CAST(%s AS bigint), CAST(%s AS bigint))"] * len(chunk))
+        params = [value for pair in chunk for value in pair] + list(exclude)
+        cursor.execute(_sql(template, values=values, exclude=exclude_sql), params)
+        for line_id, qty in cursor.fetchall():
+            totals[line_id] += int(qty)
+    return totals
+
+
+def explode(project_id, max_depth=MAX_DEPTH):
+    """
+    Returns (leaves, cycles, truncated): one dict per leaf line with its
+    total quantity and cost over all paths, the number of links cut
+    because they lie on a cycle, and the number of assemblies left
+    unexpanded at max_depth.
+    """
+    totals = defaultdict(int)
+    depths = {}
+    truncated = 0
+    with connection.cursor() as cursor:
+        cursor.execute(_sql(CYCLE_LINKS_SQL), {"project": project_id})
+        cut = sorted(row[0] for row in cursor.fetchall())
+        cursor.execute(_sql(TOP_LINES_SQL), [project_id])
+        frontier = dict(cursor.fetchall())
+        depth = 0
+        while frontier:
+            leaves = _per_frontier(cursor, LEAVES_SQL, frontier)
+            for line_id, qty in leaves.items():
+                totals[line_id] += qty
+                depths[line_id] = depth
+            if depth >= max_depth:
+                truncated = len(frontier) - len(leaves)
+                break
+            if len(leaves) < len(frontier):
+                frontier = _per_frontier(cursor, EXPAND_SQL, frontier, cut)
+            else:
+                frontier = {}
+            depth += 1
+
+    leaves = []
+    for line_id, category, model, description, price in (
+            BOM.objects.filter(id__in=totals)
+            .values_list("id", "category", "model", "description", "price")):
+        total_qty = totals[line_id]
+        leaves.append({
+            "id": line_id,
+            "category": category,
+            "model": model,
+            "description": description,
+            "unit_price": price,
+            "total_qty": total_qty,
+            "total_cost": price * total_qty if price is not None else None,
+            "depth": depths[line_id],
+        })
+    leaves.sort(key=lambda line: (line["category"], line["model"], line["id"]))
+    return leaves, len(cut), truncated
+
+
+def would_create_cycle(parent_id, child_id):
+    """
+    True if parent is already reachable from child (or is child). UNION
+    de-duplicates visited lines, so this terminates on any graph.
+    """
+    if parent_id == child_id:
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute(_sql(REACHABLE_SQL), {"start": child_id, "target": parent_id})
+        return cursor.fetchone() is not None
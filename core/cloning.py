@@ -0,0 +1,117 @@
+"""
+Server-side project cloning.
+
+Tasks, BOM lines, BOM assembly links and the BOM cost rollup are copied
+with set-based INSERT ... SELECT statements inside one transaction, so no
+child row is ever loaded into Python.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import BOM, BOMLink, BOMRollup, Project, Task
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+COPY_TASKS_SQL = """
+INSERT INTO {task} (project_id, title, priority, status, due_date, created_at, updated_at, rank)
+SELECT %(new)s, title, priority,
+       CASE WHEN %(reset)s THEN %(todo)s ELSE status END,
+       due_date, %(now)s, %(now)s, rank
+FROM {task}
+WHERE project_id = %(old)s
+ORDER BY id
+"""
+
+COPY_ROLLUP_SQL = """
+INSERT INTO {rollup} (project_id, category, line_count, priced_lines, total_qty, total_cost)
+SELECT %(new)s, category, line_count, priced_lines, total_qty, total_cost
+FROM {rollup}
+WHERE project_id = %(old)s
+"""
+
+# Postgres: draw the new BOM ids from the sequence up front, so one
+# statement can copy the lines and remap the assembly links to them.
+COPY_BOM_POSTGRES_SQL = """
+WITH src AS (
+    SELECT id AS old_id, nextval(pg_get_serial_sequence('{bom_raw}', 'id')) AS new_id,
+           category, model, description, qty, param1, param2, price
+    FROM {bom}
+    WHERE project_id = %(old)s
+),
+lines AS (
+    INSERT INTO {bom} (id, project_id, category, model, description, qty, param1, param2, price, created_at)
+    SELECT new_id, %(new)s, category, model, description, qty, param1, param2, price, %(now)s
+    FROM src
+)
+INSERT INTO {link} (project_id, parent_id, child_id, qty, created_at)
+SELECT %(new)s, p.new_id, c.new_id, l.qty, %(now)s
+FROM {link} l
+JOIN src p ON p.old_id = l.parent_id
+JOIN src c ON c.old_id = l.child_id
+WHERE l.project_id = %(old)s
+"""
+
+# Other backends: copy lines in id order, then pair old and new ids by
+# position (SQLite hands out rowids in insertion order).
+COPY_BOM_SQL = """
+INSERT INTO {bom} (project_id, category, model, description, qty, param1, param2, price, created_at)
+SELECT %(new)s, category, model, description, qty, param1, param2, price, %(now)s
+FROM {bom}
+WHERE project_id = %(old)s
+ORDER BY id
+"""
+
+
+def _sql(template):
+    return template.format(
+        task=_table(Task), bom=_table(BOM), bom_raw=BOM._meta.db_table,
+        link=_table(BOMLink), rollup=_table(BOMRollup),
+    )
+
+
+def clone_project(source, name, owner, reset_status=False):
+    """
+    Copy source and all its child rows into a new project.
+    Returns (project, {"tasks": n, "bom_items": n, "bom_links": n}).
+    """
+    now = timezone.now()
+    params = {
+        "old": source.pk, "now": now, "reset": bool(reset_status),
+        "todo": Task.Status.TODO,
+    }
+    with transaction.atomic():
+        project = Project.objects.create(
+            owner=owner, name=name, description=source.description,
+        )
+        params["new"] = project.pk
+        with connection.cursor() as cursor:
+            cursor.execute(_sql(COPY_TASKS_SQL), params)
+            counts = {"tasks": cursor.rowcount}
+            if connection.vendor == "postgresql":
+                cursor.execute(_sql(COPY_BOM_POSTGRES_SQL), params)
+                counts["bom_links"] = cursor.rowcount
+            else:
+                cursor.execute(_sql(COPY_BOM_SQL), params)
+                counts["bom_links"] = _copy_links_by_position(source.pk, project.pk, now)
+            cursor.execute(_sql(COPY_ROLLUP_SQL), params)
+        counts["bom_items"] = BOM.objects.filter(project=project).count()
+    return project, counts
+
+
+def _copy_links_by_position(old_id, new_id, now):
+    old_ids = BOM.objects.filter(project_id=old_id).order_by("id").values_list("id", flat=True)
+    new_ids = BOM.objects.filter(project_id=new_id).order_by("id").values_list("id", flat=True)
+    mapping = dict(zip(old_ids, new_ids))
+    links = BOMLink.objects.bulk_create(
+        (
+            BOMLink(project_id=new_id, parent_id=mapping[parent], child_id=mapping[child],
+                    qty=qty, created_at=now)
+            for parent, child, qty in BOMLink.objects.filter(project_id=old_id)
+            .values_list("parent_id", "child_id", "qty").iterator()
+        ),
+        batch_size=1000,
+    )
+    return len(links)
@@ -0,0 +1,277 @@
+"""
+Response compression negotiated by Accept-Encoding.
+
+Codecs, in server preference order (settings.COMPRESSION_CODECS):
+
+    zstd  needs the `zstandard` package   fast, ratio close to gzip -9
+    br    needs the `brotli` package      best ratio, slower at high levels
+    gzip  stdlib zlib                     understood by every client
+
+Optional codecs are used only when installed; the level of each is
+settings.COMPRESSION_LEVELS. Only API and export types are compressed
+(JSON, NDJSON, CSV; see COMPRESSIBLE_TYPES): not HTML, and not xlsx,
+Arrow or other binary formats. Bodies under COMPRESSION_MIN_SIZE bytes
+are sent as they are.
+
+Streaming responses are compressed chunk by chunk and flushed after each
+chunk, so clients still get rows as soon as they are produced.
+
+Per-process counters (bytes in / out, CPU time per codec) are served by
+GET /api/ver2/compression/stats/; `manage.py bench_compression` compares
+codecs and levels on typical payloads.
+"""
+import threading
+import time
+import zlib
+from functools import lru_cache
+from importlib import import_module
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+# API and export bodies only. HTML pages (admin, browsable API, the
+# dashboard) carry CSRF tokens next to reflected input, which compression
+# would expose to BREACH-style length probing; this middleware has no
+# padding defence like GZipMiddleware's, so they are never compressed.
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+)
+
+
+class GzipCodec:
+    name = "gzip"
+    module = None
+
+    def compress(self, data, level):
+        compressor = self._compressobj(level)
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self, level):
+        return _ZlibStream(self._compressobj(level))
+
+    @staticmethod
+    def _compressobj(level):
+        # wbits 16 + MAX_WBITS: gzip container instead of raw zlib
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+class _ZlibStream:
+    def __init__(self, compressor):
+        self.compressor = compressor
+
+    def chunk(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class ZstdCodec:
+    name = "zstd"
+    module = "zstandard"
+
+    def compress(self, data, level):
+        zstandard = import_module(self.module)
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    def stream(self, level):
+        zstandard = import_module(self.module)
+        return _ZstdStream(zstandard.ZstdCompressor(level=level).compressobj(),
+                           zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+class _ZstdStream:
+    def __init__(self, compressor, flush_block):
+        self.compressor = compressor
+        self.flush_block = flush_block
+
+    def chunk(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(self.flush_block)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliCodec:
+    name = "br"
+    module = "brotli"
+
+    def compress(self, data, level):
+        brotli = import_module(self.module)
+        return brotli.compress(data, quality=level)
+
+    def stream(self, level):
+        brotli = import_module(self.module)
+        return _BrotliStream(brotli.Compressor(quality=level))
+
+
+class _BrotliStream:
+    def __init__(self, compressor):
+        self.compressor = compressor
+
+    def chunk(self, data):
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+CODECS = {codec.name: codec for codec in (GzipCodec(), ZstdCodec(), BrotliCodec())}
+
+
+@lru_cache(maxsize=None)
+def _installed(module):
+    return module is None or find_spec(module) is not None
+
+
+def available_codecs():
+    """Configured codecs whose module is installed, in preference order."""
+    return [
+        CODECS[name] for name in settings.COMPRESSION_CODECS
+        if name in CODECS and _installed(CODECS[name].module)
+    ]
+
+
+def parse_accept_encoding(header):
+    """{"gzip": 1.0, "br": 0.5, ...}; q=0 entries are kept (they refuse the codec)."""
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def choose_codec(header, codecs):
+    """The first codec in server order the client accepts, or None."""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    for codec in codecs:
+        if accepted.get(codec.name, wildcard) > 0:
+            return codec
+    return None
+
+
+def is_compressible(content_type):
+    return content_type.split(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+class CompressionStats:
+    """Per-process totals; CPU time is the compressing thread's own."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.codecs = {}
+
+    def add(self, codec_name, bytes_in, bytes_out, cpu_seconds):
+        with self.lock:
+            entry = self.codecs.setdefault(
+                codec_name, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0}
+            )
+            entry["responses"] += 1
+            entry["bytes_in"] += bytes_in
+            entry["bytes_out"] += bytes_out
+            entry["cpu_seconds"] += cpu_seconds
+
+    def snapshot(self):
+        with self.lock:
+            result = {}
+            for name, entry in self.codecs.items():
+                entry = dict(entry)
+                saved = entry["bytes_in"] - entry["bytes_out"]
+                entry["bytes_saved"] = saved
+                entry["ratio"] = round(entry["bytes_out"] / entry["bytes_in"], 4) if entry["bytes_in"] else None
+                # Bandwidth saved per CPU second spent compressing
+                entry["mb_saved_per_cpu_second"] = (
+                    round(saved / 1e6 / entry["cpu_seconds"], 1) if entry["cpu_seconds"] else None
+                )
+                entry["cpu_seconds"] = round(entry["cpu_seconds"], 4)
+                result[name] = entry
+            return result
+
+
+stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """
+    Like django.middleware.gzip.GZipMiddleware, with codec negotiation,
+    tunable levels and the compressible-type allow list above (which
+    leaves out HTML instead of padding it).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if not settings.COMPRESSION or response.has_header("Content-Encoding"):
+            return response
+        if response.status_code in (204, 304) or request.method == "HEAD":
+            return response
+        if not is_compressible(response.get("Content-Type", "")):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        codec = choose_codec(request.META.get("HTTP_ACCEPT_ENCODING", ""), available_codecs())
+        if codec is None:
+            return response
+        level = settings.COMPRESSION_LEVELS.get(codec.name)
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(response.streaming_content, codec, level)
+            del response["Content-Length"]
+        else:
+            start = time.thread_time()
+            compressed = codec.compress(response.content, level)
+            cpu = time.thread_time() - start
+            # Not worth it (already dense content)
+            if len(compressed) >= len(response.content):
+                return response
+            stats.add(codec.name, len(response.content), len(compressed), cpu)
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # Same representation rules as GZipMiddleware: a strong ETag of the
+        # uncompressed body is only weakly equal to the compressed one
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = codec.name
+        return response
+
+    @staticmethod
+    def compress_stream(content, codec, level):
+        compressor = codec.stream(level)
+        bytes_in = bytes_out = 0
+        cpu = 0.0
+        try:
+            for chunk in content:
+                if not chunk:
+                    continue
+                start = time.thread_time()
+                data = compressor.chunk(chunk)
+                cpu += time.thread_time() - start
+                bytes_in += len(chunk)
+                bytes_out += len(data)
+                yield data
+            start = time.thread_time()
+            data = compressor.finish()
+            cpu += time.thread_time() - start
+            bytes_out += len(data)
+            yield data
+        finally:
+            stats.add(codec.name, bytes_in, bytes_out, cpu)
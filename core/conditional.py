@@ -0,0 +1,72 @@
+"""
+HTTP conditional GET (ETag / Last-Modified / 304) for project reads.
+
+Validators come from Project.version and Project.updated_at, which are
+bumped on every write to the project or its tasks / BOM rows. Checking
+them costs one single-row query and nothing is serialized on a 304.
+"""
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import Project
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # Let browsers keep the copy but always revalidate it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_response(request, etag, last_modified, view, *args, **kwargs):
+    """
+    Answer 304 / 412 from the validators alone, otherwise call view and
+    attach the validators to its successful response.
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        return set_validators(response, etag, last_modified)
+    response = view(*args, **kwargs)
+    if response.status_code == 200:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def project_etag(request, project_id, version):
+    # The same URL can be served as JSON, NDJSON or the browsable API
+    renderer = getattr(request, "accepted_renderer", None)
+    fmt = getattr(renderer, "format", "json")
+    if request.GET.get("stream") in ("1", "true"):
+        fmt = "ndjson"
+    return f'"p{project_id}-v{version}-{fmt}"'
+
+
+def condition_on_project(owned=False):
+    """
+    Decorator for APIView.get(self, request, project_id).
+    owned=True restricts the validator lookup to the user's projects, like
+    the view itself; unknown projects fall through to the view's 404.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, project_id, *args, **kwargs):
+            qs = Project.objects.filter(pk=project_id)
+            if owned:
+                qs = qs.filter(owner=request.user)
+            row = qs.values_list("version", "updated_at").first()
+            if row is None:
+                return view_method(self, request, project_id, *args, **kwargs)
+            version, updated_at = row
+            etag = project_etag(request, project_id, version)
+            last_modified = int(updated_at.timestamp())
+            return conditional_response(
+                request, etag, last_modified,
+                view_method, self, request, project_id, *args, **kwargs
+            )
+        return wrapper
+    return decorator
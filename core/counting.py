@@ -0,0 +1,108 @@
+"""
+Estimated row counts for paginating huge tables.
+
+An exact COUNT(*) scans every matching row. On Postgres the planner
+already has an estimate: pg_class.reltuples for a whole table, or the
+row estimate of EXPLAIN for a filtered query. Above
+COUNT_ESTIMATE_THRESHOLD rows that estimate is used; below it (and on
+other databases) the count stays exact.
+"""
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def table_estimate(model, using="default"):
+    """pg_class.reltuples of the model's table, or None if unknown."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # -1 until the table has been vacuumed / analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def query_estimate(queryset):
+    """Planner row estimate of the queryset (EXPLAIN, nothing is run)."""
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    # '[{"Plan": ...}]', or just '{"Plan": ...}' when the driver already
+    # decoded the json column
+    if isinstance(plan, list):
+        plan = plan[0]
+    return int(plan["Plan"]["Plan Rows"])
+
+
+def estimated_count(queryset):
+    """Planner estimate of queryset.count(), or None when not on Postgres."""
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    query = queryset.query
+    if not query.where and not query.combinator and not query.distinct and not query.is_sliced:
+        return table_estimate(queryset.model, queryset.db)
+    return query_estimate(queryset)
+
+
+def fast_count(queryset, threshold=None):
+    """
+    Returns (count, is_estimate): the planner estimate when it is at least
+    threshold rows, otherwise an exact count.
+    """
+    threshold = settings.COUNT_ESTIMATE_THRESHOLD if threshold is None else threshold
+    if threshold:
+        estimate = estimated_count(queryset)
+        if estimate is not None and estimate >= threshold:
+            return estimate, True
+    return queryset.count(), False
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count comes from fast_count(); see count_is_estimate.
+
+    An estimate can be off either way. Pages from the estimated last one
+    on, and any page that comes back short, switch to an exact count
+    first: pages past the estimate stay reachable, count and num_pages
+    are right from there on, and pages past the real end are EmptyPage.
+    Only paging to the end pays for the COUNT(*).
+    """
+
+    @cached_property
+    def _fast_count(self):
+        if not hasattr(self.object_list, "query"):
+            return len(self.object_list), False
+        return fast_count(self.object_list)
+
+    @cached_property
+    def count(self):
+        return self._fast_count[0]
+
+    @property
+    def count_is_estimate(self):
+        return self._fast_count[1]
+
+    def _use_exact_count(self):
+        self._fast_count = (self.object_list.count(), False)
+        for name in ("count", "num_pages"):
+            self.__dict__.pop(name, None)
+
+    def page(self, number):
+        if self.count_is_estimate:
+            try:
+                near_end = int(number) >= self.num_pages
+            except (TypeError, ValueError):
+                near_end = False
+            if near_end:
+                self._use_exact_count()
+        page = super().page(number)
+        if self.count_is_estimate and len(page) < self.per_page:
+            # Estimate above the real count: this page is at or past the end
+            self._use_exact_count()
+            page = super().page(number)
+        return page
@@ -0,0 +1,186 @@
+"""
+Read replicas for safe API reads.
+
+ReplicaRoutingMiddleware marks GET / HEAD / OPTIONS requests as allowed
+to read from settings.REPLICA_DATABASES; ReplicaRouter then sends reads
+of REPLICA_APPS models to a replica and everything else to "default":
+
+- writes, and reads inside a transaction on the primary
+- reads outside requests (management commands, background threads)
+- any request from a client that wrote less than
+  READ_YOUR_WRITES_SECONDS ago, so users always see their own changes.
+  The pin is a cookie set on the write's response and, for clients
+  without a cookie jar (Basic auth scripts), a per-user entry in the
+  response cache checked once the request's user is known
+- computes that fill the shared response cache (primary_reads()), so a
+  lagging replica can't store stale data under a fresh generation
+- replicas lagging more than REPLICA_MAX_LAG_SECONDS, or unreachable;
+  lag is checked at most every REPLICA_LAG_CHECK_SECONDS per process
+
+Local testing: add a second alias pointing at the same SQLite file (or a
+second Postgres database) and list it in REPLICA_DATABASES.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+PRIMARY = "default"
+PIN_COOKIE = "db_primary_until"
+
+# Per request: may reads use a replica / did the request write
+_allow_replica = ContextVar("allow_replica", default=False)
+_wrote = ContextVar("wrote", default=False)
+# The request, to look up its user's server-side pin; and the result of
+# that lookup (None until the user is known)
+_request = ContextVar("request", default=None)
+_user_pinned = ContextVar("user_pinned", default=None)
+
+# alias -> (checked_at, healthy)
+_replica_health = {}
+
+LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind the primary (0 when caught up)."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def replica_is_healthy(alias):
+    now = time.monotonic()
+    checked_at, healthy = _replica_health.get(alias, (None, False))
+    if checked_at is not None and now - checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+        return healthy
+    try:
+        healthy = replica_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+    except DatabaseError:
+        healthy = False
+    _replica_health[alias] = (now, healthy)
+    return healthy
+
+
+def pick_replica():
+    """A healthy replica alias, or None to fall back to the primary."""
+    replicas = [alias for alias in settings.REPLICA_DATABASES if replica_is_healthy(alias)]
+    return random.choice(replicas) if replicas else None
+
+
+@contextmanager
+def primary_reads():
+    """Send the reads inside the block to the primary."""
+    token = _allow_replica.set(False)
+    try:
+        yield
+    finally:
+        _allow_replica.reset(token)
+
+
+def _pin_key(user_id):
+    return f"pin:u{user_id}"
+
+
+def pin_user(user_id):
+    """Read-your-writes for a user, whatever client they use."""
+    from .response_cache import get_cache
+
+    seconds = settings.READ_YOUR_WRITES_SECONDS
+    get_cache().set(_pin_key(user_id), time.time() + seconds, seconds)
+
+
+def user_is_pinned():
+    """
+    True when the current request's user wrote recently. The user is only
+    known after authentication (DRF authenticates Basic auth in the view),
+    so an anonymous user is not remembered as unpinned.
+    """
+    pinned = _user_pinned.get()
+    if pinned is not None:
+        return pinned
+    user = getattr(_request.get(), "user", None)
+    if user is None or not user.is_authenticated:
+        return False
+    from .response_cache import get_cache
+
+    pinned = (get_cache().get(_pin_key(user.pk)) or 0) > time.time()
+    _user_pinned.set(pinned)
+    return pinned
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _allow_replica.get() or model._meta.app_label not in settings.REPLICA_APPS:
+            return PRIMARY
+        if _wrote.get() or connections[PRIMARY].in_atomic_block or user_is_pinned():
+            return PRIMARY
+        return pick_replica() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema from the primary
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        allow = (
+            bool(settings.REPLICA_DATABASES)
+            and request.method in ("GET", "HEAD", "OPTIONS")
+            and not self.is_pinned(request)
+        )
+        allow_token = _allow_replica.set(allow)
+        wrote_token = _wrote.set(False)
+        request_token = _request.set(request)
+        pinned_token = _user_pinned.set(None)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get() or request.method not in ("GET", "HEAD", "OPTIONS")
+            if wrote and settings.REPLICA_DATABASES:
+                # Read-your-writes: this client reads from the primary for a while
+                seconds = settings.READ_YOUR_WRITES_SECONDS
+                response.set_cookie(PIN_COOKIE, str(time.time() + seconds),
+                                    max_age=seconds, httponly=True, samesite="Lax")
+                # DRF has put the authenticated user on the request by now
+                user = getattr(request, "user", None)
+                if user is not None and user.is_authenticated:
+                    pin_user(user.pk)
+        finally:
+            _allow_replica.reset(allow_token)
+            _wrote.reset(wrote_token)
+            _request.reset(request_token)
+            _user_pinned.reset(pinned_token)
+        return response
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
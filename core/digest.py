@@ -0,0 +1,113 @@
+"""
+Overdue / due-soon task digests.
+
+One set-based pass finds every open task (status <> DONE) due on or
+before as_of + due_within_days, for all users at once:
+
+    SELECT project.owner_id, task.* FROM task JOIN project ...
+    WHERE task.due_date <= %s AND task.status <> 'DONE'
+    ORDER BY project.owner_id, task.due_date, task.id
+
+The due_date condition is served by the partial index task_open_due_idx,
+which leaves DONE tasks out, so the scan reads only open tasks with a due
+date however large core_task grows. Rows come back through a server-side
+cursor in chunks and are grouped per owner on the fly; one TaskDigest per
+user is written with bulk inserts, so memory is bounded by the chunk size
+plus the TASK_DIGEST_MAX_TASKS tasks kept per digest.
+"""
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Task, TaskDigest
+
+COLUMNS = ("project__owner_id", "id", "project_id", "project__name",
+           "title", "status", "priority", "due_date")
+
+
+def due_tasks(as_of, due_within_days, owner_id=None):
+    """Open tasks of live projects due on or before as_of + due_within_days."""
+    qs = (
+        Task.objects
+        .filter(due_date__lte=as_of + timedelta(days=due_within_days),
+                project__deleted_at__isnull=True)
+        # Same predicate as the partial index
+        .exclude(status=Task.Status.DONE)
+    )
+    if owner_id is not None:
+        qs = qs.filter(project__owner_id=owner_id)
+    return qs
+
+
+def format_task(row, as_of):
+    _, task_id, project_id, project_name, title, status_code, priority, due_date = row
+    return {
+        "id": task_id,
+        "project": project_id,
+        "project_name": project_name,
+        "title": title,
+        "status": status_code,
+        "priority": priority,
+        "due_date": due_date.isoformat(),
+        "days_overdue": max((as_of - due_date).days, 0),
+    }
+
+
+def build_digest(owner_id, rows, as_of, due_within_days, max_tasks, generated_at):
+    """One user's TaskDigest from that user's rows, ordered by due date."""
+    digest = TaskDigest(user_id=owner_id, as_of=as_of, due_within_days=due_within_days,
+                        generated_at=generated_at)
+    for row in rows:
+        if row[-1] < as_of:
+            digest.overdue_count += 1
+        else:
+            digest.due_soon_count += 1
+        if len(digest.tasks) < max_tasks:
+            digest.tasks.append(format_task(row, as_of))
+    return digest
+
+
+def iter_digests(due_within_days, as_of=None, chunk_size=2000, max_tasks=None):
+    """Yields one unsaved TaskDigest per user with open tasks due."""
+    as_of = as_of or timezone.localdate()
+    max_tasks = settings.TASK_DIGEST_MAX_TASKS if max_tasks is None else max_tasks
+    generated_at = timezone.now()
+    rows = (
+        due_tasks(as_of, due_within_days)
+        .order_by("project__owner_id", "due_date", "id")
+        .values_list(*COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+    for owner_id, group in groupby(rows, key=itemgetter(0)):
+        yield build_digest(owner_id, group, as_of, due_within_days, max_tasks, generated_at)
+
+
+def generate_digests(due_within_days, as_of=None, chunk_size=2000, max_tasks=None, dry_run=False):
+    """
+    Write a TaskDigest for every user with overdue or due-soon tasks.
+    Returns (users, tasks).
+    """
+    users = tasks = 0
+    pending = []
+    for digest in iter_digests(due_within_days, as_of, chunk_size, max_tasks):
+        users += 1
+        tasks += digest.overdue_count + digest.due_soon_count
+        if dry_run:
+            continue
+        pending.append(digest)
+        if len(pending) >= chunk_size:
+            TaskDigest.objects.bulk_create(pending)
+            pending = []
+    if pending:
+        TaskDigest.objects.bulk_create(pending)
+    return users, tasks
+
+
+def prune_digests(keep_days):
+    """Delete digests generated more than keep_days ago (one DELETE)."""
+    cutoff = timezone.now() - timedelta(days=keep_days)
+    deleted, _ = TaskDigest.objects.filter(generated_at__lt=cutoff).delete()
+    return deleted
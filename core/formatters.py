@@ -0,0 +1,115 @@
+"""
+Serializer-free read path.
+
+A RowFormatter is built once from a ModelSerializer class. It knows which
+columns to ask for with values_list() and how to turn each tuple into the
+exact dict the serializer would have produced, without creating model
+instances or walking every field per row.
+"""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializers import BOMSerializer, TaskSerializer
+
+# Fields whose to_representation() is a no-op for values coming straight
+# out of the database (str stays str, int stays int, FK id stays FK id).
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class RowFormatter:
+    """
+    Usage:
+        rows = RowFormatter(TaskSerializer)
+        data = rows.format(qs.values_list(*rows.columns))
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._compiled = None
+
+    def _compile(self):
+        fields = self.serializer_class().fields
+        names, columns, converters = [], [], []
+        for name, field in fields.items():
+            if field.write_only:
+                continue
+            names.append(name)
+            columns.append(field.source)
+            if not isinstance(field, PASSTHROUGH_FIELDS):
+                converters.append((name, field))
+        self._compiled = (tuple(names), tuple(columns), tuple(converters))
+        return self._compiled
+
+    def _bind(self):
+        """
+        Pick a converter per field for this call. ISO dates and datetimes
+        get inlined versions of DRF's to_representation(); the current
+        timezone is looked up once instead of once per value.
+        """
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        bound = []
+        for name, field in self.compiled[2]:
+            convert = field.to_representation
+            if isinstance(field, serializers.DateTimeField):
+                output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+                field_tz = getattr(field, "timezone", tz)
+                if output_format and output_format.lower() == ISO_8601 and field_tz is not None:
+                    convert = _iso_datetime(field_tz)
+            elif isinstance(field, serializers.DateField):
+                output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+                if output_format and output_format.lower() == ISO_8601:
+                    convert = datetime.date.isoformat
+            bound.append((name, convert))
+        return bound
+
+    @property
+    def compiled(self):
+        return self._compiled or self._compile()
+
+    @property
+    def names(self):
+        return self.compiled[0]
+
+    @property
+    def columns(self):
+        """Column names to pass to values_list()."""
+        return self.compiled[1]
+
+    def format(self, rows):
+        names = self.names
+        converters = self._bind()
+        result = []
+        for row in rows:
+            data = dict(zip(names, row))
+            for name, convert in converters:
+                value = data[name]
+                if value is not None:
+                    data[name] = convert(value)
+            result.append(data)
+        return result
+
+    def format_row(self, row):
+        return self.format((row,))[0]
+
+
+def _iso_datetime(tz):
+    def convert(value):
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, tz)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    return convert
+
+
+TASK_ROWS = RowFormatter(TaskSerializer)
+BOM_ROWS = RowFormatter(BOMSerializer)
@@ -0,0 +1,134 @@
+"""
+Append-only change history for tasks and BOM rows (ChangeRecord).
+
+History is written in the same transaction as the change it describes,
+so a committed change always has its record (no window where a crash
+or a failing history write loses it) and a rolled-back change has none.
+
+record() / record_many() insert right away, inside the caller's
+transaction: TrackChangesMixin wraps each save/delete and its record in
+one atomic block. To avoid one INSERT per change, batch writes with
+
+    with history.buffered():
+        ...many saves...
+
+which opens an atomic block, collects the records and writes them with
+one bulk INSERT just before the block commits. A whole BOM import is a
+single record_many() call, i.e. one multi-row insert.
+
+Records without an explicit user are attributed to the current request's
+user (set by HistoryMiddleware; DRF's Basic auth user included).
+
+Storage is compact: object type and action are small integers and
+`changes` holds only the fields that changed, as {"field": [old, new]}.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+TASK = 1
+BOM = 2
+TYPE_NAMES = {TASK: "task", BOM: "bom"}
+
+CREATE = 1
+UPDATE = 2
+DELETE = 3
+ACTION_NAMES = {CREATE: "create", UPDATE: "update", DELETE: "delete"}
+
+# (rows, savepoint depth of the buffered() block) while buffering
+_buffer = ContextVar("history_buffer", default=None)
+_request = ContextVar("history_request", default=None)
+
+
+def record(project_id, object_type, object_id, action, changes=None, user_id=None):
+    record_many([(project_id, object_type, object_id, action, changes or {}, user_id)])
+
+
+def record_many(entries):
+    """entries: (project_id, object_type, object_id, action, changes, user_id) tuples."""
+    if not settings.CHANGE_HISTORY or not entries:
+        return
+    now = timezone.now()
+    rows = [(*entry, now) for entry in entries]
+    buffer = _buffer.get()
+    # Inside a savepoint opened within the buffered() block the rows are
+    # written at once, so rolling back to the savepoint removes them too
+    if buffer is not None and _savepoint_depth() == buffer[1]:
+        buffer[0].extend(rows)
+    else:
+        flush(rows)
+
+
+def _savepoint_depth():
+    # atomic(savepoint=False) blocks push None
+    return sum(1 for sid in connection.savepoint_ids if sid is not None)
+
+
+def _request_user_id():
+    request = _request.get()
+    user = getattr(request, "user", None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def flush(rows, default_user_id=None):
+    """Write rows with one bulk INSERT, in the current transaction."""
+    if not rows:
+        return
+    from .models import ChangeRecord
+
+    default_user_id = default_user_id or _request_user_id()
+    ChangeRecord.objects.bulk_create(
+        [
+            ChangeRecord(
+                project_id=project_id, object_type=object_type, object_id=object_id,
+                action=action, changes=changes, user_id=user_id or default_user_id,
+                created_at=created_at,
+            )
+            for project_id, object_type, object_id, action, changes, user_id, created_at in rows
+        ],
+        batch_size=1000,
+    )
+
+
+@contextmanager
+def buffered(user_id=None):
+    """
+    Atomic block whose records are written in one INSERT at its end,
+    before it commits. Nothing is written if the block raises.
+    """
+    with transaction.atomic():
+        rows = []
+        token = _buffer.set((rows, _savepoint_depth()))
+        try:
+            yield rows
+        finally:
+            _buffer.reset(token)
+        flush(rows, user_id)
+
+
+def diff(old, new, fields):
+    """{"field": [old, new]} for the fields whose value changed."""
+    return {
+        field: [old.get(field), new.get(field)]
+        for field in fields
+        if old.get(field) != new.get(field)
+    }
+
+
+class HistoryMiddleware:
+    """Makes the request user the default author of the history it writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # DRF puts users authenticated in the view (Basic auth) on the
+        # underlying request too, so the user is looked up at write time
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.archive import archivable_tasks, archive_tasks
+
+
+class Command(BaseCommand):
+    help = "Move DONE tasks not changed for --older-than days into the task archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, required=True, metavar="DAYS",
+                            help="Archive DONE tasks last updated more than DAYS days ago.")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Tasks moved per transaction.")
+        parser.add_argument("--project", type=int, action="append",
+                            help="Only archive tasks of these project ids (repeatable).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only report how many tasks would be archived.")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            count = archivable_tasks(options["older_than"], options["project"]).count()
+            self.stdout.write(f"{count} task(s) would be archived")
+            return
+        moved = archive_tasks(options["older_than"], options["batch_size"], options["project"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} task(s)"))
@@ -0,0 +1,118 @@
+"""
+Bandwidth vs CPU of the response compression codecs (core.compression)
+on payloads shaped like our large responses:
+
+    bom        unpaginated ProjectBOMList JSON
+    bom-ndjson the same rows streamed as NDJSON (compressed per chunk)
+    projects   ProjectList page with nested fields
+
+    python manage.py bench_compression --rows 20000 --levels gzip=1,6,9 zstd=1,3,9 br=1,4,9
+
+Payloads are built in memory, so no database is needed. For every codec
+and level it prints the compression ratio, CPU ms and the MB saved per
+CPU second (higher is a better trade-off).
+"""
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.compression import available_codecs
+from core.renderers import NDJSONRenderer, ORJSONRenderer
+
+DEFAULT_LEVELS = {"gzip": [1, 6, 9], "zstd": [1, 3, 9], "br": [1, 4, 9]}
+
+
+def bom_rows(count):
+    categories = ["Electrical", "Mechanical", "Hydraulics", "Controls", "Fasteners"]
+    return [
+        {
+            "id": i + 1,
+            "project": 1,
+            "category": categories[i % len(categories)],
+            "model": f"MDL-{i % 977:04d}-{i % 13}",
+            "description": f"Standard part {i % 211} for sub-assembly {i % 37}",
+            "qty": (i % 20) + 1,
+            "param1": f"{(i % 9) * 5}V",
+            "param2": "IP65" if i % 3 else "",
+            "price": Decimal(i % 500) + Decimal("0.250"),
+            "created_at": timezone.now(),
+        }
+        for i in range(count)
+    ]
+
+
+def project_page(count):
+    now = timezone.now()
+    return {
+        "results": [
+            {
+                "id": i + 1,
+                "name": f"Project {i}",
+                "description": "Line upgrade, phase %d" % (i % 4),
+                "owner": 1,
+                "created_at": now,
+                "task_count": i % 40,
+                "tasks": [{"id": i * 10 + j, "title": f"Task {j}", "status": "TODO",
+                           "priority": "MED", "due_date": None} for j in range(10)],
+            }
+            for i in range(count)
+        ],
+        "page": 1,
+        "page_size": count,
+    }
+
+
+def chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def measure(codec, level, payload):
+    """(compressed bytes, CPU seconds) for a body or a list of stream chunks."""
+    start = time.process_time()
+    if isinstance(payload, list):
+        compressor = codec.stream(level)
+        size = sum(len(compressor.chunk(chunk)) for chunk in payload) + len(compressor.finish())
+    else:
+        size = len(codec.compress(payload, level))
+    return size, time.process_time() - start
+
+
+class Command(BaseCommand):
+    help = "Compare compression ratio and CPU cost of the available codecs and levels."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000)
+        parser.add_argument("--levels", nargs="*", default=[],
+                            help="codec=level,level ... (default: gzip=1,6,9 zstd=1,3,9 br=1,4,9)")
+
+    def handle(self, *args, **options):
+        levels = dict(DEFAULT_LEVELS)
+        for spec in options["levels"]:
+            name, _, values = spec.partition("=")
+            levels[name] = [int(v) for v in values.split(",") if v]
+
+        rows = bom_rows(options["rows"])
+        ndjson = NDJSONRenderer()
+        payloads = {
+            "bom": ORJSONRenderer().render(rows),
+            "bom-ndjson": [ndjson.render(chunk) for chunk in chunks(rows, settings.STREAM_CHUNK_SIZE)],
+            "projects": ORJSONRenderer().render(project_page(max(options["rows"] // 100, 1))),
+        }
+        codecs = available_codecs()
+        self.stdout.write("codecs available: " + ", ".join(codec.name for codec in codecs))
+        self.stdout.write(f"{'payload':<11} {'codec':<5} {'level':>5} {'in KB':>9} {'out KB':>9} "
+                          f"{'ratio':>6} {'cpu ms':>8} {'MB saved/cpu s':>15}")
+        for payload_name, payload in payloads.items():
+            size_in = sum(map(len, payload)) if isinstance(payload, list) else len(payload)
+            for codec in codecs:
+                for level in levels.get(codec.name, [settings.COMPRESSION_LEVELS[codec.name]]):
+                    size_out, cpu = measure(codec, level, payload)
+                    saved_rate = (size_in - size_out) / 1e6 / cpu if cpu else float("inf")
+                    self.stdout.write(
+                        f"{payload_name:<11} {codec.name:<5} {level:>5} {size_in / 1024:>9.0f} "
+                        f"{size_out / 1024:>9.0f} {size_out / size_in:>6.3f} {cpu * 1000:>8.1f} "
+                        f"{saved_rate:>15.1f}"
+                    )
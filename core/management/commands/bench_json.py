@@ -0,0 +1,106 @@
+"""
+Micro-benchmark: serialize + render N Task rows with the stock DRF
+JSONRenderer and with ORJSONRenderer, and compare TaskSerializer with
+the values_list() RowFormatter.
+
+    python manage.py bench_json --rows 10000
+
+Rows are built in memory, so no database is needed.
+"""
+import datetime
+import io
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Task
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer, orjson
+from core.formatters import TASK_ROWS
+from core.serializers import TaskSerializer
+
+
+# Values orjson on its own renders differently from the stdlib encoder
+EDGE_CASES = [
+    {"big": 1e16}, {"small": 1e-05}, [0.0, -0.0, 1.5, 0.0001],
+    {"nan": float("nan")}, {"inf": float("-inf")}, {"wide": 2 ** 70},
+    {"decimal": Decimal("1E+20")}, {"decimal": Decimal("NaN")}, 1e300,
+]
+
+
+def render_or_error(renderer, data):
+    try:
+        return renderer.render(data)
+    except (TypeError, ValueError) as exc:
+        return type(exc)
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON rendering of Task rows (stock DRF vs orjson)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        now = timezone.now()
+        statuses = Task.Status.values
+        tasks = [
+            Task(
+                id=i + 1,
+                project_id=(i % 50) + 1,
+                title=f"Task number {i} – ünïcode",
+                status=statuses[i % len(statuses)],
+                due_date=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365),
+                created_at=now,
+                updated_at=now,
+            )
+            for i in range(rows)
+        ]
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson not installed: both runs use the stdlib encoder"))
+
+        t_ser, data = best_of(repeat, lambda: TaskSerializer(tasks, many=True).data)
+        # What values_list(*TASK_ROWS.columns) would hand back
+        tuples = [tuple(getattr(t, f"{c}_id" if c == "project" else c) for c in TASK_ROWS.columns)
+                  for t in tasks]
+        t_rows, row_data = best_of(repeat, lambda: TASK_ROWS.format(tuples))
+        t_std, std_bytes = best_of(repeat, lambda: JSONRenderer().render(data))
+        t_fast, fast_bytes = best_of(repeat, lambda: ORJSONRenderer().render(data))
+
+        parser = ORJSONParser()
+        t_parse, _ = best_of(repeat, lambda: parser.parse(io.BytesIO(fast_bytes)))
+
+        self.stdout.write(f"rows:                {rows}")
+        self.stdout.write(f"payload:             {len(std_bytes) / 1024:.0f} KiB")
+        self.stdout.write(f"serializer.data:     {t_ser * 1000:8.1f} ms")
+        self.stdout.write(f"RowFormatter:        {t_rows * 1000:8.1f} ms  ({t_ser / t_rows:.1f}x)")
+        self.stdout.write(f"JSONRenderer:        {t_std * 1000:8.1f} ms")
+        self.stdout.write(f"ORJSONRenderer:      {t_fast * 1000:8.1f} ms  ({t_std / t_fast:.1f}x)")
+        self.stdout.write(f"ORJSONParser:        {t_parse * 1000:8.1f} ms")
+        if JSONRenderer().render(row_data) != std_bytes:
+            self.stdout.write(self.style.ERROR("RowFormatter output differs from TaskSerializer!"))
+        if std_bytes != fast_bytes:
+            self.stdout.write(self.style.ERROR("output differs from JSONRenderer!"))
+        else:
+            self.stdout.write(self.style.SUCCESS("output is byte-identical"))
+        differing = [case for case in EDGE_CASES
+                     if render_or_error(JSONRenderer(), case) != render_or_error(ORJSONRenderer(), case)]
+        if differing:
+            self.stdout.write(self.style.ERROR(f"edge cases rendered differently: {differing!r}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(EDGE_CASES)} edge cases match (floats, wide ints, NaN)"))
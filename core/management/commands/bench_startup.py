@@ -0,0 +1,106 @@
+"""
+Startup benchmark: time from process start to the first served request,
+and module import time (python -X importtime), in a fresh interpreter.
+
+    python manage.py bench_startup --runs 5 --max-start-ms 1500 --max-import-ms 800
+
+Fails (exit code 1) when the median start or import time is over budget,
+or when a module that must stay lazy (openpyxl, numpy, pyarrow) was imported
+before the first request finished.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Only needed by the Excel import/export, what-if and Arrow code paths
+LAZY_MODULES = ("openpyxl", "numpy", "pyarrow")
+
+CHILD = """
+import io, json, sys
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": sys.argv[1], "QUERY_STRING": "",
+    "SERVER_NAME": "localhost", "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+    "wsgi.url_scheme": "http", "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr,
+}
+statuses = []
+b"".join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+lazy = [name for name in sys.argv[2:] if name in sys.modules]
+print(json.dumps({"status": statuses[0], "loaded": lazy}))
+"""
+
+
+def parse_importtime(stderr):
+    """Returns (total self time in ms, {top-level module: cumulative ms})."""
+    total_us = 0
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        if not name.startswith("  "):
+            top_level[name.strip()] = int(cumulative_us) / 1000
+    return total_us / 1000, top_level
+
+
+def run_once(path):
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get(
+        "DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE)}
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, path, *LAZY_MODULES],
+        capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise CommandError(f"Child process failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    import_ms, top_level = parse_importtime(proc.stderr)
+    return elapsed_ms, import_ms, top_level, result
+
+
+class Command(BaseCommand):
+    help = "Measure worker start-to-first-request and import time against a budget."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--path", default="/api/auth/me/",
+                            help="URL of the first request (should not need the database).")
+        parser.add_argument("--max-start-ms", type=float, default=1500,
+                            help="Budget for process start to first response (median).")
+        parser.add_argument("--max-import-ms", type=float, default=800,
+                            help="Budget for total import time (median).")
+        parser.add_argument("--top", type=int, default=10,
+                            help="Show the N slowest top-level imports.")
+
+    def handle(self, *args, **options):
+        runs = [run_once(options["path"]) for _ in range(options["runs"])]
+        start_ms = statistics.median(r[0] for r in runs)
+        import_ms = statistics.median(r[1] for r in runs)
+        _, _, top_level, result = runs[-1]
+
+        self.stdout.write(f"first request: {result['status']}")
+        self.stdout.write(f"start -> first response: {start_ms:8.1f} ms (budget {options['max_start_ms']:.0f})")
+        self.stdout.write(f"import time:             {import_ms:8.1f} ms (budget {options['max_import_ms']:.0f})")
+        self.stdout.write("slowest top-level imports:")
+        for name, ms in sorted(top_level.items(), key=lambda item: -item[1])[:options["top"]]:
+            self.stdout.write(f"  {ms:8.1f} ms  {name}")
+
+        failures = []
+        if start_ms > options["max_start_ms"]:
+            failures.append(f"start time {start_ms:.0f} ms is over budget")
+        if import_ms > options["max_import_ms"]:
+            failures.append(f"import time {import_ms:.0f} ms is over budget")
+        if result["loaded"]:
+            failures.append(f"imported at startup but should be lazy: {', '.join(result['loaded'])}")
+        if failures:
+            raise CommandError("; ".join(failures))
+        self.stdout.write(self.style.SUCCESS("Startup within budget"))
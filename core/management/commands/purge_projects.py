@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.purge import purge_deleted_projects
+
+
+class Command(BaseCommand):
+    help = "Purge soft-deleted projects and their rows in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int,
+                            help="Rows deleted per transaction (default PROJECT_DELETE_BATCH_SIZE).")
+        parser.add_argument("--pause", type=float,
+                            help="Seconds to sleep between batches (default PROJECT_DELETE_BATCH_PAUSE).")
+
+    def handle(self, *args, **options):
+        purged = purge_deleted_projects(options["batch_size"], options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Purged {len(purged)} project(s)"))
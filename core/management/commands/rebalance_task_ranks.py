@@ -0,0 +1,28 @@
+from django.db.models import Max
+from django.db.models.functions import Length
+from django.core.management.base import BaseCommand
+
+from core.models import Task
+from core.ranking import rebalance_project
+
+
+class Command(BaseCommand):
+    help = "Re-space the manual order keys (Task.rank) of projects evenly."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, action="append",
+                            help="Only rebalance these project ids (repeatable).")
+        parser.add_argument("--min-length", type=int, default=0,
+                            help="Only projects whose longest rank key is longer than this.")
+
+    def handle(self, *args, **options):
+        projects = (Task.objects.order_by().values("project_id")
+                    .annotate(longest=Max(Length("rank")))
+                    .filter(longest__gt=options["min_length"]))
+        if options["project"]:
+            projects = projects.filter(project_id__in=options["project"])
+        count = 0
+        for project_id in projects.values_list("project_id", flat=True):
+            rebalance_project(project_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebalanced {count} project(s)"))
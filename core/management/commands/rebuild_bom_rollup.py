@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.rollup import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed BOM cost rollup table from the BOM rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", type=int, action="append",
+                            help="Only rebuild these project ids (repeatable).")
+
+    def handle(self, *args, **options):
+        rebuild_rollup(options["project"])
+        self.stdout.write(self.style.SUCCESS("BOM rollup rebuilt"))
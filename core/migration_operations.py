@@ -0,0 +1,21 @@
+"""
+Migration operations that only touch the database on PostgreSQL.
+
+The schema is designed for Postgres, but local SQLite databases should
+still migrate; Postgres-only indexes are simply skipped there.
+"""
+from django.contrib.postgres.operations import AddIndexConcurrently
+
+
+class PostgresOnlyMixin:
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class PostgresAddIndexConcurrently(PostgresOnlyMixin, AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY on Postgres, no-op elsewhere."""
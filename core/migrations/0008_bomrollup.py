@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_rollup(apps, schema_editor):
+    BOM = apps.get_model("core", "BOM")
+    BOMRollup = apps.get_model("core", "BOMRollup")
+    cost = DecimalField(max_digits=24, decimal_places=3)
+    groups = (
+        BOM.objects.order_by()
+        .values("project_id", "category")
+        .annotate(
+            line_count=Count("id"),
+            priced_lines=Count("id", filter=Q(price__isnull=False)),
+            total_qty=Coalesce(Sum("qty"), 0),
+            total_cost=Coalesce(
+                Sum(F("qty") * F("price"), filter=Q(price__isnull=False), output_field=cost),
+                Value(0), output_field=cost,
+            ),
+        )
+    )
+    BOMRollup.objects.bulk_create((BOMRollup(**g) for g in groups.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_project_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BOMRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=200)),
+                ('line_count', models.BigIntegerField(default=0)),
+                ('priced_lines', models.BigIntegerField(default=0)),
+                ('total_qty', models.BigIntegerField(default=0)),
+                ('total_cost', models.DecimalField(decimal_places=3, default=0, max_digits=24)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bom_rollups', to='core.project')),
+            ],
+            options={
+                'ordering': ['category'],
+                'constraints': [models.UniqueConstraint(fields=('project', 'category'), name='uniq_bom_rollup_project_category')],
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:26
+
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_bomrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BOMLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('qty', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parent_links', to='core.bom')),
+                ('parent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='child_links', to='core.bom')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bom_links', to='core.project')),
+            ],
+            options={
+                'ordering': ['parent', 'child'],
+                'constraints': [models.UniqueConstraint(fields=('parent', 'child'), name='uniq_bom_link_parent_child'), models.CheckConstraint(condition=models.Q(('parent', models.F('child')), _negated=True), name='bom_link_not_self')],
+            },
+            bases=(core.models.ProjectChildMixin, models.Model),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:28
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from core.migration_operations import PostgresAddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction; building
+    # these on a large core_bom must not block writers.
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_bomlink'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        PostgresAddIndexConcurrently(
+            model_name='bom',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('model'), name='gin_trgm_ops'), name='bom_model_trgm'),
+        ),
+        PostgresAddIndexConcurrently(
+            model_name='bom',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('description'), name='gin_trgm_ops'), name='bom_description_trgm'),
+        ),
+        PostgresAddIndexConcurrently(
+            model_name='bom',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('model', 'description', config='simple'), name='bom_search_vector'),
+        ),
+    ]
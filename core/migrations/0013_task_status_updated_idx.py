@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:33
+
+from django.db import migrations, models
+
+from core.migration_operations import PostgresAddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Built concurrently: core_task is large and must stay writable
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_task_archive'),
+    ]
+
+    operations = [
+        PostgresAddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['status', 'updated_at'], name='task_status_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:36
+
+from django.db import migrations, models
+
+# Frozen copy of core.ranking.spaced_keys as of this migration, so later
+# changes to the ranking module don't change what the migration writes
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+RANK_WIDTH = 6
+
+
+def spaced_keys(count):
+    """count evenly spaced base-36 keys of at most RANK_WIDTH digits, in order."""
+    width = RANK_WIDTH
+    while BASE ** width <= count:
+        width += 1
+    step = BASE ** width // (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value = i * step
+        chars = []
+        for _ in range(width):
+            value, d = divmod(value, BASE)
+            chars.append(DIGITS[d])
+        keys.append("".join(reversed(chars)).rstrip("0"))
+    return keys
+
+
+def populate_ranks(apps, schema_editor):
+    # Start from the current default order (oldest first within a project)
+    Task = apps.get_model("core", "Task")
+    project_ids = Task.objects.order_by().values_list("project_id", flat=True).distinct()
+    for project_id in list(project_ids):
+        ids = list(Task.objects.filter(project_id=project_id)
+                   .order_by("created_at", "id").values_list("id", flat=True))
+        Task.objects.bulk_update(
+            [Task(id=task_id, rank=rank) for task_id, rank in zip(ids, spaced_keys(len(ids)))],
+            ["rank"], batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_task_status_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtask',
+            name='rank',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rank',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_ranks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:41
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_task_project_rank_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.PositiveSmallIntegerField(choices=[(1, 'task'), (2, 'bom')])),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.PositiveSmallIntegerField(choices=[(1, 'create'), (2, 'update'), (3, 'delete')])),
+                ('changes', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('project', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='change_records', to='core.project')),
+                ('user', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['object_type', 'object_id', '-created_at'], name='history_object_idx'), models.Index(fields=['project', '-created_at'], name='history_project_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:43
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_change_history'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('due_within_days', models.PositiveSmallIntegerField()),
+                ('overdue_count', models.PositiveIntegerField(default=0)),
+                ('due_soon_count', models.PositiveIntegerField(default=0)),
+                ('tasks', models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('generated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-generated_at', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='taskdigest',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='task_digests', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='taskdigest',
+            index=models.Index(fields=['user', '-generated_at'], name='digest_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskdigest',
+            index=models.Index(fields=['generated_at'], name='digest_generated_idx'),
+        ),
+    ]
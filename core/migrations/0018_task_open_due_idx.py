@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:44
+
+from django.db import migrations, models
+
+from core.migration_operations import PostgresAddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Built concurrently: core_task is large and must stay writable
+    atomic = False
+
+    dependencies = [
+        ('core', '0017_task_digest'),
+    ]
+
+    operations = [
+        PostgresAddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'DONE'), _negated=True), fields=['due_date'], name='task_open_due_idx'),
+        ),
+    ]
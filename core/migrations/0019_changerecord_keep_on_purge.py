@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 16:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_task_open_due_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changerecord',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='change_records', to='core.project'),
+        ),
+    ]
@@ -1,5 +1,25 @@
-from django.db import models
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from .response_cache import bump_generation
+from .ranking import append_ranks
+from . import history
+
+class LiveProjectManager(models.Manager):
+    """Hides soft-deleted projects that are waiting to be purged (core.purge)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 # Create your models here.
 class Project(models.Model):
@@ -11,13 +31,140 @@ class Project(models.Model):
     name = models.CharField(max_length=200,unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Change tracking for conditional GETs: bumped on any write to the
+    # project or to one of its tasks / BOM rows (see Project.touch)
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Set when the project is deleted; its rows are then purged in batches
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LiveProjectManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ["-created_at"] # newest first
 
     def __str__(self):
         return self.name
-class Task(models.Model):
+
+    def save(self, *args, **kwargs):
+        bump = self.pk is not None and not self._state.adding
+        if bump:
+            # Increment in the database like touch(): a stale instance
+            # must not write back an older version (ETags would repeat)
+            self.version = F("version") + 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=["version"])
+        bump_generation("project", self.pk)
+        bump_generation("user", self.owner_id)
+
+    def delete(self, *args, **kwargs):
+        project_id, owner_id = self.pk, self.owner_id
+        result = super().delete(*args, **kwargs)
+        bump_generation("project", project_id)
+        bump_generation("user", owner_id)
+        return result
+
+    @classmethod
+    def touch(cls, *project_ids, bom=False):
+        """
+        Mark projects as changed after a write to their child rows.
+        One UPDATE, no rows loaded. Call it after bulk_create/update/delete,
+        which bypass Task.save()/BOM.save(). bom=True when BOM rows changed:
+        also invalidates what only depends on the BOM (core.whatif).
+        """
+        ids = {pk for pk in project_ids if pk is not None}
+        if ids and bom:
+            bump_generation("bom", *ids)
+        if ids:
+            projects = cls.objects.filter(pk__in=ids)
+            projects.update(version=F("version") + 1, updated_at=timezone.now())
+            # Invalidate cached responses (see core.response_cache)
+            bump_generation("project", *ids)
+            bump_generation("user", *projects.values_list("owner_id", flat=True))
+
+
+class ProjectChildMixin:
+    """
+    Bumps the parent project's version whenever the row is saved or
+    deleted, including the old project when a row is moved.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_project_id = instance.__dict__.get("project_id")
+        return instance
+
+    # True on BOM: its writes also bump the project's "bom" generation
+    TOUCHES_BOM = False
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Project.touch(self.project_id, getattr(self, "_loaded_project_id", None), bom=self.TOUCHES_BOM)
+        self._loaded_project_id = self.project_id
+
+    def delete(self, *args, **kwargs):
+        project_id = self.project_id
+        result = super().delete(*args, **kwargs)
+        Project.touch(project_id, bom=self.TOUCHES_BOM)
+        return result
+
+class TrackChangesMixin:
+    """
+    Records creates, deletes and field-level changes of HISTORY_FIELDS
+    (attribute names) in the change history, see core.history.
+    """
+    HISTORY_TYPE = None
+    HISTORY_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._history_loaded = instance.history_values()
+        return instance
+
+    def history_values(self):
+        fields = self.__dict__
+        return {name: fields[name] for name in self.HISTORY_FIELDS if name in fields}
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        # The change and its history record commit (or not) together. No
+        # savepoint: inside history.buffered() the record joins the batch
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            new = self.history_values()
+            if adding:
+                history.record(self.project_id, self.HISTORY_TYPE, self.pk, history.CREATE)
+            else:
+                fields = self.HISTORY_FIELDS
+                update_fields = kwargs.get("update_fields")
+                if update_fields is not None:
+                    fields = [f for f in fields if f in update_fields or f.removesuffix("_id") in update_fields]
+                changes = history.diff(getattr(self, "_history_loaded", {}), new, fields)
+                if changes:
+                    history.record(self.project_id, self.HISTORY_TYPE, self.pk, history.UPDATE, changes)
+        self._history_loaded = new
+
+    def delete(self, *args, **kwargs):
+        # Keep the last values so deleted rows stay identifiable
+        old = getattr(self, "_history_loaded", None) or self.history_values()
+        project_id, pk = self.project_id, self.pk
+        with transaction.atomic(savepoint=False):
+            result = super().delete(*args, **kwargs)
+            changes = {name: [value, None] for name, value in old.items() if value not in (None, "")}
+            history.record(project_id, self.HISTORY_TYPE, pk, history.DELETE, changes)
+        return result
+
+
+class Task(TrackChangesMixin, ProjectChildMixin, models.Model):
+    HISTORY_TYPE = history.TASK
+    HISTORY_FIELDS = ("title", "status", "priority", "due_date", "project_id")
+
     class Status(models.TextChoices):
         TODO = "TODO","To Do"
         IN_PROGRESS = "INPR","In Progress"
@@ -42,18 +189,84 @@ class Task(models.Model):
     due_date = models.DateField(null=True,blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Manual board order within the project (core.ranking); set on create,
+    # changed through the move endpoint
+    rank = models.CharField(max_length=255,blank=True,default="",editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Finds DONE tasks to archive (core.archive)
+            models.Index(fields=["status", "updated_at"], name="task_status_updated_idx"),
+            # ?sort=rank within a project, and the neighbour lookups of a move
+            models.Index(fields=["project", "rank"], name="task_project_rank_idx"),
+            # Overdue / due-soon scan (core.digest); DONE tasks are left out
+            # of the index, so it stays small however many tasks are closed
+            models.Index(fields=["due_date"], condition=~Q(status="DONE"), name="task_open_due_idx"),
+        ]
     def __str__(self):
         return f"{self.title}[{self.get_status_display()}]"
-class BOM(models.Model):
+
+    def save(self, *args, **kwargs):
+        if self.rank:
+            return super().save(*args, **kwargs)
+        # Concurrent creates would read the same last rank; the project
+        # row lock taken by append_ranks makes them take turns (held until
+        # the outermost transaction commits; no savepoint needed for that)
+        with transaction.atomic(savepoint=False):
+            self.rank = append_ranks(self.project_id, 1)[0]
+            super().save(*args, **kwargs)
+
+
+class ArchivedTask(models.Model):
+    """
+    Cold storage for old DONE tasks, moved out of core_task by
+    `manage.py archive_tasks` (see core.archive). Keeps the task's id and
+    columns so listings can union both tables. Per-project counters live
+    in TaskArchiveCount, so overviews never scan this table.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    project = models.ForeignKey(Project,on_delete=models.CASCADE,related_name="archived_tasks")
+    title = models.CharField(max_length=200)
+    priority = models.CharField(max_length=4,choices=Task.Priority.choices)
+    status = models.CharField(max_length=4,choices=Task.Status.choices)
+    due_date = models.DateField(null=True,blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    rank = models.CharField(max_length=255,blank=True,default="",editable=False)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.title}[{self.get_status_display()}] (archived)"
+
+
+class TaskArchiveCount(models.Model):
+    """Number of archived tasks per (project, status, priority)."""
+    project = models.ForeignKey(Project,on_delete=models.CASCADE,related_name="archive_counts")
+    status = models.CharField(max_length=4,choices=Task.Status.choices)
+    priority = models.CharField(max_length=4,choices=Task.Priority.choices)
+    task_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["project", "status", "priority"], name="uniq_task_archive_count"),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id} / {self.status} / {self.priority}: {self.task_count}"
+class BOM(TrackChangesMixin, ProjectChildMixin, models.Model):
     # Link BOM to Project (1 Project = Many BOMs)
     project = models.ForeignKey(Project,on_delete=models.CASCADE,related_name="bom_items")
     """
     One row in the Bill Of Materials for a Project.
     Example columns: Category | Model | Description | Qty | Param1 | Param2 | Price
     """
+    HISTORY_TYPE = history.BOM
+    TOUCHES_BOM = True
+    HISTORY_FIELDS = ("category", "model", "description", "qty", "param1", "param2", "price", "project_id")
     category = models.CharField(max_length=200)
     model = models.CharField(max_length=199)
     description = models.TextField(blank=True)
@@ -65,8 +278,198 @@ class BOM(models.Model):
 
     class Meta:
         ordering = ["category","model"]
+        indexes = [
+            # Parts search (core.views.PartSearch) and admin search use
+            # icontains = UPPER(col) LIKE UPPER('%q%'); trigram GIN indexes
+            # on the same UPPER() expressions serve those scans.
+            GinIndex(OpClass(Upper("model"), name="gin_trgm_ops"), name="bom_model_trgm"),
+            GinIndex(OpClass(Upper("description"), name="gin_trgm_ops"), name="bom_description_trgm"),
+            # Full-text mode (?mode=text)
+            GinIndex(SearchVector("model", "description", config="simple"), name="bom_search_vector"),
+        ]
     def __str__(self):
         return f"{self.category} - {self.model} (x{self.qty})"
 
-    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rollup = instance.rollup_values()
+        return instance
+
+    def rollup_values(self):
+        """What this row contributes to BOMRollup (None if not loadable)."""
+        fields = self.__dict__
+        if not all(name in fields for name in ("project_id", "category", "qty", "price")):
+            return None
+        return (self.project_id, self.category, self.qty, self.price)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            deltas = BOMRollup.deltas(
+                added=[self.rollup_values()],
+                removed=[getattr(self, "_loaded_rollup", None)],
+            )
+            BOMRollup.apply_deltas(deltas)
+        self._loaded_rollup = self.rollup_values()
+
+    def delete(self, *args, **kwargs):
+        removed = getattr(self, "_loaded_rollup", None) or self.rollup_values()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            BOMRollup.apply_deltas(BOMRollup.deltas(removed=[removed]))
+        return result
+
+
+class BOMLink(ProjectChildMixin, models.Model):
+    """
+    Multi-level BOM: `child` is used `qty` times inside assembly `parent`.
+    Both are BOM lines of the same project. Lines that are nobody's child
+    are top-level and count with their own BOM.qty; lines without children
+    are leaf parts. See core.bom_tree for the explosion query.
+    """
+    project = models.ForeignKey(Project,on_delete=models.CASCADE,related_name="bom_links")
+    parent = models.ForeignKey(BOM,on_delete=models.CASCADE,related_name="child_links")
+    child = models.ForeignKey(BOM,on_delete=models.CASCADE,related_name="parent_links")
+    qty = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["parent","child"]
+        constraints = [
+            models.UniqueConstraint(fields=["parent", "child"], name="uniq_bom_link_parent_child"),
+            models.CheckConstraint(condition=~models.Q(parent=models.F("child")), name="bom_link_not_self"),
+        ]
+
+    def __str__(self):
+        return f"{self.parent_id} -> {self.child_id} (x{self.qty})"
+
 
+class BOMRollup(models.Model):
+    """
+    Precomputed BOM cost per (project, category), kept up to date
+    incrementally by BOM.save()/delete() and bulk imports, so project
+    totals never have to scan the BOM table.
+    Rebuild from scratch with `manage.py rebuild_bom_rollup`.
+    """
+    project = models.ForeignKey(Project,on_delete=models.CASCADE,related_name="bom_rollups")
+    category = models.CharField(max_length=200)
+    line_count = models.BigIntegerField(default=0)
+    priced_lines = models.BigIntegerField(default=0)
+    total_qty = models.BigIntegerField(default=0)
+    # sum(qty * price) over rows with a price; rows without one only count
+    # towards line_count
+    total_cost = models.DecimalField(max_digits=24,decimal_places=3,default=0)
+
+    class Meta:
+        ordering = ["category"]
+        constraints = [
+            models.UniqueConstraint(fields=["project", "category"], name="uniq_bom_rollup_project_category"),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id} / {self.category}: {self.total_cost}"
+
+    @staticmethod
+    def deltas(added=(), removed=()):
+        """
+        Turn BOM.rollup_values() tuples into
+        {(project_id, category): [lines, priced, qty, cost]}.
+        """
+        result = defaultdict(lambda: [0, 0, 0, Decimal(0)])
+        for sign, rows in ((1, added), (-1, removed)):
+            for row in rows:
+                if row is None:
+                    continue
+                project_id, category, qty, price = row
+                delta = result[(project_id, category)]
+                delta[0] += sign
+                delta[2] += sign * qty
+                if price is not None:
+                    delta[1] += sign
+                    delta[3] += sign * qty * Decimal(price)
+        return {key: value for key, value in result.items() if any(value)}
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """One UPDATE (or INSERT for a new category) per touched group."""
+        if not settings.BOM_ROLLUP_TABLE:
+            return
+        for (project_id, category), (lines, priced, qty, cost) in deltas.items():
+            changes = dict(
+                line_count=F("line_count") + lines,
+                priced_lines=F("priced_lines") + priced,
+                total_qty=F("total_qty") + qty,
+                total_cost=F("total_cost") + cost,
+            )
+            rows = cls.objects.filter(project_id=project_id, category=category)
+            if rows.update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        project_id=project_id, category=category, line_count=lines,
+                        priced_lines=priced, total_qty=qty, total_cost=cost,
+                    )
+            except IntegrityError:
+                # Another writer created the group first
+                rows.update(**changes)
+
+
+class ChangeRecord(models.Model):
+    """
+    One entry of the append-only task / BOM change history, written by
+    core.history in the transaction of the change; `changes` is
+    {"field": [old, new]}. Kept when the project is purged.
+    """
+    OBJECT_TYPES = [(history.TASK, "task"), (history.BOM, "bom")]
+    ACTIONS = [(history.CREATE, "create"), (history.UPDATE, "update"), (history.DELETE, "delete")]
+
+    # Covered by history_project_idx. No constraint and no cascade: the
+    # history outlives its project when the project is purged
+    project = models.ForeignKey(Project,on_delete=models.DO_NOTHING,db_constraint=False,
+                                related_name="change_records",db_index=False)
+    object_type = models.PositiveSmallIntegerField(choices=OBJECT_TYPES)
+    object_id = models.BigIntegerField()
+    action = models.PositiveSmallIntegerField(choices=ACTIONS)
+    changes = models.JSONField(default=dict,blank=True,encoder=DjangoJSONEncoder)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.SET_NULL,
+                             null=True,blank=True,related_name="+",db_index=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at","-id"]
+        indexes = [
+            models.Index(fields=["object_type", "object_id", "-created_at"], name="history_object_idx"),
+            models.Index(fields=["project", "-created_at"], name="history_project_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_object_type_display()} {self.object_id} {self.get_action_display()}"
+
+
+class TaskDigest(models.Model):
+    """
+    Overdue / due-soon tasks of one user as of a day, written by
+    `manage.py task_digest` (core.digest). `tasks` holds the most overdue
+    ones first, at most settings.TASK_DIGEST_MAX_TASKS; the counts cover all.
+    """
+    # Covered by digest_user_idx
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.CASCADE,
+                             related_name="task_digests",db_index=False)
+    as_of = models.DateField()
+    due_within_days = models.PositiveSmallIntegerField()
+    overdue_count = models.PositiveIntegerField(default=0)
+    due_soon_count = models.PositiveIntegerField(default=0)
+    tasks = models.JSONField(default=list,blank=True,encoder=DjangoJSONEncoder)
+    generated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-generated_at","-id"]
+        indexes = [
+            models.Index(fields=["user", "-generated_at"], name="digest_user_idx"),
+            models.Index(fields=["generated_at"], name="digest_generated_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.as_of}: {self.overdue_count} overdue, {self.due_soon_count} due soon"
@@ -0,0 +1,134 @@
+"""
+Fast project deletion.
+
+Project.delete() goes through Django's deletion collector, which loads
+every task and BOM line (and the BOMLink rows of each line) into memory
+before deleting anything, all in one long transaction.
+
+Here the project is first hidden (Project.deleted_at, filtered out by
+Project.objects) and its child rows are then removed with set-based
+
+    DELETE FROM t WHERE id IN (SELECT id FROM t WHERE project_id = %s LIMIT n)
+
+statements, one short transaction per batch: no row is loaded into
+Python and locks are only held for one batch at a time. The purge runs
+inline, in a background thread, or later with `manage.py purge_projects`
+(which also picks up purges interrupted by a restart).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArchivedTask, BOM, BOMLink, BOMRollup, Project, Task, TaskArchiveCount
+from .response_cache import bump_generation
+
+logger = logging.getLogger(__name__)
+
+# Deletion order: links reference BOM lines. ChangeRecord is not purged:
+# the audit history outlives the project
+CHILD_MODELS = (BOMLink, BOMRollup, BOM, Task, ArchivedTask, TaskArchiveCount)
+
+DELETE_BATCH_SQL = """
+DELETE FROM {table}
+WHERE id IN (SELECT id FROM {table} WHERE project_id = %s LIMIT %s)
+"""
+
+
+def delete_in_batches(model, project_id, batch_size=None, pause=None):
+    """Delete model rows of one project batch by batch. Returns the row count."""
+    batch_size = batch_size or settings.PROJECT_DELETE_BATCH_SIZE
+    pause = settings.PROJECT_DELETE_BATCH_PAUSE if pause is None else pause
+    sql = DELETE_BATCH_SQL.format(table=connection.ops.quote_name(model._meta.db_table))
+    total = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, [project_id, batch_size])
+            deleted = cursor.rowcount
+        total += deleted
+        if deleted < batch_size:
+            return total
+        if pause:
+            # Let other writers in between batches
+            time.sleep(pause)
+
+
+def soft_delete_project(project):
+    """
+    Hide the project at once. Its name gets a suffix so it can be reused
+    before the rows are purged.
+    """
+    suffix = f" [deleted #{project.pk}]"
+    Project.all_objects.filter(pk=project.pk, deleted_at__isnull=True).update(
+        deleted_at=timezone.now(),
+        name=project.name[:200 - len(suffix)] + suffix,
+        version=F("version") + 1,
+    )
+    bump_generation("project", project.pk)
+    bump_generation("user", project.owner_id)
+
+
+def purge_project(project_id, batch_size=None, pause=None):
+    """
+    Delete a project and all its rows without loading them.
+    Returns {"task": n, "bom": n, ...} deleted row counts.
+    """
+    counts = {
+        model._meta.model_name: delete_in_batches(model, project_id, batch_size, pause)
+        for model in CHILD_MODELS
+    }
+    owner_id = (Project.all_objects.filter(pk=project_id)
+                .values_list("owner_id", flat=True).first())
+    # Nothing left to collect, so this is a single DELETE
+    Project.all_objects.filter(pk=project_id).delete()
+    bump_generation("project", project_id)
+    # Keys by project id must not outlive it (ids can be reused on SQLite)
+    bump_generation("bom", project_id)
+    bump_generation("user", owner_id)
+    return counts
+
+
+def delete_project(project, background=False):
+    """
+    Hide the project, then purge it inline or (background=True) in a
+    daemon thread once the current transaction has committed.
+    """
+    soft_delete_project(project)
+    if background:
+        transaction.on_commit(lambda: start_background_purge(project.pk))
+        return None
+    return purge_project(project.pk)
+
+
+def start_background_purge(project_id):
+    thread = threading.Thread(
+        target=_purge_in_thread, args=(project_id,),
+        name=f"purge-project-{project_id}", daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def _purge_in_thread(project_id):
+    try:
+        purge_project(project_id)
+    except Exception:
+        # The project stays hidden; `manage.py purge_projects` retries it
+        logger.exception("Purging project %s failed", project_id)
+    finally:
+        connection.close()
+
+
+def purge_deleted_projects(batch_size=None, pause=None):
+    """Purge every soft-deleted project. Returns the purged project ids."""
+    project_ids = list(
+        Project.all_objects.filter(deleted_at__isnull=False)
+        .order_by("deleted_at").values_list("id", flat=True)
+    )
+    for project_id in project_ids:
+        purge_project(project_id, batch_size, pause)
+    return project_ids
@@ -0,0 +1,182 @@
+"""
+Manual task ordering with fractional rank keys.
+
+Task.rank is a base-36 string ([0-9a-z]) read as a fraction: "i" is
+0.5, "0i" is 0.014 and so on, compared as plain strings. Between any two
+keys there is always another one (keys never end in "0"), so moving a
+task writes that task's rank and nothing else.
+
+New tasks go to the end of their project by incrementing the last key
+at RANK_WIDTH digits, which keeps keys short. Repeated moves into the
+same gap make keys grow by about one digit per 5 moves; once a key
+passes TASK_RANK_MAX_LENGTH the project is rebalanced in the background,
+re-spacing all keys evenly at RANK_WIDTH digits.
+
+Only [0-9a-z] is used so string order is the same under any database
+collation.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+RANK_WIDTH = 6  # 36**6 ~ 2.2e9 evenly spaced slots
+
+logger = logging.getLogger(__name__)
+
+
+def _digit(key, i):
+    return DIGITS.index(key[i]) if i < len(key) else 0
+
+
+def midpoint(a, b):
+    """
+    A key strictly between a and b. a="" means the start, b=None the end.
+    a < b, and neither ends in "0".
+    """
+    if b is not None:
+        if a >= b:
+            raise ValueError(f"{a!r} is not before {b!r}")
+        n = 0
+        while _digit(a, n) == _digit(b, n):
+            n += 1
+        if n:
+            return b[:n] + midpoint(a[n:], b[n:])
+    low = _digit(a, 0)
+    high = DIGITS.index(b[0]) if b is not None else BASE
+    if high - low > 1:
+        return DIGITS[(low + high) // 2]
+    # Adjacent first digits
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[low] + midpoint(a[1:], None)
+
+
+def key_after(key):
+    """A short key after key, for appending at the end."""
+    if not key:
+        return DIGITS[BASE // 2]
+    digits = [_digit(key, i) for i in range(RANK_WIDTH)]
+    for i in reversed(range(RANK_WIDTH)):
+        if digits[i] < BASE - 1:
+            digits[i] += 1
+            return "".join(DIGITS[d] for d in digits[:i + 1])
+        digits[i] = 0
+    # The first RANK_WIDTH digits are all "z"
+    return midpoint(key, None)
+
+
+def spaced_keys(count):
+    """count evenly spaced keys of at most RANK_WIDTH digits, in order."""
+    width = RANK_WIDTH
+    while BASE ** width <= count:
+        width += 1
+    step = BASE ** width // (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value = i * step
+        chars = []
+        for _ in range(width):
+            value, d = divmod(value, BASE)
+            chars.append(DIGITS[d])
+        keys.append("".join(reversed(chars)).rstrip("0"))
+    return keys
+
+
+def next_rank(project_id):
+    """
+    Rank for a new task at the end of the project (one index lookup).
+    Only unique while the project row is locked, see append_ranks.
+    """
+    from .models import Task
+
+    last = (Task.objects.filter(project_id=project_id)
+            .order_by("-rank").values_list("rank", flat=True).first())
+    return key_after(last or "")
+
+
+def append_ranks(project_id, count):
+    """
+    Ranks for count new tasks at the end of the project, in order (bulk
+    inserts). Call inside a transaction: the project row stays locked
+    until it commits.
+    """
+    _lock_project(project_id)
+    ranks = []
+    rank = next_rank(project_id)
+    for _ in range(count):
+        ranks.append(rank)
+        rank = key_after(rank)
+    return ranks
+
+
+def _lock_project(project_id):
+    # Moves and rebalancing of one project take turns on the project row
+    from .models import Project
+
+    list(Project.all_objects.select_for_update()
+         .filter(pk=project_id).values_list("pk", flat=True))
+
+
+def move_task(task, before=None, after=None):
+    """
+    Place task right before the task `before` or right after the task
+    `after` (same project); at the end of the project if neither is given.
+    Writes only the moved row.
+    """
+    from .models import Task
+
+    with transaction.atomic():
+        _lock_project(task.project_id)
+        siblings = (Task.objects.filter(project_id=task.project_id)
+                    .exclude(pk=task.pk).values_list("rank", flat=True))
+        if after is not None:
+            high = siblings.filter(rank__gt=after.rank).order_by("rank").first()
+            task.rank = midpoint(after.rank, high)
+        elif before is not None:
+            low = siblings.filter(rank__lt=before.rank).order_by("-rank").first()
+            task.rank = midpoint(low or "", before.rank)
+        else:
+            task.rank = key_after(siblings.order_by("-rank").first() or "")
+        task.save(update_fields=["rank", "updated_at"])
+        if len(task.rank) > settings.TASK_RANK_MAX_LENGTH:
+            project_id = task.project_id
+            transaction.on_commit(lambda: start_background_rebalance(project_id))
+    return task
+
+
+def rebalance_project(project_id, batch_size=1000):
+    """Re-space all rank keys of a project evenly, keeping their order."""
+    from .models import Project, Task
+
+    with transaction.atomic():
+        _lock_project(project_id)
+        ids = list(Task.objects.filter(project_id=project_id)
+                   .order_by("rank", "id").values_list("id", flat=True))
+        tasks = [Task(id=task_id, rank=rank) for task_id, rank in zip(ids, spaced_keys(len(ids)))]
+        # bulk_update skips Task.save(): one CASE update per batch
+        Task.objects.bulk_update(tasks, ["rank"], batch_size=batch_size)
+        Project.touch(project_id)
+    return len(ids)
+
+
+def start_background_rebalance(project_id):
+    thread = threading.Thread(
+        target=_rebalance_in_thread, args=(project_id,),
+        name=f"rebalance-ranks-{project_id}", daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def _rebalance_in_thread(project_id):
+    try:
+        rebalance_project(project_id)
+    except Exception:
+        # Keys only stay long; `manage.py rebalance_task_ranks` can retry
+        logger.exception("Rebalancing task ranks of project %s failed", project_id)
+    finally:
+        connection.close()
@@ -0,0 +1,203 @@
+"""
+Fast JSON renderer for DRF responses, plus the bulk file formats.
+
+Uses orjson when it is installed and falls back to DRF's stock
+JSONRenderer otherwise, so the output bytes are the same either way:
+compact separators, UTF-8, Decimal -> float, datetimes ending in "Z".
+
+CSV, Arrow and XLSX renderers let views pick a bulk format with ?format=
+or the Accept header. Bulk exports stream their rows themselves
+(core.streaming); the renderers only render small data such as errors.
+"""
+import csv
+import io
+import math
+from importlib.util import find_spec
+from itertools import chain, compress, repeat
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# orjson writes datetimes with microseconds and "+00:00"; DRF writes them
+# with milliseconds and "Z". Pass them through to DRF's encoder instead.
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson is not None else 0
+)
+
+_drf_default = encoders.JSONEncoder().default
+
+
+def _float_differs(values):
+    """
+    True if one of these floats would not render like the stdlib encoder:
+    NaN / Infinity (DRF refuses them, orjson writes null) or a float that
+    repr() puts in exponent form (1e+16 and 1e-05 vs orjson's 1e16 and
+    0.00001).
+    """
+    if not all(map(math.isfinite, values)):
+        return True
+    magnitudes = list(filter(None, map(abs, values)))  # zeros print as 0.0
+    return bool(magnitudes) and (max(magnitudes) >= 1e16 or min(magnitudes) < 1e-4)
+
+
+def _has_odd_floats(data):
+    """
+    _float_differs() over every float nested in data's dicts, lists and
+    tuples. Walks one nesting level at a time with C-level iteration, so
+    a page of rows costs a fraction of a stdlib encode.
+    """
+    if isinstance(data, float):
+        return _float_differs([data])
+    dicts, sequences = [], []
+    if isinstance(data, dict):
+        dicts.append(data)
+    elif isinstance(data, (list, tuple)):
+        sequences.append(data)
+    while dicts or sequences:
+        values = list(chain(chain.from_iterable(map(dict.values, dicts)),
+                            chain.from_iterable(sequences)))
+        types = set(map(type, values))
+        if any(issubclass(t, float) for t in types):
+            if _float_differs(list(compress(values, map(isinstance, values, repeat(float))))):
+                return True
+        dicts = sequences = []
+        if any(issubclass(t, dict) for t in types):
+            dicts = list(compress(values, map(isinstance, values, repeat(dict))))
+        if any(issubclass(t, (list, tuple)) for t in types):
+            sequences = list(compress(values, map(isinstance, values, repeat((list, tuple)))))
+    return False
+
+
+def _orjson_default(obj):
+    value = _drf_default(obj)
+    # e.g. Decimal -> float: same checks as native floats; raising makes
+    # orjson give up and the caller fall back to the stdlib encoder
+    if isinstance(value, float) and _float_differs([value]):
+        raise TypeError("float needs the stdlib encoder")
+    return value
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for JSONRenderer, byte for byte: data orjson would
+    write differently (non-finite or exponent-form floats, integers over
+    64 bits) goes through the stdlib encoder instead.
+    Pretty-printed output (?format=json; indent=4, browsable API) still
+    goes through the stdlib encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if (orjson is None or not self.compact or self.ensure_ascii
+                or self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if _has_odd_floats(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_orjson_default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # Integers wider than 64 bits, unsupported types, odd floats
+            # from default(): the stdlib encoder renders or rejects them
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict-javascript-subset escaping as JSONRenderer
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class NDJSONRenderer(ORJSONRenderer):
+    """
+    Newline-delimited JSON (one object per line).
+    Streaming views build their own StreamingHttpResponse; this renderer
+    lets DRF accept `Accept: application/x-ndjson` and renders anything
+    else (errors, small lists) in the same format.
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if not isinstance(data, (list, tuple)):
+            data = [data]
+        return b"".join(super(NDJSONRenderer, self).render(item) + b"\n" for item in data)
+
+
+def _records(data):
+    """(column names, rows) for a dict or a list of dicts."""
+    if data is None:
+        return [], []
+    records = data if isinstance(data, (list, tuple)) else [data]
+    names = list(records[0]) if records else []
+    return names, [[record.get(name) for name in names] for record in records]
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        names, rows = _records(data)
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(names)
+        writer.writerows(rows)
+        return out.getvalue().encode(self.charset)
+
+
+def arrow_available():
+    """Checked without importing pyarrow (a slow import); see requirements.txt."""
+    return find_spec("pyarrow") is not None
+
+
+class ArrowStreamRenderer(BaseRenderer):
+    """Apache Arrow IPC stream format (columnar, binary). Needs pyarrow."""
+    media_type = "application/vnd.apache.arrow.stream"
+    format = "arrow"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import pyarrow as pa
+
+        names, rows = _records(data)
+        table = pa.Table.from_pylist([dict(zip(names, row)) for row in rows])
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+class XLSXRenderer(BaseRenderer):
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    format = "xlsx"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        from openpyxl import Workbook  # lazy, see BOMExportView
+
+        names, rows = _records(data)
+        wb = Workbook()
+        ws = wb.active
+        ws.append(names)
+        for row in rows:
+            ws.append([value if isinstance(value, (int, float, str)) or value is None else str(value)
+                       for value in row])
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        return buffer.getvalue()
+
+
+def bulk_renderers():
+    """Renderers of the bulk formats available on this server."""
+    return [CSVRenderer] + ([ArrowStreamRenderer] if arrow_available() else [])
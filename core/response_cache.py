@@ -0,0 +1,130 @@
+"""
+Versioned server-side cache for read endpoints.
+
+Cache keys embed generation numbers ("gen:user:<id>", "gen:project:<id>",
+"gen:bom:<id>") that are bumped on writes, so invalidation is one
+cache.incr() and old entries are simply never read again (they expire on
+their own).
+
+Misses are single-flight: one worker recomputes while the others wait
+briefly for its result instead of all hitting the database at once.
+Values that get stored are computed from the primary: a replica could
+still lag behind the write that bumped the generation, and the stale
+result would then be served to everyone until it expires.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .db_router import primary_reads
+
+MISSING = object()
+
+# Hit / miss counters, shared through the cache backend so every worker
+# reports into the same numbers (see ResponseCacheStats view).
+STAT_KEYS = ("hits", "misses", "coalesced", "fallbacks")
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _gen_key(kind, obj_id):
+    return f"gen:{kind}:{obj_id}"
+
+
+def _seed():
+    # A fresh starting point if the counter was evicted; never reuses an
+    # older generation, so stale entries can't come back to life.
+    return time.time_ns()
+
+
+def get_generation(kind, obj_id):
+    cache = get_cache()
+    key = _gen_key(kind, obj_id)
+    gen = cache.get(key)
+    if gen is None:
+        cache.add(key, _seed(), None)
+        gen = cache.get(key)
+    return gen
+
+
+def bump_generation(kind, *obj_ids):
+    """
+    Invalidate everything cached under these generations. Inside a
+    transaction the bump waits for the commit, otherwise a reader could
+    cache pre-commit data under the new generation.
+    """
+    ids = {i for i in obj_ids if i is not None}
+    if ids:
+        transaction.on_commit(lambda: _bump(kind, ids))
+
+
+def _bump(kind, obj_ids):
+    cache = get_cache()
+    for obj_id in obj_ids:
+        key = _gen_key(kind, obj_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _seed(), None)
+
+
+def _count(stat):
+    cache = get_cache()
+    key = f"stats:{stat}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_stats():
+    cache = get_cache()
+    values = cache.get_many([f"stats:{s}" for s in STAT_KEYS])
+    stats = {s: values.get(f"stats:{s}", 0) for s in STAT_KEYS}
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+    return stats
+
+
+def get_or_compute(key, compute, timeout=None):
+    """
+    Return the cached value for key, or compute() it exactly once across
+    concurrent requests and cache the result.
+    """
+    cache = get_cache()
+    timeout = settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout
+
+    value = cache.get(key, MISSING)
+    if value is not MISSING:
+        _count("hits")
+        return value
+    _count("misses")
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+        try:
+            with primary_reads():
+                value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    # Someone else is recomputing: wait for their result
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.02)
+        value = cache.get(key, MISSING)
+        if value is not MISSING:
+            _count("coalesced")
+            return value
+        if cache.get(lock_key) is None:
+            break
+    # Holder failed or is too slow; compute without caching (a replica
+    # is fine here, nothing is stored)
+    _count("fallbacks")
+    return compute()
@@ -0,0 +1,94 @@
+"""
+BOM cost rollups computed in the database.
+
+Cost of a line is qty * price. Lines without a price are counted
+(unpriced_lines) but contribute nothing to total_cost, instead of
+silently turning the whole sum into NULL.
+"""
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import BOM, BOMRollup
+
+COST_FIELD = DecimalField(max_digits=24, decimal_places=3)
+
+ROLLUP_AGGREGATES = {
+    "line_count": Count("id"),
+    "priced_lines": Count("id", filter=Q(price__isnull=False)),
+    "total_qty": Coalesce(Sum("qty"), 0),
+    "total_cost": Coalesce(
+        Sum(F("qty") * F("price"), filter=Q(price__isnull=False), output_field=COST_FIELD),
+        Value(0), output_field=COST_FIELD,
+    ),
+}
+
+# ?group=... for the cross-project rollup -> BOM column
+GROUP_COLUMNS = {
+    "project": "project_id",
+    "category": "category",
+    "model": "model",
+}
+
+
+def with_unpriced(row):
+    row["unpriced_lines"] = row["line_count"] - row["priced_lines"]
+    return row
+
+
+def live_rollup(qs, group_by=None):
+    """
+    Aggregate a BOM queryset in SQL.
+    group_by=None returns one dict, otherwise one dict per group with the
+    group value under "key", most expensive first.
+    """
+    if group_by is None:
+        return with_unpriced(qs.order_by().aggregate(**ROLLUP_AGGREGATES))
+    rows = (
+        qs.order_by()
+        .values(key=F(group_by))
+        .annotate(**ROLLUP_AGGREGATES)
+        .order_by("-total_cost", "key")
+    )
+    return [with_unpriced(row) for row in rows]
+
+
+def table_rollup(project_id):
+    """Per-category rollup of one project read from BOMRollup."""
+    rows = (
+        BOMRollup.objects.filter(project_id=project_id, line_count__gt=0)
+        .order_by("-total_cost", "category")
+        .values("line_count", "priced_lines", "total_qty", "total_cost", key=F("category"))
+    )
+    return [with_unpriced(row) for row in rows]
+
+
+def sum_groups(groups):
+    total = {"line_count": 0, "priced_lines": 0, "total_qty": 0, "total_cost": 0}
+    for row in groups:
+        for name in total:
+            total[name] += row[name]
+    return with_unpriced(total)
+
+
+def rebuild_rollup(project_ids=None):
+    """
+    Recompute BOMRollup from the BOM table (all projects or some of them)
+    with one grouped query per call.
+    """
+    bom = BOM.objects.all()
+    rollups = BOMRollup.objects.all()
+    if project_ids is not None:
+        bom = bom.filter(project_id__in=project_ids)
+        rollups = rollups.filter(project_id__in=project_ids)
+    groups = (
+        bom.order_by()
+        .values("project_id", "category")
+        .annotate(**ROLLUP_AGGREGATES)
+    )
+    with transaction.atomic():
+        rollups.delete()
+        BOMRollup.objects.bulk_create(
+            (BOMRollup(**group) for group in groups.iterator(chunk_size=2000)),
+            batch_size=1000,
+        )
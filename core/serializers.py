@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Project,Task,BOM
+from .models import Project,Task,BOM,BOMLink,ChangeRecord,TaskDigest
 
 class TaskSerializer(serializers.ModelSerializer):
     
@@ -23,3 +23,76 @@ class ProjectSerializer(serializers.ModelSerializer):
         model = Project
         fields ="__all__"
 
+
+class BOMCostSerializer(serializers.Serializer):
+    """One BOM cost rollup row (see core.rollup)."""
+    key = serializers.CharField(required=False)
+    line_count = serializers.IntegerField()
+    priced_lines = serializers.IntegerField()
+    unpriced_lines = serializers.IntegerField()
+    total_qty = serializers.IntegerField()
+    total_cost = serializers.DecimalField(max_digits=24, decimal_places=3)
+
+class WhatIfScenarioSerializer(serializers.Serializer):
+    """One price scenario for the BOM what-if engine (see core.whatif)."""
+    name = serializers.CharField(required=False, max_length=200)
+    category_pct = serializers.DictField(child=serializers.FloatField(min_value=-100), required=False)
+    model_price = serializers.DictField(child=serializers.FloatField(min_value=0), required=False)
+    units = serializers.IntegerField(min_value=1, default=1)
+
+class WhatIfRequestSerializer(serializers.Serializer):
+    scenarios = serializers.ListField(
+        child=WhatIfScenarioSerializer(), min_length=1, max_length=1000
+    )
+
+class BOMLinkSerializer(serializers.ModelSerializer):
+    # project is taken from the URL, like BOMSerializer
+    project = serializers.PrimaryKeyRelatedField(read_only=True)
+    class Meta:
+        model = BOMLink
+        fields = "__all__"
+
+class BOMExplodedLineSerializer(serializers.Serializer):
+    """One leaf part of an exploded multi-level BOM (see core.bom_tree)."""
+    id = serializers.IntegerField()
+    category = serializers.CharField()
+    model = serializers.CharField()
+    description = serializers.CharField()
+    unit_price = serializers.DecimalField(max_digits=13, decimal_places=3, allow_null=True)
+    total_qty = serializers.IntegerField()
+    total_cost = serializers.DecimalField(max_digits=24, decimal_places=3, allow_null=True)
+    depth = serializers.IntegerField()
+
+class ProjectCloneSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=200, required=False)
+    reset_status = serializers.BooleanField(default=False)
+
+    def validate_name(self, value):
+        if Project.objects.filter(name=value).exists():
+            raise serializers.ValidationError("project with this name already exists.")
+        return value
+
+class TaskMoveSerializer(serializers.Serializer):
+    # id of a task of the same project; neither = move to the end
+    before = serializers.IntegerField(required=False)
+    after = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if "before" in attrs and "after" in attrs:
+            raise serializers.ValidationError("Give either before or after, not both.")
+        return attrs
+
+class ChangeRecordSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source="get_object_type_display")
+    action = serializers.CharField(source="get_action_display")
+    user = serializers.ReadOnlyField(source="user.username",default=None)
+
+    class Meta:
+        model = ChangeRecord
+        fields = ["id","type","object_id","project","action","changes","user","created_at"]
+
+
+class TaskDigestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskDigest
+        fields = ["id","as_of","due_within_days","overdue_count","due_soon_count","tasks","generated_at"]
@@ -1,3 +1,1459 @@
-from django.test import TestCase
+import base64
+import datetime
+import gzip
+import io
+import json
+import threading
+import zipfile
+import zlib
+from concurrent.futures.process import BrokenProcessPool
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.core.management import CommandError, call_command
+from django.core.paginator import EmptyPage
+from django.db import DatabaseError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import (admission, bom_import, bom_tree, compression, counting, db_router, history, ranking,
+               whatif)
+from .bom_tree import explode
+from .management.commands import bench_startup
+from .counting import EstimatedCountPaginator
+from .formatters import BOM_ROWS, TASK_ROWS
+from .models import (ArchivedTask, BOM, BOMLink, BOMRollup, ChangeRecord, Project, Task,
+                     TaskArchiveCount, TaskDigest)
+from .parsers import ORJSONParser
+from .purge import delete_project, purge_deleted_projects, soft_delete_project
+from .ranking import midpoint, move_task, spaced_keys
+from .renderers import ORJSONRenderer, arrow_available
+from .response_cache import get_cache
+from .rollup import live_rollup, table_rollup
+from .serializers import BOMSerializer, ProjectCloneSerializer, TaskSerializer
+from .views import DashboardBootstrap
 
 # Create your tests here.
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.project = Project.objects.create(owner=self.user, name="P1")
+        self.client.force_login(self.user)
+
+
+# --- user-026: orjson renderer and parser ---
+
+class ORJSONRendererTests(TestCase):
+    def assertSameOutput(self, data):
+        try:
+            expected = JSONRenderer().render(data)
+        except ValueError:
+            with self.assertRaises(ValueError):
+                ORJSONRenderer().render(data)
+            return
+        self.assertEqual(ORJSONRenderer().render(data), expected, data)
+
+    def test_rows(self):
+        self.assertSameOutput([
+            {"id": 1, "title": "ünïcode \u2028", "due": datetime.date(2026, 1, 2), "done": None,
+             "at": timezone.now(), "price": Decimal("1.500"), "tags": ("a", "b")},
+        ])
+
+    def test_floats(self):
+        for value in (0.0, -0.0, 1.5, 0.0001, 1e-05, 1e15, 1e16, -1.5e16, 1e300, 5e-324):
+            self.assertSameOutput({"value": value})
+            self.assertSameOutput([[value]])
+        self.assertSameOutput(1e16)
+
+    def test_non_finite_floats_are_rejected(self):
+        for value in (float("nan"), float("inf"), Decimal("NaN")):
+            with self.assertRaises(ValueError):
+                ORJSONRenderer().render({"nested": [{"value": value}]})
+
+    def test_wide_integers(self):
+        self.assertSameOutput({"value": 2 ** 70})
+        self.assertSameOutput({"value": -2 ** 64})
+
+    def test_decimal_floats(self):
+        self.assertSameOutput({"value": Decimal("1E+20")})
+        self.assertSameOutput({"value": Decimal("0.00001")})
+
+    def test_parser_round_trip(self):
+        body = ORJSONRenderer().render({"a": [1, 2.5, "x"]})
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), {"a": [1, 2.5, "x"]})
+
+
+# --- user-027: serializer-free read path ---
+
+class RowFormatterTests(APITestCase):
+    def test_task_rows_match_serializer(self):
+        for i in range(4):
+            Task.objects.create(project=self.project, title=f"t{i}",
+                                due_date=datetime.date(2026, 1, i + 1) if i % 2 else None)
+        tasks = Task.objects.order_by("id")
+        rows = TASK_ROWS.format(tasks.values_list(*TASK_ROWS.columns))
+        self.assertEqual(JSONRenderer().render(rows),
+                         JSONRenderer().render(TaskSerializer(tasks, many=True).data))
+
+    def test_bom_rows_match_serializer(self):
+        BOM.objects.create(project=self.project, category="c", model="m1", qty=2, price=Decimal("1.5"))
+        BOM.objects.create(project=self.project, category="c", model="m2", qty=1, price=None)
+        items = BOM.objects.order_by("id")
+        rows = BOM_ROWS.format(items.values_list(*BOM_ROWS.columns))
+        self.assertEqual(JSONRenderer().render(rows),
+                         JSONRenderer().render(BOMSerializer(items, many=True).data))
+
+    def test_bom_list_response_matches_serializer(self):
+        BOM.objects.create(project=self.project, category="c", model="m1", qty=2, price=Decimal("1.5"))
+        response = self.client.get(f"/api/ver2/projects/{self.project.id}/bom/")
+        expected = BOMSerializer(self.project.bom_items.all(), many=True).data
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+
+# --- user-029: conditional GET ---
+
+class ConditionalGetTests(APITestCase):
+    def test_not_modified_until_project_changes(self):
+        url = f"/api/ver2/projects/{self.project.id}/"
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        Task.objects.create(project=self.project, title="t")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_stale_project_save_does_not_lower_version(self):
+        stale = Project.objects.get(pk=self.project.pk)
+        Task.objects.create(project=self.project, title="a")
+        Task.objects.create(project=self.project, title="b")
+        seen = Project.objects.get(pk=self.project.pk).version
+        stale.description = "edited"
+        stale.save()
+        self.assertEqual(stale.version, seen + 1)
+        self.assertEqual(Project.objects.get(pk=self.project.pk).version, seen + 1)
+        stale.save(update_fields=["description"])
+        self.assertEqual(Project.objects.get(pk=self.project.pk).version, seen + 2)
+
+    def test_etag_changes_after_project_update(self):
+        url = f"/api/ver2/projects/{self.project.id}/"
+        Task.objects.create(project=self.project, title="a")
+        etag = self.client.get(url)["ETag"]
+        self.project.description = "stale instance"
+        self.project.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_representation(self):
+        url = f"/api/ver2/projects/{self.project.id}/bom/"
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url + "?stream=1", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+# --- user-030: response cache generations ---
+
+class ResponseCacheTests(APITestCase):
+    def test_project_list_invalidated_by_task_write(self):
+        url = "/api/ver2/projects/"
+        self.assertEqual(self.client.get(url).json()["result"][0]["tasks"], [])
+        with self.assertNumQueries(2):  # session + user; the page comes from the cache
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project=self.project, title="t")
+        self.assertEqual(len(self.client.get(url).json()["result"][0]["tasks"]), 1)
+
+    def test_overview_invalidated_by_task_write(self):
+        url = f"/api/ver2/projects/{self.project.id}/overview/"
+        self.assertEqual(self.client.get(url).json()["total_tasks"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project=self.project, title="t")
+        self.assertEqual(self.client.get(url).json()["total_tasks"], 1)
+
+    def test_bump_waits_for_commit(self):
+        url = f"/api/ver2/projects/{self.project.id}/overview/"
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Task.objects.create(project=self.project, title="t")
+            self.assertEqual(self.client.get(url).json()["total_tasks"], 0)
+        self.assertTrue(callbacks)
+
+
+# --- user-031: dashboard bootstrap ---
+
+class DashboardBootstrapTests(APITestCase):
+    url = "/api/ver2/bootstrap/"
+
+    def setUp(self):
+        super().setUp()
+        self.second = Project.objects.create(owner=self.user, name="P2")
+        Task.objects.create(project=self.project, title="a", status="DONE")
+        Task.objects.create(project=self.project, title="b")
+        Task.objects.create(project=self.second, title="c")
+
+    def test_all_sections_in_fixed_queries(self):
+        # session, user, projects, overview (3 on a cache miss), tasks
+        with self.assertNumQueries(7):
+            data = self.client.get(self.url).json()
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+        self.assertEqual(data["user"]["username"], "alice")
+        self.assertEqual([p["name"] for p in data["projects"]], ["P1", "P2"])
+        self.assertEqual(data["active_project"], self.project.id)
+        self.assertEqual((data["overview"]["total_tasks"], data["overview"]["by_status"]["DONE"]), (2, 1))
+        self.assertEqual(sorted(t["title"] for t in data["tasks"]["results"]), ["a", "b"])
+
+    def test_partial_refresh(self):
+        data = self.client.get(self.url, {"project": self.second.id, "sections": "tasks"}).json()
+        self.assertEqual(set(data), {"active_project", "tasks"})
+        self.assertEqual([t["title"] for t in data["tasks"]["results"]], ["c"])
+        data = self.client.get(self.url, {"project": self.second.id, "sections": "overview"}).json()
+        self.assertEqual(data["overview"]["total_tasks"], 1)
+
+    def test_page_size_is_clamped(self):
+        data = self.client.get(self.url, {"sections": "tasks", "page_size": 10**6}).json()
+        self.assertEqual(data["tasks"]["page_size"], DashboardBootstrap.MAX_PAGE_SIZE)
+
+    def test_foreign_project_and_anonymous(self):
+        other = Project.objects.create(owner=User.objects.create_user("bob"), name="B")
+        response = self.client.get(self.url, {"project": other.id})
+        self.assertEqual(response.status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).json(), {"user": {"is_authenticated": False}})
+
+
+# --- user-033: BOM what-if ---
+
+class BOMWhatIfTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        whatif._cache.clear()
+        self.url = f"/api/ver2/projects/{self.project.id}/bom/what-if/"
+
+    def add(self, category, model, qty, price):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BOM.objects.create(project=self.project, category=category, model=model, qty=qty,
+                                      price=price)
+
+    def expected(self, scenario):
+        # Decimal reference: unit price rounded half up to 3 places, times qty and units
+        total, by_category = Decimal(0), {}
+        with localcontext() as context:
+            context.prec = 60
+            for line in BOM.objects.filter(project=self.project):
+                price = line.price or Decimal(0)
+                if line.model in scenario.get("model_price", {}):
+                    price = Decimal(str(scenario["model_price"][line.model]))
+                else:
+                    pct = Decimal(str(scenario.get("category_pct", {}).get(line.category, 0)))
+                    price = price * (1 + pct / 100)
+                price = price.quantize(Decimal("0.001"), rounding=ROUND_HALF_UP)
+                cost = price * line.qty * scenario.get("units", 1)
+                total += cost
+                by_category[line.category] = by_category.get(line.category, Decimal(0)) + cost
+        return f"{total:.3f}", {c: f"{v:.3f}" for c, v in by_category.items()}
+
+    def run_scenarios(self, scenarios):
+        response = self.client.post(self.url, {"scenarios": scenarios}, content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["results"]
+
+    def test_baseline_matches_rollup(self):
+        self.add("Mech", "M-1", 3, Decimal("0.1"))
+        self.add("Mech", "M-2", 7, Decimal("12.345"))
+        self.add("Elec", "E-1", 7, None)
+        baseline = self.run_scenarios([{}])[0]
+        rollup = self.client.get(f"/api/ver2/projects/{self.project.id}/bom/rollup/").json()
+        self.assertEqual(baseline["total_cost"], rollup["total"]["total_cost"])
+        self.assertEqual(baseline["by_category"],
+                         {row["key"]: row["total_cost"] for row in rollup["by_category"]})
+
+    def test_baseline_is_exact_beyond_float_precision(self):
+        # 9999999.999 * 2_000_000 + 0.003 has 17 significant digits, more
+        # than a float holds (SQLite's own SUM is lossy here, Postgres is not)
+        self.add("Mech", "M-1", 2_000_000, Decimal("9999999.999"))
+        self.add("Mech", "M-2", 3, Decimal("0.001"))
+        baseline = self.run_scenarios([{}])[0]
+        self.assertEqual(baseline["total_cost"], "19999999998000.003")
+        self.assertEqual((baseline["total_cost"], baseline["by_category"]), self.expected({}))
+
+    def test_scenarios_match_decimal_reference(self):
+        self.add("Mech", "M-1", 3, Decimal("0.105"))
+        self.add("Mech", "M-2", 11, Decimal("12.345"))
+        self.add("Elec", "E-1", 5, Decimal("0.015"))
+        self.add("Elec", "E-2", 2, None)
+        scenarios = [
+            {"category_pct": {"Mech": 10, "Elec": -33.3}},
+            {"name": "half", "category_pct": {"Mech": 12.5}, "units": 250},
+            {"model_price": {"E-2": 1.0005, "M-1": 0.1}, "category_pct": {"Mech": -100}},
+            {"category_pct": {"Other": 50}, "units": 3},
+        ]
+        results = self.run_scenarios(scenarios)
+        self.assertEqual([r["name"] for r in results],
+                         ["baseline", "scenario 1", "half", "scenario 3", "scenario 4"])
+        for scenario, result in zip([{}] + scenarios, results):
+            self.assertEqual((result["total_cost"], result["by_category"]), self.expected(scenario),
+                             scenario)
+
+    def test_int64_overflow_falls_back_to_exact_integers(self):
+        self.add("Mech", "M-1", 4_000_000, Decimal("9999999999.999"))
+        scenario = {"category_pct": {"Mech": 0.5}, "units": 10**9}
+        columns = whatif.load_columns(self.project.id)
+        result = columns.evaluate([scenario])[1]
+        self.assertEqual((result["total_cost"], result["by_category"]), self.expected(scenario))
+
+    def test_only_bom_writes_invalidate_cached_columns(self):
+        line = self.add("Mech", "M-1", 1, Decimal("1.000"))
+        columns = whatif.load_columns(self.project.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project=self.project, title="t")
+        self.assertIs(whatif.load_columns(self.project.id), columns)
+        with self.captureOnCommitCallbacks(execute=True):
+            line.qty = 2
+            line.save()
+        self.assertIsNot(whatif.load_columns(self.project.id), columns)
+        self.assertEqual(self.run_scenarios([{}])[0]["total_cost"], "2.000")
+
+    def test_cache_is_size_bounded(self):
+        second = Project.objects.create(owner=self.user, name="P2")
+        self.add("Mech", "M-1", 1, Decimal("1.000"))
+        BOM.objects.create(project=second, category="Mech", model="M-1", qty=1, price=1)
+        size = whatif.load_columns(self.project.id).nbytes
+        with override_settings(WHATIF_CACHE_BYTES=size + size // 2):
+            whatif._cache.clear()
+            first = whatif.load_columns(self.project.id)
+            whatif.load_columns(second.id)
+            self.assertEqual(list(whatif._cache.entries), [second.id])
+            self.assertLessEqual(whatif._cache.total, size + size // 2)
+            self.assertIsNot(whatif.load_columns(self.project.id), first)
+        with override_settings(WHATIF_CACHE_BYTES=size - 1):
+            whatif._cache.clear()
+            whatif.load_columns(self.project.id)
+            self.assertEqual(whatif._cache.total, 0)
+
+
+# --- user-034: multi-level BOM explosion ---
+
+class BOMExplodeTests(APITestCase):
+    def line(self, model, qty=1, price=None):
+        return BOM.objects.create(project=self.project, category="c", model=model, qty=qty, price=price)
+
+    def link(self, parent, child, qty=1):
+        return BOMLink.objects.create(project=self.project, parent=parent, child=child, qty=qty)
+
+    def totals(self, leaves):
+        return {line["model"]: line["total_qty"] for line in leaves}
+
+    def test_shared_subassembly_sums_over_paths(self):
+        top = self.line("top", qty=2)
+        left, right = self.line("left"), self.line("right")
+        shared = self.line("shared")
+        bolt = self.line("bolt", price=Decimal("0.5"))
+        self.link(top, left, 3)
+        self.link(top, right, 1)
+        self.link(left, shared, 2)
+        self.link(right, shared, 5)
+        self.link(shared, bolt, 4)
+        loose = self.line("loose", qty=7)
+        leaves, cycles, truncated = explode(self.project.id)
+        # 2 x (3x2 + 1x5) x 4
+        self.assertEqual(self.totals(leaves), {"bolt": 88, "loose": 7})
+        bolt_line = next(line for line in leaves if line["id"] == bolt.id)
+        self.assertEqual((bolt_line["total_cost"], bolt_line["depth"]), (Decimal("44.0"), 3))
+        self.assertEqual(next(line for line in leaves if line["id"] == loose.id)["depth"], 0)
+        self.assertEqual((cycles, truncated), (0, 0))
+
+    def test_one_query_per_level(self):
+        parent = self.line("top")
+        for depth in range(5):
+            child = self.line(f"l{depth}")
+            self.link(parent, child, 2)
+            parent = child
+        # cycle links + tops, 6 leaf and 5 expand levels, leaf rows
+        with self.assertNumQueries(2 + 6 + 5 + 1):
+            leaves, _, _ = explode(self.project.id)
+        self.assertEqual(self.totals(leaves), {"l4": 32})
+
+    def test_cycle_links_are_cut(self):
+        top, a, b = self.line("top"), self.line("a"), self.line("b")
+        part = self.line("part")
+        self.link(top, a)
+        self.link(top, part, 3)
+        self.link(a, b)
+        self.link(b, a)  # bypasses the API's would_create_cycle check
+        leaves, cycles, truncated = explode(self.project.id)
+        self.assertEqual(self.totals(leaves), {"part": 3})
+        self.assertEqual((cycles, truncated), (2, 0))
+
+    def test_max_depth_truncates(self):
+        parent = top = self.line("top")
+        for depth in range(4):
+            child = self.line(f"l{depth}")
+            self.link(parent, child)
+            parent = child
+        self.link(top, self.line("near"), 2)
+        leaves, cycles, truncated = explode(self.project.id, max_depth=2)
+        self.assertEqual(self.totals(leaves), {"near": 2})
+        self.assertEqual((cycles, truncated), (0, 1))
+        leaves, _, truncated = explode(self.project.id, max_depth=4)
+        self.assertEqual((self.totals(leaves), truncated), ({"near": 2, "l3": 1}, 0))
+
+    def test_wide_frontier_is_chunked(self):
+        top = self.line("top")
+        shared = self.line("shared")
+        for i in range(5):
+            mid = self.line(f"m{i}")
+            self.link(top, mid, i + 1)
+            self.link(mid, shared, 2)
+        with mock.patch.object(bom_tree, "FRONTIER_CHUNK", 2):
+            leaves, _, _ = explode(self.project.id)
+        self.assertEqual(self.totals(leaves), {"shared": 30})
+
+    def test_endpoint(self):
+        top = self.line("top", qty=2)
+        self.link(top, self.line("part", price=Decimal("1.25")), 3)
+        data = self.client.get(f"/api/ver2/projects/{self.project.id}/bom/explode/").json()
+        self.assertEqual((data["leaf_count"], data["cycles"], data["truncated"]), (1, 0, 0))
+        self.assertEqual(data["leaves"][0]["total_qty"], 6)
+
+
+# --- user-035: parts search ---
+
+class PartSearchTests(APITestCase):
+    url = "/api/ver2/parts/"
+
+    def setUp(self):
+        super().setUp()
+        second = Project.objects.create(owner=self.user, name="P2")
+        foreign = Project.objects.create(owner=User.objects.create_user("bob"), name="B")
+        deleted = Project.objects.create(owner=self.user, name="gone")
+        for project, model, description in (
+            (self.project, "RES-10K", "resistor 10k"),
+            (self.project, "CAP-1U", "ceramic capacitor"),
+            (second, "res-22k", "Resistor 22k"),
+            (second, "MOT-1", "motor with res-10k shunt"),
+            (foreign, "RES-10K", "resistor"),
+            (deleted, "RES-10K", "resistor"),
+        ):
+            BOM.objects.create(project=project, category="c", model=model, description=description)
+        Project.all_objects.filter(pk=deleted.pk).update(deleted_at=timezone.now())
+        self.second = second
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_substring_fields_across_own_projects(self):
+        data = self.search(q="res-", field="model")
+        self.assertEqual(sorted(r["model"] for r in data["results"]), ["RES-10K", "res-22k"])
+        self.assertEqual(data["project_ids"], [self.project.id, self.second.id])
+        data = self.search(q="RESISTOR", field="description")
+        self.assertEqual(sorted(r["model"] for r in data["results"]), ["RES-10K", "res-22k"])
+        data = self.search(q="res-10k")
+        self.assertEqual(sorted(r["model"] for r in data["results"]), ["MOT-1", "RES-10K"])
+        self.assertEqual(data["total_items"], 2)
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search needs PostgreSQL")
+    def test_text_mode(self):
+        data = self.search(q="ceramic -resistor", mode="text")
+        self.assertEqual([r["model"] for r in data["results"]], ["CAP-1U"])
+
+    def test_pagination(self):
+        data = self.search(q="res", page_size=2, page=2)
+        self.assertEqual((data["total_items"], data["total_pages"], len(data["results"])), (3, 2, 1))
+        self.assertEqual(self.search(q="res", page_size=2, page=9)["results"], [])
+
+    def test_validation(self):
+        for params in ({"q": "re"}, {"q": "res", "field": "title"}, {"q": "res", "mode": "regex"}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+    @skipUnless(connection.vendor == "postgresql", "trigram / tsvector indexes are PostgreSQL only")
+    def test_lookups_use_the_gin_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        queries = (
+            (BOM.objects.filter(model__icontains="res"), "bom_model_trgm"),
+            (BOM.objects.filter(description__icontains="res"), "bom_description_trgm"),
+            (BOM.objects.annotate(search=SearchVector("model", "description", config="simple"))
+             .filter(search=SearchQuery("res", config="simple", search_type="websearch")),
+             "bom_search_vector"),
+        )
+        for queryset, index in queries:
+            self.assertIn(index, queryset.explain())
+
+
+# --- user-036: project cloning ---
+
+class ProjectCloneTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = f"/api/ver2/projects/{self.project.id}/clone/"
+        self.other = Project.objects.create(owner=self.user, name="other")
+        Task.objects.create(project=self.project, title="a", status="DONE")
+        Task.objects.create(project=self.project, title="b")
+        # Interleave another project's lines so old and new ids do not line up
+        self.top = BOM.objects.create(project=self.project, category="Mech", model="TOP", qty=1,
+                                      price=Decimal("10.500"))
+        BOM.objects.create(project=self.other, category="Mech", model="X")
+        self.sub = BOM.objects.create(project=self.project, category="Elec", model="SUB", qty=4,
+                                      price=Decimal("0.125"))
+        BOM.objects.create(project=self.project, category="Elec", model="NOPRICE", qty=2)
+        BOMLink.objects.create(project=self.project, parent=self.top, child=self.sub, qty=3)
+
+    def clone(self, **body):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, body, content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def test_copies_all_child_rows(self):
+        data = self.clone(name="Copy")
+        self.assertEqual((data["tasks"], data["bom_items"], data["bom_links"]), (2, 3, 1))
+        clone = Project.objects.get(pk=data["id"])
+        self.assertEqual(clone.name, "Copy")
+        self.assertEqual(
+            list(clone.tasks.order_by("rank").values_list("title", "status", "rank")),
+            list(self.project.tasks.order_by("rank").values_list("title", "status", "rank")),
+        )
+        columns = ("category", "model", "qty", "price")
+        self.assertEqual(
+            sorted(BOM.objects.filter(project=clone).values_list(*columns)),
+            sorted(BOM.objects.filter(project=self.project).values_list(*columns)),
+        )
+        link = BOMLink.objects.get(project=clone)
+        self.assertEqual((link.parent.model, link.child.model, link.qty), ("TOP", "SUB", 3))
+        self.assertEqual({link.parent.project_id, link.child.project_id}, {clone.id})
+
+    def test_query_count_does_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            self.clone()
+        for i in range(20):
+            Task.objects.create(project=self.project, title=f"t{i}")
+            line = BOM.objects.create(project=self.project, category="Mech", model=f"M{i}")
+            BOMLink.objects.create(project=self.project, parent=self.top, child=line)
+        with CaptureQueriesContext(connection) as large:
+            data = self.clone()
+        self.assertEqual((data["tasks"], data["bom_items"], data["bom_links"]), (22, 23, 21))
+        self.assertEqual(len(large), len(small))
+
+    def test_rollup_matches_source_and_lines(self):
+        clone_id = self.clone()["id"]
+        copied = table_rollup(clone_id)
+        self.assertEqual(copied, table_rollup(self.project.id))
+        self.assertEqual(copied, live_rollup(BOM.objects.filter(project_id=clone_id), "category"))
+        rollup = self.client.get(f"/api/ver2/projects/{clone_id}/bom/rollup/").json()
+        self.assertEqual(rollup["total"]["total_cost"], "11.000")
+
+    def test_reset_status_and_automatic_names(self):
+        first = self.clone(reset_status=True)
+        self.assertEqual(first["name"], "P1 (copy)")
+        self.assertEqual(set(Task.objects.filter(project_id=first["id"]).values_list("status", flat=True)),
+                         {"TODO"})
+        self.assertEqual(self.clone()["name"], "P1 (copy 2)")
+        response = self.client.post(self.url, {"name": "other"}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        # Taken between validation and insert: the unique index decides
+        with mock.patch.object(ProjectCloneSerializer, "validate_name", lambda self, value: value):
+            response = self.client.post(self.url, {"name": "other"}, content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+
+    def test_cached_reads_and_versions_stay_consistent(self):
+        self.client.get("/api/ver2/projects/")
+        source_version = Project.objects.get(pk=self.project.pk).version
+        clone_id = self.clone()["id"]
+        names = [p["name"] for p in self.client.get("/api/ver2/projects/").json()["result"]]
+        self.assertIn("P1 (copy)", names)
+        # Cloning only reads the source
+        self.assertEqual(Project.objects.get(pk=self.project.pk).version, source_version)
+        url = f"/api/ver2/projects/{clone_id}/overview/"
+        response = self.client.get(url)
+        self.assertEqual(response.json()["total_tasks"], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project_id=clone_id, title="c")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total_tasks"], 3)
+
+
+# --- user-037: soft delete and batched purge ---
+
+@override_settings(PROJECT_DELETE_BATCH_SIZE=3, PROJECT_DELETE_BATCH_PAUSE=0)
+class PurgeTests(APITestCase):
+    def populate(self, project):
+        for i in range(7):
+            Task.objects.create(project=project, title=f"t{i}")
+        parent = BOM.objects.create(project=project, category="asm", model="A", qty=1)
+        for i in range(4):
+            child = BOM.objects.create(project=project, category="part", model=f"x{i}",
+                                       qty=1, price=Decimal("1.5"))
+            BOMLink.objects.create(project=project, parent=parent, child=child, qty=2)
+
+    def test_purge_removes_only_that_project(self):
+        other = Project.objects.create(owner=self.user, name="P2")
+        self.populate(self.project)
+        self.populate(other)
+        counts = delete_project(self.project)
+        self.assertEqual(counts["task"], 7)
+        self.assertEqual(counts["bom"], 5)
+        self.assertEqual(counts["bomlink"], 4)
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+        self.assertEqual(Task.objects.count(), 7)
+        self.assertEqual(BOM.objects.count(), 5)
+        self.assertEqual(BOMLink.objects.count(), 4)
+        self.assertEqual(BOMRollup.objects.filter(project=other).count(), 2)
+
+    def test_soft_delete_hides_project_and_frees_name(self):
+        self.populate(self.project)
+        soft_delete_project(self.project)
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+        self.assertIn("[deleted #", Project.all_objects.get(pk=self.project.pk).name)
+        self.assertEqual(self.client.get(f"/api/ver2/tasks/?project={self.project.id}").json()["total_items"], 0)
+        Project.objects.create(owner=self.user, name="P1")
+
+        self.assertEqual(purge_deleted_projects(), [self.project.pk])
+        self.assertEqual(Task.objects.count(), 0)
+        self.assertEqual(BOM.objects.count(), 0)
+
+
+# --- user-038: task archive ---
+
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(8):
+            Task.objects.create(project=self.project, title=f"t{i}",
+                                status="DONE" if i < 6 else "TODO",
+                                priority="HIGH" if i % 2 else "LOW")
+        old = timezone.now() - datetime.timedelta(days=400)
+        Task.objects.filter(title__in=["t0", "t1", "t2", "t3", "t6"]).update(updated_at=old)
+
+    def test_archive_moves_old_done_tasks_and_keeps_counts(self):
+        url = f"/api/ver2/projects/{self.project.id}/overview/"
+        before = self.client.get(url).json()
+        call_command("archive_tasks", "--older-than", "365", "--batch-size", "3", stdout=io.StringIO())
+
+        self.assertEqual(ArchivedTask.objects.count(), 4)
+        self.assertEqual(Task.objects.count(), 4)
+        counts = dict(((s, p), n) for s, p, n in
+                      TaskArchiveCount.objects.values_list("status", "priority", "task_count"))
+        self.assertEqual(counts, {("DONE", "LOW"): 2, ("DONE", "HIGH"): 2})
+
+        get_cache().clear()
+        after = self.client.get(url).json()
+        self.assertEqual(after["archived_tasks"], 4)
+        for key in ("total_tasks", "by_status", "by_priority"):
+            self.assertEqual(after[key], before[key])
+
+    def test_task_list_include_archived(self):
+        call_command("archive_tasks", "--older-than", "365", stdout=io.StringIO())
+        self.assertEqual(self.client.get("/api/ver2/tasks/").json()["total_items"], 4)
+        response = self.client.get("/api/ver2/tasks/?include_archived=1&page_size=20").json()
+        self.assertEqual(response["total_items"], 8)
+        self.assertEqual([t["title"] for t in response["results"]], [f"t{i}" for i in range(8)])
+
+
+# --- user-039: estimated counts and admin changelists ---
+
+class EstimatedCountPaginatorTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        Task.objects.bulk_create([Task(project=self.project, title=f"t{i:02}", rank=f"{i:02}")
+                                  for i in range(25)])
+        self.tasks = Task.objects.order_by("rank")
+
+    def paginator(self, estimate):
+        with mock.patch.object(counting, "fast_count", return_value=(estimate, True)):
+            paginator = EstimatedCountPaginator(self.tasks, 10)
+            paginator.count
+        return paginator
+
+    def test_estimate_below_real_count(self):
+        paginator = self.paginator(12)
+        self.assertEqual(paginator.num_pages, 2)
+        page = paginator.page(3)  # past the estimate
+        self.assertEqual([task.title for task in page], ["t20", "t21", "t22", "t23", "t24"])
+        self.assertEqual((paginator.count, paginator.num_pages, paginator.count_is_estimate), (25, 3, False))
+
+    def test_estimate_above_real_count(self):
+        paginator = self.paginator(100)
+        self.assertEqual(len(paginator.page(2)), 10)
+        self.assertTrue(paginator.count_is_estimate)  # full pages keep the estimate
+        with self.assertRaises(EmptyPage):
+            paginator.page(5)
+        self.assertEqual((paginator.count, paginator.num_pages), (25, 3))
+
+    def test_short_page_switches_to_exact_count(self):
+        paginator = self.paginator(40)
+        self.assertEqual(len(paginator.page(3)), 5)
+        self.assertEqual((paginator.count, paginator.count_is_estimate), (25, False))
+
+
+class AdminChangelistTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser("root", password="pw")
+        self.client.force_login(self.admin)
+        self.other = Project.objects.create(owner=self.user, name="Other")
+        Task.objects.create(project=self.project, title="a")
+        Task.objects.create(project=self.other, title="b")
+
+    def test_project_filter_is_an_autocomplete(self):
+        response = self.client.get(f"/admin/core/task/?project={self.other.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task.title for task in response.context["cl"].result_list], ["b"])
+        html = response.content.decode()
+        self.assertIn('class="admin-autocomplete', html)
+        self.assertIn('data-field-name="project"', html)
+        self.assertIn('onchange="this.form.submit()"', html)
+        self.assertIn(f'<option value="{self.other.id}" selected>Other</option>', html)
+        self.assertIn("admin/js/autocomplete.js", html)
+
+    def test_autocomplete_finds_projects_by_name(self):
+        response = self.client.get("/admin/autocomplete/", {
+            "term": "oth", "app_label": "core", "model_name": "task", "field_name": "project",
+        })
+        self.assertEqual([r["text"] for r in response.json()["results"]], ["Other"])
+
+    def test_task_search_by_project_name(self):
+        response = self.client.get("/admin/core/task/", {"q": "Other"})
+        self.assertEqual([task.title for task in response.context["cl"].result_list], ["b"])
+
+
+# --- user-040: manual task order ---
+
+class RankingTests(APITestCase):
+    def test_midpoint_is_between(self):
+        for low, high in (("", "i"), ("i", "j"), ("i", "i1"), ("zz", None), ("", None), ("a", "a01")):
+            key = midpoint(low, high)
+            self.assertGreater(key, low)
+            if high is not None:
+                self.assertLess(key, high)
+            self.assertFalse(key.endswith("0"))
+
+    def test_spaced_keys_are_ordered(self):
+        keys = spaced_keys(1000)
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), 1000)
+
+    def ranked(self):
+        return list(Task.objects.filter(project=self.project)
+                    .order_by("rank", "id").values_list("title", flat=True))
+
+    def test_move_task(self):
+        a, b, c = (Task.objects.create(project=self.project, title=t) for t in "abc")
+        self.assertEqual(self.ranked(), ["a", "b", "c"])
+        move_task(c, before=a)
+        self.assertEqual(self.ranked(), ["c", "a", "b"])
+        move_task(c, after=a)
+        self.assertEqual(self.ranked(), ["a", "c", "b"])
+        move_task(a)
+        self.assertEqual(self.ranked(), ["c", "b", "a"])
+
+    def test_repeated_moves_into_same_gap(self):
+        a, b = (Task.objects.create(project=self.project, title=t) for t in "ab")
+        moved = [Task.objects.create(project=self.project, title=f"m{i}") for i in range(30)]
+        for task in moved:
+            move_task(task, after=a)
+        self.assertEqual(self.ranked(), ["a"] + [t.title for t in reversed(moved)] + ["b"])
+
+    def test_move_view_rejects_other_project(self):
+        task = Task.objects.create(project=self.project, title="a")
+        other = Project.objects.create(owner=self.user, name="P2")
+        anchor = Task.objects.create(project=other, title="b")
+        response = self.client.post(f"/api/ver2/tasks/{task.id}/move/", {"before": anchor.id},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+class RankLockTests(TransactionTestCase):
+    def setUp(self):
+        self.project = Project.objects.create(owner=User.objects.create_user("alice"), name="P1")
+
+    def test_create_reads_last_rank_under_project_lock(self):
+        events = []
+        lock, last = ranking._lock_project, ranking.next_rank
+
+        def locked(project_id):
+            events.append(("lock", connection.in_atomic_block))
+            lock(project_id)
+
+        def read(project_id):
+            events.append(("read", connection.in_atomic_block))
+            return last(project_id)
+
+        with mock.patch.object(ranking, "_lock_project", locked), \
+                mock.patch.object(ranking, "next_rank", read):
+            Task.objects.create(project=self.project, title="a")
+        self.assertEqual(events, [("lock", True), ("read", True)])
+
+    @skipUnless(connection.features.has_select_for_update, "needs row locks")
+    def test_concurrent_creates_get_distinct_ranks(self):
+        barrier = threading.Barrier(8)
+
+        def create(i):
+            try:
+                barrier.wait()
+                Task.objects.create(project_id=self.project.id, title=f"t{i}")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=create, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ranks = list(Task.objects.filter(project=self.project).values_list("rank", flat=True))
+        self.assertEqual(len(ranks), 8)
+        self.assertEqual(len(set(ranks)), 8)
+
+
+# --- user-041: read replicas ---
+
+@override_settings(REPLICA_DATABASES=["replica1"], READ_YOUR_WRITES_SECONDS=5)
+class ReplicaRouterTests(TransactionTestCase):
+    # Outside TestCase's wrapping transaction: reads in a transaction always
+    # go to the primary. pick_replica is mocked, so no replica is queried.
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.project = Project.objects.create(owner=self.user, name="P1")
+        self.router = db_router.ReplicaRouter()
+        patcher = mock.patch.object(db_router, "pick_replica", return_value="replica1")
+        self.pick_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, method="GET", write=False, cookies=None, user=None, model=Task):
+        """Run a request through the middleware; returns (read alias, response)."""
+        request = RequestFactory().generic(method, "/")
+        request.COOKIES.update(cookies or {})
+        request.user = user or AnonymousUser()
+        seen = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Task)
+            seen.append(self.router.db_for_read(model))
+            return HttpResponse()
+
+        response = db_router.ReplicaRoutingMiddleware(view)(request)
+        return seen[0], response
+
+    def test_safe_reads_of_core_models_use_a_replica(self):
+        self.assertEqual(self.route()[0], "replica1")
+        self.assertEqual(self.route("HEAD")[0], "replica1")
+        self.assertEqual(self.route(model=User)[0], "default")
+        self.assertEqual(self.route("POST")[0], "default")
+        # Outside a request (commands, threads) and with no replica configured
+        self.assertEqual(self.router.db_for_read(Task), "default")
+        with override_settings(REPLICA_DATABASES=[]):
+            self.assertEqual(self.route()[0], "default")
+
+    def test_primary_after_a_write_in_the_same_request(self):
+        self.assertEqual(self.route(write=True)[0], "default")
+
+    def test_primary_for_reads_in_a_transaction_or_filling_the_cache(self):
+        def view(request):
+            with transaction.atomic():
+                in_transaction = self.router.db_for_read(Task)
+            with db_router.primary_reads():
+                cached = self.router.db_for_read(Task)
+            return HttpResponse(f"{in_transaction} {cached} {self.router.db_for_read(Task)}")
+
+        response = db_router.ReplicaRoutingMiddleware(view)(RequestFactory().get("/"))
+        self.assertEqual(response.content, b"default default replica1")
+
+    def test_read_your_writes_cookie(self):
+        _, response = self.route("POST")
+        cookie = response.cookies[db_router.PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 5)
+        self.assertEqual(self.route(cookies={db_router.PIN_COOKIE: cookie.value})[0], "default")
+        with mock.patch("core.db_router.time.time", return_value=float(cookie.value) + 1):
+            self.assertEqual(self.route(cookies={db_router.PIN_COOKIE: cookie.value})[0], "replica1")
+        self.assertEqual(self.route(cookies={db_router.PIN_COOKIE: "junk"})[0], "replica1")
+
+    def test_read_your_writes_without_cookies(self):
+        # A write by a GET (e.g. a cache miss that stores something) pins too
+        self.route(write=True, user=self.user)
+        self.assertEqual(self.route(user=self.user)[0], "default")
+        self.assertEqual(self.route(user=User.objects.create_user("bob"))[0], "replica1")
+        self.assertEqual(self.route()[0], "replica1")
+
+    def test_basic_auth_client_reads_its_writes(self):
+        auth = "Basic " + base64.b64encode(b"alice:pw").decode()
+        self.pick_replica.return_value = None  # route to the primary, but count the attempts
+        url = "/api/ver2/tasks/"
+        self.client.get(url, HTTP_AUTHORIZATION=auth)
+        self.assertTrue(self.pick_replica.called)
+        response = self.client.post(url, {"project": self.project.id, "title": "t"},
+                                    content_type="application/json", HTTP_AUTHORIZATION=auth)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.client.cookies.clear()
+        self.pick_replica.reset_mock()
+        self.assertEqual(len(self.client.get(url, HTTP_AUTHORIZATION=auth).json()["results"]), 1)
+        self.assertFalse(self.pick_replica.called)
+
+    def test_lagging_or_unreachable_replicas_are_skipped(self):
+        db_router._replica_health.clear()
+        self.addCleanup(db_router._replica_health.clear)
+        with override_settings(REPLICA_MAX_LAG_SECONDS=2, REPLICA_LAG_CHECK_SECONDS=5):
+            with mock.patch.object(db_router, "replica_lag", return_value=3.0) as lag:
+                self.assertFalse(db_router.replica_is_healthy("replica1"))
+                self.assertFalse(db_router.replica_is_healthy("replica1"))
+                self.assertEqual(lag.call_count, 1)  # checked at most every 5 seconds
+            db_router._replica_health.clear()
+            with mock.patch.object(db_router, "replica_lag", side_effect=DatabaseError):
+                self.assertFalse(db_router.replica_is_healthy("replica1"))
+            db_router._replica_health.clear()
+            with mock.patch.object(db_router, "replica_lag", return_value=0.5):
+                self.assertTrue(db_router.replica_is_healthy("replica1"))
+
+    def test_replicas_get_no_migrations(self):
+        self.assertFalse(self.router.allow_migrate("replica1", "core"))
+        self.assertIsNone(self.router.allow_migrate("default", "core"))
+
+
+# --- user-042: admission control ---
+
+@override_settings(ADMISSION_CONTROL={
+    "bom-io": {"urls": ["project-bom-export"], "max_concurrent": 2, "per_user": 1, "retry_after": 7},
+})
+class AdmissionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        admission.load_gates()
+        self.gate = admission._gates["bom-io"]
+        # The test client's middleware would build new gates on its first request
+        patcher = mock.patch.object(admission, "load_gates")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = f"/api/ver2/projects/{self.project.id}/bom/export/?format=csv"
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        admission.load_gates()
+
+    def test_gate_sheds_without_waiting(self):
+        gate = admission.AdmissionGate(max_concurrent=2, per_user=1, retry_after=1)
+        self.assertEqual(gate.acquire("a"), admission.ADMITTED)
+        self.assertEqual(gate.acquire("a"), admission.USER_LIMIT)
+        self.assertEqual(gate.acquire("b"), admission.ADMITTED)
+        self.assertEqual(gate.acquire("c"), admission.SATURATED)
+        gate.release("b")
+        self.assertEqual(gate.acquire("c"), admission.ADMITTED)
+
+    def test_user_limit_and_saturation(self):
+        self.gate.acquire(f"user:{self.user.pk}")
+        response = self.client.get(self.url)
+        self.assertEqual((response.status_code, response["Retry-After"]), (429, "7"))
+        self.gate.release(f"user:{self.user.pk}")
+        self.gate.acquire("user:a")
+        self.gate.acquire("user:b")
+        response = self.client.get(self.url)
+        self.assertEqual((response.status_code, response["Retry-After"]), (503, "7"))
+
+    def test_basic_auth_is_keyed_by_ip(self):
+        # An unverified Basic username must not buy a fresh per-user slot
+        self.gate.acquire("ip:127.0.0.1")
+        client = self.client_class()
+        credentials = base64.b64encode(b"anyone:secret").decode()
+        response = client.get(self.url, HTTP_AUTHORIZATION=f"Basic {credentials}")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.gate.active, 1)
+
+    def test_streaming_response_holds_its_slot(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.gate.active, 1)
+        b"".join(response.streaming_content)
+        self.assertEqual(self.gate.active, 0)
+
+
+# --- user-043: lazy imports and startup benchmark ---
+
+class StartupImportTests(TestCase):
+    def test_heavy_modules_are_not_imported_before_the_first_response(self):
+        # A fresh interpreter: this test process has imported them already
+        _, import_ms, top_level, result = bench_startup.run_once("/api/auth/me/")
+        self.assertTrue(result["status"].startswith("400"), result)  # anonymous /me
+        self.assertEqual(result["loaded"], [])
+        self.assertIn("django.core.wsgi", top_level)
+        self.assertGreater(import_ms, 0)
+
+    def test_lazy_modules_are_checked(self):
+        self.assertEqual(set(bench_startup.LAZY_MODULES), {"openpyxl", "numpy", "pyarrow"})
+        run = (1000.0, 500.0, {}, {"status": "200 OK", "loaded": ["numpy"]})
+        with mock.patch.object(bench_startup, "run_once", return_value=run):
+            with self.assertRaisesMessage(CommandError, "should be lazy: numpy"):
+                call_command("bench_startup", runs=1, stdout=io.StringIO())
+
+    def test_budgets(self):
+        run = (2000.0, 500.0, {}, {"status": "200 OK", "loaded": []})
+        with mock.patch.object(bench_startup, "run_once", return_value=run):
+            with self.assertRaisesMessage(CommandError, "start time 2000 ms is over budget"):
+                call_command("bench_startup", runs=1, stdout=io.StringIO())
+            out = io.StringIO()
+            call_command("bench_startup", runs=3, max_start_ms=2500, stdout=out)
+        self.assertIn("Startup within budget", out.getvalue())
+
+    def test_parse_importtime(self):
+        stderr = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 |   _io",
+            "import time:       300 |       1400 | django",
+            "import time:      1000 |       1000 |   django.utils",
+            "something else",
+        ])
+        self.assertEqual(bench_startup.parse_importtime(stderr), (1.4, {"django": 1.4}))
+
+
+# --- user-044: change history ---
+
+class ChangeHistoryTests(TransactionTestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.project = Project.objects.create(owner=self.user, name="P1")
+        self.client.force_login(self.user)
+
+    def test_update_is_recorded_with_request_user(self):
+        task = Task.objects.create(project=self.project, title="t1")
+        response = self.client.patch(f"/api/ver2/tasks/{task.id}/", {"title": "t2", "status": "DONE"},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        record = ChangeRecord.objects.filter(action=history.UPDATE).get()
+        self.assertEqual(record.user_id, self.user.id)
+        self.assertEqual(record.changes["title"], ["t1", "t2"])
+        response = self.client.get(f"/api/ver2/tasks/{task.id}/history/").json()
+        self.assertEqual([r["action"] for r in response["results"]], ["update", "create"])
+
+    def test_rolled_back_changes_leave_no_history(self):
+        task = Task.objects.create(project=self.project, title="t1")
+        count = ChangeRecord.objects.count()
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                task.title = "rolled back"
+                task.save()
+                raise RuntimeError
+        self.assertEqual(ChangeRecord.objects.count(), count)
+
+    def test_buffer_is_written_on_exit(self):
+        with history.buffered(user_id=self.user.id) as rows:
+            for i in range(5):
+                Task.objects.create(project=self.project, title=f"t{i}")
+            self.assertEqual(len(rows), 5)
+            self.assertEqual(ChangeRecord.objects.count(), 0)
+        self.assertEqual(ChangeRecord.objects.filter(user=self.user).count(), 5)
+
+    def test_history_commits_with_the_change(self):
+        task = Task.objects.create(project=self.project, title="t1")
+        task.title = "t2"
+        with mock.patch.object(history, "flush", side_effect=RuntimeError("history down")):
+            with self.assertRaises(RuntimeError):
+                task.save()
+        self.assertEqual(Task.objects.get(pk=task.pk).title, "t1")
+
+    def test_buffer_skips_rolled_back_savepoints(self):
+        with history.buffered():
+            Task.objects.create(project=self.project, title="kept")
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    Task.objects.create(project=self.project, title="rolled back")
+                    raise RuntimeError
+        self.assertEqual(ChangeRecord.objects.count(), 1)
+
+    def test_failed_buffer_writes_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with history.buffered():
+                Task.objects.create(project=self.project, title="t")
+                raise RuntimeError
+        self.assertEqual((Task.objects.count(), ChangeRecord.objects.count()), (0, 0))
+
+    def test_basic_auth_user_is_recorded(self):
+        task = Task.objects.create(project=self.project, title="t1")
+        client = self.client_class()
+        credentials = base64.b64encode(b"alice:pw").decode()
+        response = client.patch(f"/api/ver2/tasks/{task.id}/", {"title": "t2"},
+                                content_type="application/json",
+                                HTTP_AUTHORIZATION=f"Basic {credentials}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ChangeRecord.objects.get(action=history.UPDATE).user_id, self.user.id)
+
+    def test_history_survives_purge(self):
+        Task.objects.create(project=self.project, title="t1")
+        delete_project(self.project)
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+        self.assertEqual(ChangeRecord.objects.filter(project_id=self.project.pk).count(), 1)
+
+
+# --- user-045: due-task digests ---
+
+class DigestTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        due = {"late": -5, "soon": 2, "far": 20}
+        for title, days in due.items():
+            Task.objects.create(project=self.project, title=title,
+                                due_date=today + datetime.timedelta(days=days))
+        Task.objects.create(project=self.project, title="done", status="DONE",
+                            due_date=today - datetime.timedelta(days=1))
+        Task.objects.create(project=self.project, title="undated")
+        other = User.objects.create_user("bob", password="pw")
+        Task.objects.create(project=Project.objects.create(owner=other, name="P2"),
+                            title="bob's", due_date=today)
+
+    def test_command_writes_one_digest_per_user(self):
+        call_command("task_digest", "--due-within", "3", stdout=io.StringIO())
+        digest = TaskDigest.objects.get(user=self.user)
+        self.assertEqual((digest.overdue_count, digest.due_soon_count), (1, 1))
+        self.assertEqual([t["title"] for t in digest.tasks], ["late", "soon"])
+        self.assertEqual(digest.tasks[0]["days_overdue"], 5)
+        self.assertEqual(TaskDigest.objects.count(), 2)
+
+    def test_max_tasks_limits_list_not_counts(self):
+        call_command("task_digest", "--max-tasks", "1", stdout=io.StringIO())
+        digest = TaskDigest.objects.get(user=self.user)
+        self.assertEqual(len(digest.tasks), 1)
+        self.assertEqual(digest.overdue_count + digest.due_soon_count, 2)
+
+    def test_due_view_only_lists_own_open_tasks(self):
+        response = self.client.get("/api/ver2/tasks/due/?within=30").json()
+        self.assertEqual([t["title"] for t in response["tasks"]], ["late", "soon", "far"])
+        self.assertEqual(self.client.get("/api/ver2/tasks/due/?within=x").status_code, 400)
+
+
+# --- user-046: parallel BOM import ---
+
+def xlsx_bytes(rows):
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(bom_import.EXPECTED_HEADER)
+    for row in rows:
+        ws.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+class BOMImportParsingTests(TestCase):
+    def test_excel_qty_rule(self):
+        # Unchanged from the original Excel import: empty or 0 means 1,
+        # floats are truncated
+        row = ["c", "m", "d", None, "", "", ""]
+        for qty, expected in (("", 1), (None, 1), (0, 1), (2, 2), (2.0, 2), (2.5, 2)):
+            row[3] = qty
+            self.assertEqual(bom_import.parse_row(row)[3], expected, qty)
+        for qty in ("x", "2.5", -1):
+            row[3] = qty
+            with self.assertRaises(ValueError):
+                bom_import.parse_row(row)
+
+    def test_price_and_lengths(self):
+        self.assertEqual(bom_import.parse_row(["c", "m", "", 1, "", "", "1.25"])[6], Decimal("1.250"))
+        self.assertIsNone(bom_import.parse_row(["c", "m", "", 1, "", "", ""])[6])
+        with self.assertRaises(ValueError):
+            bom_import.parse_row(["c" * 201, "m", "", 1, "", "", ""])
+
+    def test_xlsx(self):
+        body = xlsx_bytes([
+            ["c", "m1", "d", 0, None, None, 1.5],
+            ["c", "m2", None, None, None, None, None],
+            [None] * 7,
+            ["c", "m3", None, "x", None, None, None],
+        ])
+        result = bom_import.parse_sheet(body, "bom.xlsx")
+        self.assertIsNone(result["detail"])
+        self.assertEqual(result["rows"], [("c", "m1", "d", 1, "", "", Decimal("1.500")),
+                                          ("c", "m2", "", 1, "", "", None)])
+        self.assertEqual(result["skipped"], 1)
+        self.assertTrue(result["errors"][0].startswith("row 5:"))
+
+    def test_unreadable_workbook(self):
+        result = bom_import.parse_sheet(b"not a workbook", "bom.xlsx")
+        self.assertEqual(result["detail"], bom_import.READ_ERROR)
+
+    def test_bad_sheets_are_reported_per_sheet(self):
+        from openpyxl import Workbook
+        from openpyxl.chart import BarChart, Reference
+
+        wb = Workbook()
+        wb.active.append(bom_import.EXPECTED_HEADER)
+        wb.active.append(["c", "m1", None, 1, None, None, None])
+        broken = wb.create_sheet("Broken")
+        broken.append(bom_import.EXPECTED_HEADER)
+        broken.append(["c", "m2", None, 1, None, None, None])
+        chart = BarChart()
+        chart.add_data(Reference(wb.active, min_col=4, min_row=1, max_row=2))
+        wb.create_chartsheet("Chart").add_chart(chart)
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        # Truncate the second sheet's XML after its first row
+        source, output = zipfile.ZipFile(io.BytesIO(buffer.getvalue())), io.BytesIO()
+        with zipfile.ZipFile(output, "w") as target:
+            for name in source.namelist():
+                data = source.read(name)
+                if name == "xl/worksheets/sheet2.xml":
+                    data = data[:data.index(b"</row>") + len(b"</row>")]
+                target.writestr(name, data)
+        body = output.getvalue()
+
+        results = [bom_import.parse_sheet(body, "bom.xlsx", name)
+                   for name in bom_import.sheet_names(body)]
+        self.assertEqual([(r["sheet"], r["detail"], len(r["rows"])) for r in results], [
+            ("Sheet", None, 1),
+            ("Broken", bom_import.SHEET_ERROR, 0),
+            ("Chart", bom_import.CHARTSHEET_ERROR, 0),
+        ])
+
+    def test_run_jobs_keeps_job_order(self):
+        jobs = [(xlsx_bytes([["c", f"m{i}", None, 1, None, None, None]]), f"b{i}.xlsx", None)
+                for i in range(3)]
+        with override_settings(BOM_IMPORT_WORKERS=1):
+            results = bom_import.run_jobs(jobs)
+        self.assertEqual([r["rows"][0][1] for r in results], ["m0", "m1", "m2"])
+
+
+class BOMImportPoolTests(TestCase):
+    def tearDown(self):
+        bom_import._reset_pool()
+
+    @override_settings(BOM_IMPORT_WORKERS=2)
+    def test_process_pool(self):
+        jobs = [(xlsx_bytes([["c", f"m{i}", None, 1, None, None, None]]), f"b{i}.xlsx", None)
+                for i in range(4)]
+        jobs.append((b"not a workbook", "bad.xlsx", None))
+        results = bom_import.run_jobs(jobs)
+        self.assertIsNotNone(bom_import._pool)
+        self.assertEqual([r["rows"][0][1] for r in results[:4]], ["m0", "m1", "m2", "m3"])
+        self.assertEqual(results[4]["detail"], bom_import.READ_ERROR)
+
+    @override_settings(BOM_IMPORT_WORKERS=2)
+    def test_broken_pool_is_replaced(self):
+        broken = mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool("worker died")
+        bom_import._pool = broken
+        with self.assertRaises(BrokenProcessPool):
+            bom_import.run_jobs([(b"", "a.xlsx", None), (b"", "b.xlsx", None)])
+        broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        self.assertIsNone(bom_import._pool)
+        self.assertIsNot(bom_import.get_pool(), broken)
+
+
+# --- user-047: CSV / Arrow export and import (BOM and tasks) ---
+
+HEADER = ",".join(bom_import.EXPECTED_HEADER)
+
+
+class CSVImportTests(TestCase):
+    def parse_csv(self, body):
+        return bom_import.parse_sheet(body.encode(), "bom.csv")
+
+    def test_csv(self):
+        result = self.parse_csv(f"{HEADER}\nc,m1,d,0,,,1.5\nc,m2,,,,,\n,,,,,,\nc,m3,,x,,,\n")
+        self.assertIsNone(result["detail"])
+        self.assertEqual([row[:4] for row in result["rows"]], [("c", "m1", "d", 0), ("c", "m2", "", 1)])
+        self.assertEqual(result["skipped"], 1)
+        self.assertTrue(result["errors"][0].startswith("row 5:"))
+
+    def test_csv_qty_rule(self):
+        # Unlike Excel (see test_excel_qty_rule) a 0 stays 0 and "2.0" is 2
+        row = ["c", "m", "d", None, "", "", ""]
+        for qty, expected in (("", 1), ("0", 0), ("2", 2), ("2.0", 2), (3, 3)):
+            row[3] = qty
+            self.assertEqual(bom_import.parse_row(row, exact_qty=True)[3], expected, qty)
+        for qty in ("2.5", "x", "-1", "nan"):
+            row[3] = qty
+            with self.assertRaises(ValueError):
+                bom_import.parse_row(row, exact_qty=True)
+
+    def test_csv_bad_header_and_encoding(self):
+        self.assertIn("Unexpected header", self.parse_csv("a,b,c\n1,2,3\n")["detail"])
+        result = bom_import.parse_sheet(b"\xff\xfe\x00bad", "bom.csv")
+        self.assertIn("UTF-8", result["detail"])
+
+    def test_csv_matches_xlsx(self):
+        xlsx = bom_import.parse_sheet(xlsx_bytes([
+            ["c", "m1", "d", 3, None, None, 1.5],
+            ["c", "m2", None, None, None, None, None],
+        ]), "bom.xlsx")
+        csv_result = self.parse_csv(f"{HEADER}\nc,m1,d,3,,,1.5\nc,m2,,,,,\n")
+        self.assertEqual(csv_result["rows"], xlsx["rows"])
+
+
+class BOMImportViewTests(APITestCase):
+    def upload(self, name, body):
+        upload = io.BytesIO(body)
+        upload.name = name
+        return upload
+
+    def test_csv_import_updates_rollup(self):
+        body = f"{HEADER}\nc,m1,,2,,,1.5\nc,m2,,1,,,\n".encode()
+        response = self.client.post(f"/api/ver2/projects/{self.project.id}/bom/import/",
+                                    {"file": self.upload("bom.csv", body)})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(BOM.objects.filter(project=self.project).count(), 2)
+        rollup = BOMRollup.objects.get(project=self.project)
+        self.assertEqual((rollup.line_count, rollup.total_cost), (2, Decimal("3.000")))
+
+    def test_export_csv_round_trip(self):
+        BOM.objects.create(project=self.project, category="c", model="m1",
+                           description='say "hi", ok', qty=3, price=Decimal("1.25"))
+        response = self.client.get(f"/api/ver2/projects/{self.project.id}/bom/export/?format=csv")
+        body = b"".join(response.streaming_content)
+        self.assertEqual(response["Content-Type"].split(";")[0], "text/csv")
+        result = bom_import.parse_sheet(body, "bom.csv")
+        self.assertEqual(result["rows"], [("c", "m1", 'say "hi", ok', 3, "", "", Decimal("1.250"))])
+
+    @skipUnless(arrow_available(), "pyarrow is not installed")
+    def test_export_arrow_round_trip(self):
+        BOM.objects.create(project=self.project, category="c", model="m1", qty=0, price=Decimal("1.25"))
+        BOM.objects.create(project=self.project, category="c", model="m2", description="d", qty=4)
+        response = self.client.get(f"/api/ver2/projects/{self.project.id}/bom/export/?format=arrow")
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.arrow.stream")
+        result = bom_import.parse_sheet(b"".join(response.streaming_content), "bom.arrow")
+        self.assertIsNone(result["detail"])
+        self.assertEqual(result["rows"], [("c", "m1", "", 0, "", "", Decimal("1.250")),
+                                          ("c", "m2", "d", 4, "", "", None)])
+
+
+class TaskImportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        Task.objects.create(project=self.project, title="first", priority="HIGH", status="INPR",
+                            due_date=datetime.date(2026, 11, 2))
+        Task.objects.create(project=self.project, title="second")
+        self.target = Project.objects.create(owner=self.user, name="P2")
+        Task.objects.create(project=self.target, title="existing")
+
+    def export(self, format):
+        response = self.client.get(f"/api/ver2/tasks/?project={self.project.id}&sort=rank&format={format}")
+        return b"".join(response.streaming_content)
+
+    def upload(self, name, body):
+        upload = io.BytesIO(body)
+        upload.name = name
+        return self.client.post(f"/api/ver2/projects/{self.target.id}/tasks/import/", {"file": upload})
+
+    def assert_imported(self, response):
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["imported"], 2)
+        tasks = list(self.target.tasks.order_by("rank").values_list("title", "priority", "status", "due_date"))
+        self.assertEqual(tasks, [("existing", "MED", "TODO", None),
+                                 ("first", "HIGH", "INPR", datetime.date(2026, 11, 2)),
+                                 ("second", "MED", "TODO", None)])
+        self.assertEqual(ChangeRecord.objects.filter(project=self.target, action=history.CREATE).count(), 3)
+
+    def test_csv_round_trip(self):
+        self.assert_imported(self.upload("tasks.csv", self.export("csv")))
+
+    @skipUnless(arrow_available(), "pyarrow is not installed")
+    def test_arrow_round_trip(self):
+        self.assert_imported(self.upload("tasks.arrow", self.export("arrow")))
+
+    def test_invalid_rows_are_reported(self):
+        body = "title,priority,status,due_date\nok,,,\n,LOW,TODO,\nx,URGENT,,\ny,,,soon\n"
+        response = self.upload("tasks.csv", body.encode())
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.json()["imported"], response.json()["skipped"]), (1, 3))
+        self.assertEqual([error.split(":")[0] for error in response.json()["errors"]],
+                         ["row 3", "row 4", "row 5"])
+
+    def test_rejected_files(self):
+        self.assertIn("title", self.upload("tasks.csv", b"name,status\nx,TODO\n").json()["detail"])
+        self.assertEqual(self.upload("tasks.xlsx", b"x").status_code, 400)
+        other = Project.objects.create(owner=User.objects.create_user("bob"), name="B")
+        upload = io.BytesIO(b"title\nx\n")
+        upload.name = "tasks.csv"
+        response = self.client.post(f"/api/ver2/projects/{other.id}/tasks/import/", {"file": upload})
+        self.assertEqual(response.status_code, 404)
+
+
+# --- user-048: response compression ---
+
+class FakeCodec:
+    module = None
+
+    def __init__(self, name):
+        self.name = name
+
+
+@override_settings(COMPRESSION=True, COMPRESSION_CODECS=["gzip"], COMPRESSION_MIN_SIZE=200)
+class CompressionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        BOM.objects.bulk_create([
+            BOM(project=self.project, category="c", model=f"m{i}", description="repeated text",
+                qty=1, price=Decimal("1.5"))
+            for i in range(200)
+        ])
+        self.url = f"/api/ver2/projects/{self.project.id}/bom/"
+
+    def test_negotiation(self):
+        codecs = [FakeCodec("zstd"), FakeCodec("br"), FakeCodec("gzip")]
+        choose = lambda header: getattr(compression.choose_codec(header, codecs), "name", None)
+        self.assertEqual(choose("gzip, br"), "br")
+        self.assertEqual(choose("gzip;q=1, zstd;q=0"), "gzip")
+        self.assertEqual(choose("*"), "zstd")
+        self.assertEqual(choose("*, zstd;q=0, br;q=0"), "gzip")
+        self.assertIsNone(choose("identity"))
+        self.assertIsNone(choose(""))
+
+    def test_gzip_response(self):
+        plain = self.client.get(self.url)
+        self.assertIsNone(plain.get("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertTrue(response["ETag"].startswith("W/"))
+
+    def test_streaming_is_compressed_per_chunk(self):
+        with override_settings(STREAM_CHUNK_SIZE=50):
+            response = self.client.get(self.url + "?stream=1", HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertFalse(response.has_header("Content-Length"))
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            lines = []
+            for chunk in response.streaming_content:
+                # Every chunk is flushed, so it decodes on its own
+                lines.extend(line for line in decompressor.decompress(chunk).split(b"\n") if line)
+        self.assertEqual(len(lines), 200)
+        self.assertEqual(json.loads(lines[0])["model"], "m0")
+
+    def test_html_is_never_compressed(self):
+        self.assertFalse(compression.is_compressible("text/html; charset=utf-8"))
+        response = self.client.get(self.url, HTTP_ACCEPT="text/html", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertTrue(response["Content-Type"].startswith("text/html"))
+        self.assertGreater(len(response.content), 200)
+        self.assertIsNone(response.get("Content-Encoding"))
+
+    def test_csv_export_is_compressed(self):
+        response = self.client.get(f"/api/ver2/projects/{self.project.id}/bom/export/?format=csv",
+                                   HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        body = gzip.decompress(b"".join(response.streaming_content))
+        self.assertEqual(body.count(b"\n"), 201)
+
+    def test_small_and_binary_bodies_untouched(self):
+        response = self.client.get("/api/auth/me/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertIsNone(response.get("Content-Encoding"))
+        response = self.client.get(f"/api/ver2/projects/{self.project.id}/bom/export/",
+                                   HTTP_ACCEPT_ENCODING="gzip")
+        self.assertIsNone(response.get("Content-Encoding"))
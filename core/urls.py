@@ -22,14 +22,40 @@ urlpatterns = [
     path("api/ver2/projects/",
          views.ProjectList.as_view(),name="project-list"),
     
+    path("api/ver2/projects/<int:project_id>/clone/",
+         views.ProjectClone.as_view(),name="project-clone"),
     path("api/ver2/tasks/",views.TaskList.as_view(),
          name = "task-list"),
     path("api/ver2/tasks/<int:task_id>/",
          views.TaskDetail.as_view(),
          name="task-detail"),
+    path("api/ver2/tasks/<int:task_id>/move/",
+         views.TaskMove.as_view(),name="task-move"),
+    path("api/ver2/tasks/due/",
+         views.DueTaskList.as_view(),name="task-due"),
+    path("api/ver2/digests/",
+         views.TaskDigestList.as_view(),name="task-digests"),
+    path("api/ver2/tasks/<int:task_id>/history/",
+         views.TaskHistory.as_view(),name="task-history"),
+    path("api/ver2/projects/<int:project_id>/history/",
+         views.ProjectHistory.as_view(),name="project-history"),
     path("api/ver2/projects/<int:project_id>/overview/",
          views.ProjectOverview.as_view(),name="project-overview"),
     path("api/ver2/projects/<int:project_id>/bom/",views.ProjectBOMList.as_view(),name="project-bom"),
+    path("api/ver2/projects/<int:project_id>/bom/rollup/",views.ProjectBOMRollup.as_view(),
+         name="project-bom-rollup"),
+    path("api/ver2/projects/<int:project_id>/bom/what-if/",views.BOMWhatIfView.as_view(),
+         name="project-bom-what-if"),
+    path("api/ver2/projects/<int:project_id>/bom/links/",views.ProjectBOMLinkList.as_view(),
+         name="project-bom-links"),
+    path("api/ver2/projects/<int:project_id>/bom/explode/",views.ProjectBOMExplode.as_view(),
+         name="project-bom-explode"),
+    path("api/ver2/bom/links/<int:link_id>/",views.BOMLinkDetail.as_view(),
+         name="bom-link-detail"),
+    path("api/ver2/parts/",views.PartSearch.as_view(),
+         name="part-search"),
+    path("api/ver2/bom/rollup/",views.BOMRollupView.as_view(),
+         name="bom-rollup"),
     path("api/ver2/bom/<int:item_id>/",views.BOMItemDetail.as_view(),
          name="bom-detail"),
     path("api/ver2/projects/<int:project_id>/bom/export/",views.BOMExportView.as_view(),
@@ -37,12 +63,21 @@ urlpatterns = [
     path("api/ver2/projects/<int:project_id>/bom/import/",
          views.BOMImportView.as_view(),
          name="project-bom-import"),
+    path("api/ver2/projects/<int:project_id>/tasks/import/",
+         views.TaskImportView.as_view(),
+         name="project-task-import"),
          # BOM detail – keep as is
     path(
     "api/ver2/bom/<int:item_id>/",
     views.BOMItemDetail.as_view(),
     name="bom-detail",
         ),
+    path("api/ver2/bootstrap/",views.DashboardBootstrap.as_view(),
+         name="dashboard-bootstrap"),
+    path("api/ver2/cache/stats/",views.ResponseCacheStats.as_view(),
+         name="cache-stats"),
+    path("api/ver2/compression/stats/",views.CompressionStats.as_view(),
+         name="compression-stats"),
     # Auth endpoint
     path("api/auth/login/",views.LoginView.as_view(),
          name = "api-login"),
@@ -1,21 +1,41 @@
 from django.shortcuts import render
+from django.conf import settings
 from django.http import JsonResponse,HttpResponse
 import io
-from openpyxl import Workbook, load_workbook # Excel read/write
 from django.contrib.auth import authenticate,login,logout
 
 
 from core.auth import CsrfExemptSessionAuthentication
-from .models import Project,Task,BOM
+from .models import Project,Task,ArchivedTask,BOM,BOMLink,ChangeRecord,TaskDigest
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status,viewsets
-from .serializers import ProjectSerializer,TaskSerializer,BOMSerializer
+from .serializers import (ProjectSerializer,TaskSerializer,BOMSerializer,BOMCostSerializer,WhatIfRequestSerializer,
+                          BOMLinkSerializer,BOMExplodedLineSerializer,ProjectCloneSerializer,TaskMoveSerializer,
+                          ChangeRecordSerializer,TaskDigestSerializer)
+from .formatters import TASK_ROWS,BOM_ROWS
+from .renderers import NDJSONRenderer,XLSXRenderer,bulk_renderers
+from .streaming import wants_stream,ndjson_response,export_response
+from .conditional import condition_on_project,conditional_response
+from .response_cache import get_generation,get_or_compute,get_stats
+from .rollup import GROUP_COLUMNS,live_rollup,table_rollup,sum_groups
+from .bom_tree import explode,would_create_cycle
+from .cloning import clone_project
+from .purge import delete_project
+from .archive import archived_counters
+from .counting import EstimatedCountPaginator
+from .ranking import move_task
+from .digest import COLUMNS as DIGEST_COLUMNS,due_tasks,build_digest,format_task
+from . import history
 from django.core.paginator import Paginator, EmptyPage
+from django.db import IntegrityError,transaction
+from django.utils import timezone
 from django.db.models import Q,Count
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.contrib.postgres.search import SearchQuery,SearchVector
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.authentication import BasicAuthentication
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.settings import api_settings
 
 from django.http import HttpResponse
 
@@ -23,6 +43,7 @@ from django.http import HttpResponse
 
 
 class ProjectDetail(APIView):
+    @condition_on_project()
     def get(self, request, project_id):
         try:
             project = Project.objects.get(pk=project_id)
@@ -48,25 +69,40 @@ def project_tasks(request,project_id: int):
         project = Project.objects.get(pk=project_id)
     except Project.DoesNotExist:
         return JsonResponse({"error":"project not found"},status=404)
-    data = [{
-        "id":t.id,
-        "title":t.title,
-        "status": t.get_status_display(),
-        "due_date":t.due_date.isoformat() if t.due_date else None,
-        "created_at":t.created_at.isoformat(),
-    } for t in project.tasks.all()
-    ]
+    rows = project.tasks.values_list("id","title","status","due_date","created_at")
+    # ?stream=1 / Accept: application/x-ndjson -> one task per line
+    if wants_stream(request):
+        return ndjson_response(rows,_format_task_rows)
     return JsonResponse(
-        {"project": project.name,"tasks detail":data}
+        {"project": project.name,"tasks detail":_format_task_rows(rows)}
     )
 
+def _format_task_rows(rows):
+    status_labels = dict(Task.Status.choices)
+    return [{
+        "id":task_id,
+        "title":title,
+        "status": status_labels.get(status_code,status_code),
+        "due_date":due_date.isoformat() if due_date else None,
+        "created_at":created_at.isoformat(),
+    } for task_id,title,status_code,due_date,created_at in rows
+    ]
+
 
 class ProjectViewSet(viewsets.ModelViewSet):
     queryset = Project.objects.all().order_by("-created_at")
     serializer_class = ProjectSerializer
 
+    def destroy(self, request, *args, **kwargs):
+        # Set-based batched delete instead of the collector (core.purge);
+        # ?async=1 hides the project now and purges it in the background
+        project = self.get_object()
+        background = request.query_params.get("async", "1" if settings.PROJECT_DELETE_ASYNC else "0") in ("1","true")
+        delete_project(project,background=background)
+        return Response(status=status.HTTP_202_ACCEPTED if background else status.HTTP_204_NO_CONTENT)
+
 class TaskViewSet(viewsets.ModelViewSet):
-    queryset = Task.objects.all().order_by("-created_at")
+    queryset = Task.objects.filter(project__deleted_at__isnull=True).order_by("-created_at")
     serializer_class = TaskSerializer
 
 
@@ -75,8 +111,6 @@ class ProjectList(APIView):
     authentication_classes = [CsrfExemptSessionAuthentication, BasicAuthentication]
     permission_classes = [IsAuthenticated] 
     def get(self,request):
-        projects = Project.objects.filter(owner=request.user).order_by("name")
-        
         try:
             page = int(request.GET.get("page",1))
         except ValueError:
@@ -87,7 +121,17 @@ class ProjectList(APIView):
             page_size = 10
         if page_size <= 0:
             page_size = 10
-        paginator = Paginator(projects, page_size)
+
+        # Cached per user generation, bumped on any write to the user's projects
+        user_id = request.user.id
+        key = f"projects:u{user_id}:g{get_generation('user',user_id)}:p{page}:s{page_size}"
+        data = get_or_compute(key,lambda: self.get_page(request.user,page,page_size))
+        return Response(data)
+
+    def get_page(self,user,page,page_size):
+        projects = Project.objects.filter(owner=user).order_by("name")
+        # Planner estimate instead of COUNT(*) on very large results
+        paginator = EstimatedCountPaginator(projects, page_size)
         try:
             page_obj = paginator.page(page)
         except EmptyPage:
@@ -101,9 +145,9 @@ class ProjectList(APIView):
             "page_size":page_size,
             "total_pages":paginator.num_pages,
             "total_items":paginator.count,
+            "total_items_estimated":paginator.count_is_estimate,
         }
-
-        return Response(data)
+        return data
     
 
 
@@ -125,6 +169,64 @@ class ProjectList(APIView):
         )
         
 
+class ProjectClone(APIView):
+    """
+    Copy a project with all its tasks and BOM rows inside the database.
+    URL: POST /api/ver2/projects/<project_id>/clone/
+    Body (JSON, optional): {"name": "New name", "reset_status": true}
+    Without a name the copy is called "<name> (copy)", "<name> (copy 2)", ...
+    409 when the name was taken meanwhile by a concurrent request.
+    reset_status=true sets every copied task back to TODO.
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+    NAME_ATTEMPTS = 5
+
+    def post(self,request,project_id):
+        try:
+            source = Project.objects.get(pk=project_id,owner=request.user)
+        except Project.DoesNotExist:
+            return Response({"detail": "Project not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        serializer = ProjectCloneSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors,
+                            status=status.HTTP_400_BAD_REQUEST)
+        requested = serializer.validated_data.get("name")
+        # The name lookups race concurrent clones; the unique index decides.
+        # clone_project's transaction rolls back on a clash, then an
+        # automatic name moves on to the next free suffix
+        for attempt in range(self.NAME_ATTEMPTS):
+            name = requested or self.free_name(source.name)
+            try:
+                project, counts = clone_project(
+                    source,name,request.user,
+                    reset_status=serializer.validated_data["reset_status"],
+                )
+                break
+            except IntegrityError:
+                if not Project.all_objects.filter(name=name).exists():
+                    raise
+                if requested or attempt == self.NAME_ATTEMPTS - 1:
+                    return Response({"detail": f"A project named {name!r} already exists"},
+                                    status=status.HTTP_409_CONFLICT)
+        return Response({
+            "id": project.id,
+            "name": project.name,
+            "source_id": source.id,
+            **counts,
+        },status=status.HTTP_201_CREATED)
+
+    def free_name(self,name):
+        # leave room for the suffix within Project.name's max_length=200
+        base = f"{name[:180]} (copy"
+        taken = set(Project.all_objects.filter(name__startswith=base).values_list("name",flat=True))
+        candidate, n = f"{base})", 1
+        while candidate in taken:
+            n += 1
+            candidate = f"{base} {n})"
+        return candidate
+
 class TaskList(APIView):
     # def get(self,request):
     #     # ORM: get all tasks from DB (still a lazy query)
@@ -136,35 +238,35 @@ class TaskList(APIView):
 
     authentication_classes = [CsrfExemptSessionAuthentication, BasicAuthentication]
     permission_classes = [IsAuthenticated]
+    # ?format=csv|arrow (or Accept) exports all matching tasks, unpaginated
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + bulk_renderers()
+    # Without ?sort; id breaks title ties so pages (and the dashboard's
+    # first page, see DashboardBootstrap) are stable
+    DEFAULT_ORDER = ("title","id")
     def get(self,request):
-        qs = Task.objects.filter(project__owner=request.user)
-        # Read query parameters from URL: /api/ver2/tasks/?project=1&status=
-        project_id = request.query_params.get("project")
-        status_code = request.query_params.get("status")
-        priority = request.query_params.get("priority")
+        qs = self.filter_tasks(request,Task.objects.all())
+        # Old DONE tasks live in the archive table (core.archive); only
+        # read it when asked to
+        include_archived = request.GET.get("include_archived") in ("1","true")
+        if include_archived:
+            archived = self.filter_tasks(request,ArchivedTask.objects.all())
+            rows = qs.order_by().values_list(*TASK_ROWS.columns).union(
+                archived.order_by().values_list(*TASK_ROWS.columns),all=True)
+        else:
+            rows = qs.values_list(*TASK_ROWS.columns)
         sort = request.query_params.get("sort")
-        
-        if project_id is not None:
-            qs = qs.filter(project_id=project_id)
-        if status_code is not None:
-            qs = qs.filter(status=status_code)
-        
-        if priority is not None:
-            qs = qs.filter(priority=priority)
         if sort == "due":
-            qs = qs.order_by("due_date")
+            rows = rows.order_by("due_date")
         elif sort == "new":
-            qs = qs.order_by("-created_at")
+            rows = rows.order_by("-created_at")
+        elif sort == "rank":
+            # Manual board order (core.ranking); indexed per project
+            rows = rows.order_by("rank","id")
         else:
-            qs = qs.order_by("title")
-        #----- Search ('q') ------------------
-        # use double under score after field name : title__icontains
-        q = request.GET.get('q')
-        if q:
-            qs = qs.filter(
-                Q(title__icontains=q) |
-                Q(status__icontains=q)
-            )
+            rows = rows.order_by(*self.DEFAULT_ORDER)
+        if request.accepted_renderer.format in ("csv","arrow"):
+            return export_response(request.accepted_renderer.format,rows,Task,
+                                   TASK_ROWS.columns,TASK_ROWS.names,"tasks")
 
         # ---  Pagination ------
         try: # - request.GET is a dictionary-like object 
@@ -176,23 +278,48 @@ class TaskList(APIView):
             page_size = int(request.GET.get("page_size",10))
         except:
             page_size = 10
-        paginator = Paginator(qs,page_size)
+        # Read rows as tuples and format them like TaskSerializer would
+        paginator = EstimatedCountPaginator(rows,page_size)
 
         try:
             page_obj = paginator.page(page)
         except EmptyPage:
             page_obj = []
-        serilaizer = TaskSerializer(page_obj,many=True)
         data = {
-            "results":serilaizer.data,
+            "results":TASK_ROWS.format(page_obj),
             "page":page,
             "page_size":page_size,
             "total_page":paginator.num_pages,
             "total_items":paginator.count,
-
+            "total_items_estimated":paginator.count_is_estimate,
         }
         return Response(data)
 
+    def filter_tasks(self,request,qs):
+        """Apply the list filters to Task or ArchivedTask rows."""
+        qs = qs.filter(project__owner=request.user,project__deleted_at__isnull=True)
+        # Read query parameters from URL: /api/ver2/tasks/?project=1&status=
+        project_id = request.query_params.get("project")
+        status_code = request.query_params.get("status")
+        priority = request.query_params.get("priority")
+        
+        if project_id is not None:
+            qs = qs.filter(project_id=project_id)
+        if status_code is not None:
+            qs = qs.filter(status=status_code)
+        
+        if priority is not None:
+            qs = qs.filter(priority=priority)
+        #----- Search ('q') ------------------
+        # use double under score after field name : title__icontains
+        q = request.GET.get('q')
+        if q:
+            qs = qs.filter(
+                Q(title__icontains=q) |
+                Q(status__icontains=q)
+            )
+        return qs
+
     def post(self,request):
         # DRF parses JSON body and puts it into request.data(a dict)
         serializer = TaskSerializer(data=request.data)
@@ -218,7 +345,7 @@ class TaskDetail(APIView):
     # handle get,put,delete
     def get_object(self,task_id,user):
         try:
-            task = Task.objects.get(pk=task_id,project__owner=user)
+            task = Task.objects.get(pk=task_id,project__owner=user,project__deleted_at__isnull=True)
             return task
         except Task.DoesNotExist:
             return None
@@ -229,8 +356,12 @@ class TaskDetail(APIView):
                 {"error":"Task not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
-        serializer = TaskSerializer(task)
-        return Response(serializer.data)
+        # 304 if the client already has this version of the task
+        etag = f'"t{task.id}-{int(task.updated_at.timestamp() * 1000000)}"'
+        return conditional_response(
+            request, etag, int(task.updated_at.timestamp()),
+            lambda: Response(TaskSerializer(task).data),
+        )
     def put(self,request,task_id):
         task = self.get_object(task_id,request.user)
         if task is None:
@@ -284,38 +415,212 @@ class TaskDetail(APIView):
         )
     
 
-class ProjectOverview(APIView):
-    def get(self,request, project_id):
+class TaskMove(APIView):
+    """
+    Drag-and-drop reorder: only the moved task's rank is written.
+    URL: POST /api/ver2/tasks/<task_id>/move/
+    Body: {"before": <task id>} or {"after": <task id>}; neither moves the
+    task to the end of its project. List in this order with ?sort=rank.
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self,request,task_id):
         try:
-            project = Project.objects.get(id=project_id)
-        except Project.DoesNotExist:
-            return Response({
-                "detail":"Project not found"
-            }, status=status.HTTP_404_NOT_FOUND)
-        qs = Task.objects.filter(project=project)
-        total_tasks = qs.count()
+            task = Task.objects.get(pk=task_id,project__owner=request.user,project__deleted_at__isnull=True)
+        except Task.DoesNotExist:
+            return Response({"error":"Task not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        serializer = TaskMoveSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors,status=status.HTTP_400_BAD_REQUEST)
+        anchors = {}
+        for key,anchor_id in serializer.validated_data.items():
+            try:
+                anchors[key] = Task.objects.exclude(pk=task.pk).get(pk=anchor_id,project_id=task.project_id)
+            except Task.DoesNotExist:
+                return Response({key:["Not another task of the same project."]},
+                                status=status.HTTP_400_BAD_REQUEST)
+        move_task(task,**anchors)
+        return Response(TaskSerializer(task).data)
+
+
+class ChangeHistoryMixin:
+    """Paginated change history, newest first (?page, ?page_size)."""
+
+    def history_page(self,request,records):
+        try:
+            page = int(request.GET.get("page",1))
+        except ValueError:
+            page = 1
+        try:
+            page_size = min(int(request.GET.get("page_size",50)),500)
+        except ValueError:
+            page_size = 50
+        if page_size <= 0:
+            page_size = 50
+        paginator = EstimatedCountPaginator(records.select_related("user"),page_size)
+        try:
+            page_obj = paginator.page(page)
+        except EmptyPage:
+            page_obj = []
+        return Response({
+            "results":ChangeRecordSerializer(page_obj,many=True).data,
+            "page":page,
+            "page_size":page_size,
+            "total_pages":paginator.num_pages,
+            "total_items":paginator.count,
+            "total_items_estimated":paginator.count_is_estimate,
+        })
 
-        status_counts = qs.values("status").annotate(count=Count("id"))
-        by_status = {item["status"]:item["count"] for item in status_counts}
 
-        for status_value in Task.Status.values:
-            by_status.setdefault(status_value,0)
+class TaskHistory(ChangeHistoryMixin,APIView):
+    """
+    Change history of one task (also after it was deleted).
+    URL: GET /api/ver2/tasks/<task_id>/history/
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
 
-        # count by priority
-        priority_counts = qs.values("priority").annotate(count=Count("id"))
-        by_priority ={item["priority"]:item["count"] for item in priority_counts}
+    def get(self,request,task_id):
+        records = ChangeRecord.objects.filter(
+            object_type=history.TASK,object_id=task_id,
+            project__owner=request.user,project__deleted_at__isnull=True,
+        )
+        return self.history_page(request,records)
 
-        for priority_value in Task.Priority.values:
-            by_priority.setdefault(priority_value,0)
-        
-            data = {
-                "project_id":project.id,
-                "project_name":project.name,
-                "total_tasks":total_tasks,
-                "by_status":by_status,
-                "by_priority":by_priority,
-            }
+
+class ProjectHistory(ChangeHistoryMixin,APIView):
+    """
+    Change history of a project's tasks and BOM rows.
+    URL: GET /api/ver2/projects/<project_id>/history/?type=task|bom
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self,request,project_id):
+        if not Project.objects.filter(pk=project_id,owner=request.user).exists():
+            return Response({"detail":"Project not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        records = ChangeRecord.objects.filter(project_id=project_id)
+        object_type = {"task":history.TASK,"bom":history.BOM}.get(request.GET.get("type"))
+        if object_type is not None:
+            records = records.filter(object_type=object_type)
+        return self.history_page(request,records)
+
+
+class DueTaskList(APIView):
+    """
+    Open tasks of the current user that are overdue or due within
+    ?within=N days (default TASK_DIGEST_DUE_WITHIN_DAYS), most overdue first.
+    URL: GET /api/ver2/tasks/due/
+    Returns the counts plus the first TASK_DIGEST_MAX_TASKS tasks;
+    ?stream=1 (or Accept: application/x-ndjson) streams all of them as NDJSON.
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer]
+
+    def get(self,request):
+        try:
+            within = max(int(request.GET.get("within",settings.TASK_DIGEST_DUE_WITHIN_DAYS)),0)
+        except ValueError:
+            return Response({"detail":"within must be a number of days"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        as_of = timezone.localdate()
+        rows = (due_tasks(as_of,within,owner_id=request.user.pk)
+                .order_by("due_date","id").values_list(*DIGEST_COLUMNS))
+        if wants_stream(request):
+            return ndjson_response(rows,lambda chunk: [format_task(row,as_of) for row in chunk])
+        digest = build_digest(request.user.pk,rows.iterator(),as_of,within,
+                              settings.TASK_DIGEST_MAX_TASKS,timezone.now())
+        return Response(TaskDigestSerializer(digest).data)
+
+
+class TaskDigestList(APIView):
+    """
+    Digests written for the current user by `manage.py task_digest`, newest first.
+    URL: GET /api/ver2/digests/?page=&page_size=
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self,request):
+        try:
+            page = int(request.GET.get("page",1))
+        except ValueError:
+            page = 1
+        try:
+            page_size = min(int(request.GET.get("page_size",10)),100)
+        except ValueError:
+            page_size = 10
+        if page_size <= 0:
+            page_size = 10
+        paginator = Paginator(TaskDigest.objects.filter(user=request.user),page_size)
+        try:
+            page_obj = paginator.page(page)
+        except EmptyPage:
+            page_obj = []
+        return Response({
+            "results":TaskDigestSerializer(page_obj,many=True).data,
+            "page":page,
+            "page_size":page_size,
+            "total_pages":paginator.num_pages,
+            "total_items":paginator.count,
+        })
+
+
+class ProjectOverview(APIView):
+    @condition_on_project()
+    def get(self,request, project_id):
+        # Cached per project generation, bumped on any project/task/BOM write
+        key = f"overview:p{project_id}:g{get_generation('project',project_id)}"
+        data = get_or_compute(key,lambda: project_overview(project_id))
+        if data is None:
+            return Response({
+                "detail":"Project not found"
+            }, status=status.HTTP_404_NOT_FOUND)
         return Response(data)
+
+def project_overview(project_id):
+    """
+    Task counters of one project (total, by status, by priority),
+    archived tasks included. Returns None if the project does not exist.
+    """
+    try:
+        project = Project.objects.get(id=project_id)
+    except Project.DoesNotExist:
+        return None
+    counters = task_counters(Task.objects.filter(project=project))
+    # Archived tasks come from precomputed counts, not the archive table
+    archived = archived_counters(project.id)
+    for key in ("by_status","by_priority"):
+        for value,n in archived[key].items():
+            counters[key][value] = counters[key].get(value,0) + n
+    return {
+        "project_id":project.id,
+        "project_name":project.name,
+        **counters,
+        "total_tasks":counters["total_tasks"] + archived["total_tasks"],
+        "archived_tasks":archived["total_tasks"],
+    }
+
+def task_counters(qs):
+    """
+    total / by_status / by_priority of a task queryset in one query
+    (conditional aggregation instead of one GROUP BY per counter).
+    """
+    aggregates = {"total":Count("id")}
+    for status_value in Task.Status.values:
+        aggregates[f"status_{status_value}"] = Count("id",filter=Q(status=status_value))
+    for priority_value in Task.Priority.values:
+        aggregates[f"priority_{priority_value}"] = Count("id",filter=Q(priority=priority_value))
+    counts = qs.aggregate(**aggregates)
+    return {
+        "total_tasks":counts["total"],
+        "by_status":{value:counts[f"status_{value}"] for value in Task.Status.values},
+        "by_priority":{value:counts[f"priority_{value}"] for value in Task.Priority.values},
+    }
     
 class ProjectBOMList(APIView):
     """
@@ -324,6 +629,8 @@ class ProjectBOMList(APIView):
     """
     authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
     permission_classes = [IsAuthenticated]
+    # Allow "Accept: application/x-ndjson" for the streaming mode of get()
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer]
 
     def get_project(self,project_id,user):
         """
@@ -335,11 +642,12 @@ class ProjectBOMList(APIView):
             return Project.objects.get(pk=project_id, owner=user)
         except Project.DoesNotExist:
             return None
+    @condition_on_project(owned=True)
     def get(self,request,project_id):
         """
-        Helper method:
-        Safely fetch a project that belongs to the current user.
-        Returns None if not found or not owned by user.
+        GET /api/ver2/projects/<project_id>/bom/
+        List all BOM rows of this project.
+        ?stream=1 (or Accept: application/x-ndjson) streams them as NDJSON.
         """
         project = self.get_project(project_id,request.user)
         if project is None:
@@ -348,8 +656,12 @@ class ProjectBOMList(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
         # Use related_name="bom_items" from BOM.project
         qs = project.bom_items.all().order_by("category","model")
-        serializer = BOMSerializer(qs,many=True)
-        return Response(serializer.data)
+        rows = qs.values_list(*BOM_ROWS.columns)
+        # ?stream=1 / Accept: application/x-ndjson -> one BOM row per line
+        if wants_stream(request):
+            return ndjson_response(rows,BOM_ROWS.format)
+        # Same output as BOMSerializer(qs, many=True) without building models
+        return Response(BOM_ROWS.format(rows))
     def post(self,request,project_id):
         """
         POST /api/ver2/projects/<project_id>/bom/
@@ -369,6 +681,259 @@ class ProjectBOMList(APIView):
         return Response(serializer.errors,
                         status=status.HTTP_400_BAD_REQUEST)
     
+class ProjectBOMRollup(APIView):
+    """
+    BOM cost of one project, total and per category, computed in SQL.
+    URL: GET /api/ver2/projects/<project_id>/bom/rollup/
+    Served from the precomputed BOMRollup table when it is enabled;
+    ?live=1 aggregates the BOM rows directly.
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @condition_on_project(owned=True)
+    def get(self,request,project_id):
+        if not Project.objects.filter(pk=project_id,owner=request.user).exists():
+            return Response({"detail": "Project not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        live = request.GET.get("live") in ("1","true") or not settings.BOM_ROLLUP_TABLE
+        if live:
+            by_category = live_rollup(BOM.objects.filter(project_id=project_id),"category")
+        else:
+            by_category = table_rollup(project_id)
+        return Response({
+            "project_id": project_id,
+            "source": "live" if live else "table",
+            "total": BOMCostSerializer(sum_groups(by_category)).data,
+            "by_category": BOMCostSerializer(by_category,many=True).data,
+        })
+
+class BOMRollupView(APIView):
+    """
+    BOM cost across all of the user's projects, grouped in SQL.
+    URL: GET /api/ver2/bom/rollup/?group=model|category|project&page=1&page_size=100
+    Groups are sorted by total cost, most expensive first.
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self,request):
+        group = request.GET.get("group","model")
+        if group not in GROUP_COLUMNS:
+            return Response({"detail": "group must be one of: " + ", ".join(GROUP_COLUMNS)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = int(request.GET.get("page",1))
+        except ValueError:
+            page = 1
+        try:
+            page_size = int(request.GET.get("page_size",100))
+        except ValueError:
+            page_size = 100
+        if page_size <= 0:
+            page_size = 100
+
+        qs = BOM.objects.filter(project__owner=request.user,project__deleted_at__isnull=True)
+        paginator = Paginator(live_rollup(qs,GROUP_COLUMNS[group]),page_size)
+        try:
+            page_obj = paginator.page(page)
+        except EmptyPage:
+            page_obj = []
+        return Response({
+            "group": group,
+            "results": BOMCostSerializer(page_obj,many=True).data,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": paginator.num_pages,
+            "total_items": paginator.count,
+        })
+
+class BOMWhatIfView(APIView):
+    """
+    Evaluate price scenarios against a project's BOM in one vectorized pass.
+    URL: POST /api/ver2/projects/<project_id>/bom/what-if/
+    Body (JSON): {"scenarios": [{"name": "...", "category_pct": {"Mech": 10},
+                  "model_price": {"M-100": 2.5}, "units": 100}, ...]}
+    The response always starts with the unchanged "baseline".
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self,request,project_id):
+        if not Project.objects.filter(pk=project_id,owner=request.user).exists():
+            return Response({"detail": "Project not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        serializer = WhatIfRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors,
+                            status=status.HTTP_400_BAD_REQUEST)
+        # numpy is only needed here; importing it lazily keeps worker boot fast
+        from . import whatif
+
+        # BOM columns are cached until the project's BOM changes
+        columns = whatif.load_columns(project_id)
+        return Response({
+            "project_id": project_id,
+            "lines": columns.size,
+            "results": columns.evaluate(serializer.validated_data["scenarios"]),
+        })
+
+class ProjectBOMLinkList(APIView):
+    """
+    Assembly structure of a project's BOM (parent line contains child line x qty).
+    URL: GET/POST /api/ver2/projects/<project_id>/bom/links/
+    Body (POST): {"parent": <bom id>, "child": <bom id>, "qty": 2}
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_project(self,project_id,user):
+        try:
+            return Project.objects.get(pk=project_id, owner=user)
+        except Project.DoesNotExist:
+            return None
+
+    def get(self,request,project_id):
+        project = self.get_project(project_id,request.user)
+        if project is None:
+            return Response({"detail": "Project not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        serializer = BOMLinkSerializer(project.bom_links.all(),many=True)
+        return Response(serializer.data)
+
+    def post(self,request,project_id):
+        project = self.get_project(project_id,request.user)
+        if project is None:
+            return Response({"detail": "Project not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        serializer = BOMLinkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors,
+                            status=status.HTTP_400_BAD_REQUEST)
+        parent = serializer.validated_data["parent"]
+        child = serializer.validated_data["child"]
+        if parent.project_id != project.id or child.project_id != project.id:
+            return Response({"detail": "parent and child must be BOM lines of this project"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            # Serialize structure edits per project so two concurrent links
+            # can't close a cycle between them
+            Project.objects.select_for_update().filter(pk=project.id).exists()
+            if would_create_cycle(parent.id,child.id):
+                return Response({"detail": "This link would create a cycle"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            link = serializer.save(project=project)
+        return Response(BOMLinkSerializer(link).data,
+                        status=status.HTTP_201_CREATED)
+
+class BOMLinkDetail(APIView):
+    """
+    Delete one assembly link.
+    URL: DELETE /api/ver2/bom/links/<link_id>/
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def delete(self,request,link_id):
+        try:
+            link = BOMLink.objects.get(pk=link_id,project__owner=request.user,project__deleted_at__isnull=True)
+        except BOMLink.DoesNotExist:
+            return Response({"detail": "BOM link not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        link.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class ProjectBOMExplode(APIView):
+    """
+    Flattened multi-level BOM: total quantity and cost of every leaf part
+    over all assembly paths (core.bom_tree).
+    URL: GET /api/ver2/projects/<project_id>/bom/explode/
+    "cycles" > 0 means some links looped and were cut; "truncated" > 0
+    means assemblies nested deeper than MAX_DEPTH were not expanded, so
+    the totals are incomplete.
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @condition_on_project(owned=True)
+    def get(self,request,project_id):
+        if not Project.objects.filter(pk=project_id,owner=request.user).exists():
+            return Response({"detail": "Project not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        leaves, cycles, truncated = explode(project_id)
+        total_cost = sum(line["total_cost"] for line in leaves if line["total_cost"] is not None)
+        return Response({
+            "project_id": project_id,
+            "cycles": cycles,
+            "truncated": truncated,
+            "leaf_count": len(leaves),
+            "total_cost": BOMExplodedLineSerializer().fields["total_cost"].to_representation(total_cost),
+            "leaves": BOMExplodedLineSerializer(leaves,many=True).data,
+        })
+
+class PartSearch(APIView):
+    """
+    "Where is this part used?" across the user's projects.
+    URL: GET /api/ver2/parts/?q=<text>&field=model|description|any&page=1&page_size=50
+         ?mode=text switches from substring matching to full-text search
+         (websearch syntax) over model + description.
+    Substring mode is served by trigram GIN indexes (needs >= 3 characters),
+    text mode by the bom_search_vector index. Rows use the BOM list format.
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+    MIN_QUERY_LENGTH = 3
+
+    def get(self,request):
+        q = (request.GET.get("q") or "").strip()
+        field = request.GET.get("field","any")
+        mode = request.GET.get("mode","substring")
+        if field not in ("model","description","any") or mode not in ("substring","text"):
+            return Response({"detail": "field must be model|description|any and mode substring|text"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(q) < self.MIN_QUERY_LENGTH:
+            return Response({"detail": f"q must be at least {self.MIN_QUERY_LENGTH} characters"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        qs = BOM.objects.filter(project__owner=request.user,project__deleted_at__isnull=True)
+        if mode == "text":
+            qs = qs.annotate(
+                search=SearchVector("model","description",config="simple")
+            ).filter(search=SearchQuery(q,config="simple",search_type="websearch"))
+        elif field == "model":
+            qs = qs.filter(model__icontains=q)
+        elif field == "description":
+            qs = qs.filter(description__icontains=q)
+        else:
+            qs = qs.filter(Q(model__icontains=q) | Q(description__icontains=q))
+
+        try:
+            page = int(request.GET.get("page",1))
+        except ValueError:
+            page = 1
+        try:
+            page_size = int(request.GET.get("page_size",50))
+        except ValueError:
+            page_size = 50
+        if page_size <= 0:
+            page_size = 50
+
+        paginator = Paginator(qs.order_by("project_id","id").values_list(*BOM_ROWS.columns),page_size)
+        try:
+            page_obj = paginator.page(page)
+        except EmptyPage:
+            page_obj = []
+        results = BOM_ROWS.format(page_obj)
+        return Response({
+            "results": results,
+            # distinct projects on this page, for "used in" summaries
+            "project_ids": sorted({row["project"] for row in results}),
+            "page": page,
+            "page_size": page_size,
+            "total_pages": paginator.num_pages,
+            "total_items": paginator.count,
+        })
+
 class BOMItemDetail(APIView):
      
      
@@ -385,7 +950,7 @@ class BOMItemDetail(APIView):
         Returns None if not found or not owned by this user.
         """
          try:
-            return BOM.objects.get(pk=item_id,project__owner=user)
+            return BOM.objects.get(pk=item_id,project__owner=user,project__deleted_at__isnull=True)
          except BOM.DoesNotExist:
              return None
      def get(self, request, item_id):
@@ -415,9 +980,12 @@ class BOMExportView(APIView):
     """
     Export BOM from a single project as an excel file.
     URL: GET /api/ver2/projects/<project_id>/bom/export/
+    ?format=csv or ?format=arrow (or the matching Accept header) streams
+    the rows as CSV or as an Arrow IPC stream instead, with the same columns.
     """
     authentication_classes = [CsrfExemptSessionAuthentication, BasicAuthentication]
     permission_classes =[IsAuthenticated]
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [XLSXRenderer] + bulk_renderers()
 
     def get_project(self, project_id, user):
         try:
@@ -426,11 +994,18 @@ class BOMExportView(APIView):
             return None
         
     def get(self, request, project_id):
+        from .bom_import import COLUMNS,EXPECTED_HEADER
         project = self.get_project(project_id, request.user)
         if project is None:
             return Response({"detail":"Project not found"},
                             status=status.HTTP_404_NOT_FOUND, )
         qs = project.bom_items.all().order_by("category","model")
+        if request.accepted_renderer.format in ("csv","arrow"):
+            return export_response(request.accepted_renderer.format,qs.values_list(*COLUMNS),BOM,
+                                   COLUMNS,EXPECTED_HEADER,f"project_{project.id}_bom")
+
+        # openpyxl is only imported on the Excel code paths (fast worker boot)
+        from openpyxl import Workbook
 
         # 1. Create workbook and sheet
         wb = Workbook()
@@ -438,19 +1013,10 @@ class BOMExportView(APIView):
         ws.title ="BOM"
 
         # 2 Header row - must match your BOM columns
-        headers = ["Category", "Model", "Description", "Qty", "Param1", "Param2", "Price"]
-        ws.append(headers)
+        ws.append(EXPECTED_HEADER)
         # 3) Data rows
-        for item in qs:
-            ws.append([
-                item.category,
-                item.model,
-                item.description,
-                item.qty,
-                item.param1,
-                item.param2,
-                item.price,  # Decimal or None – openpyxl handles it
-            ])
+        for row in qs.values_list(*COLUMNS):
+            ws.append(row)  # Decimal or None price – openpyxl handles it
         
         # 4) Save to in-memory bytes buffer
         buffer = io.BytesIO()
@@ -461,17 +1027,21 @@ class BOMExportView(APIView):
         filename  = f"project_{project.id}_bom.xlsx"
         response = HttpResponse(
             buffer.getvalue(),
-            content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            content_type = XLSXRenderer.media_type,
         )
-        response["content-Disposition"] = f'attachment: filename="{filename}"'
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
         return response
     
 
 class BOMImportView(APIView):
     """
-    Import BOM rows from an uploaded Excel (.xlsx) file into a project.
+    Import BOM rows from uploaded Excel (.xlsx) files into a project.
     URL: POST /api/ver2/projects/<project_id>/bom/import
-    Body: multipart/form-data with a 'file' field.
+    Body: multipart/form-data with one or more 'file' fields: .xlsx, or
+    .csv / .arrow files with the same columns as the exports (BOMExportView).
+    By default the active sheet of each workbook is read; sheets=all (query
+    or form field) reads every sheet. Sheets are parsed in parallel worker
+    processes (core.bom_import) and reported one by one in "sheets".
     """
     authentication_classes =[CsrfExemptSessionAuthentication,BasicAuthentication]
     permission_classes =[IsAuthenticated]
@@ -483,77 +1053,74 @@ class BOMImportView(APIView):
         except Project.DoesNotExist:
             return None
     def post(self, request, project_id):
+        from . import bom_import # lazy: pulls in openpyxl, see BOMExportView
         project = self.get_project(project_id, request.user)
         if project is None:
             return Response(
                 {"detail": "Project not found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        file_obj = request.FILES.get("file")
-        if not file_obj:
+        files = request.FILES.getlist("file")
+        if not files:
             return Response(
                 {"detail":"No file uploaded (expected field name 'file')"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        try:
-            wb = load_workbook(filename=file_obj, data_only=True)
-        except Exception:
-            return Response(
-                {"detail": "Could not read Excel file. Make sure it is a .xlsx file."},
-                 status=status.HTTP_400_BAD_REQUEST
-            )
-        sheet = wb.active
-        # Expect first row to be header:
-        # Category | Model | Description | Qty | Param1 | Param2 | Price
-        rows_iter = list(sheet.iter_rows(values_only=True))
-        if not rows_iter:
-            return Response({"detail": "Excel file is empty"},
+        all_sheets = (request.query_params.get("sheets") or request.data.get("sheets")) == "all"
+        jobs, unreadable = bom_import.build_jobs(files, all_sheets)
+        results = bom_import.run_jobs(jobs) + unreadable
+        # One file, one sheet, nothing usable: keep the plain error message
+        if len(results) == 1 and results[0]["detail"]:
+            return Response({"detail": results[0]["detail"]},
                             status=status.HTTP_400_BAD_REQUEST)
-        # Simple header validation (optional)
-        expected_header = ["Category", "Model", "Description", "Qty", "Param1", "Param2", "Price"]
-        # You can make this case-insensitive if you want; for now we assume exact match.
-        if list(rows_iter[0][:7]) != expected_header:
-            return Response(
-                {
-                    "detail": "Unexpected header row. Expected: "
-                    + " | ".join(expected_header)
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        bom_items = []
-        for row in rows_iter[1:]:
-            if not row or all(v in (None, "", 0) for v in row):
-                continue
-
-            category = str(row[0] or "")
-            model = str(row[1] or "")
-            description = str(row[2] or "")
-            qty = int(row[3] or 1)
-            param1 = str(row[4] or "")
-            param2 = str(row[5] or "")
-            price = row[6] if row[6] is not None else None
-
-            bom_items.append(
-                BOM(
-                    project=project,
-                    category=category,
-                    model=model,
-                    description=description,
-                    qty=qty,
-                    param1=param1,
-                    param2=param2,
-                    price=price,
-                )
-            )
 
-        if not bom_items:
-            return Response({"detail": "No valid BOM rows found"},
+        rows = [row for result in results for row in result["rows"]]
+        sheets = [bom_import.sheet_report(result, len(result["rows"])) for result in results]
+        if not rows:
+            return Response({"detail": "No valid BOM rows found","sheets": sheets},
                             status=status.HTTP_400_BAD_REQUEST)
+        imported = bom_import.merge_rows(project, rows)
 
-        # Bulk insert
-        BOM.objects.bulk_create(bom_items)
+        return Response({"imported": imported,"sheets": sheets},
+                        status=status.HTTP_201_CREATED)
 
-        return Response({"imported": len(bom_items)},
+class TaskImportView(APIView):
+    """
+    Import tasks into a project from a task list export.
+    URL: POST /api/ver2/projects/<project_id>/tasks/import/
+    Body: multipart/form-data with one 'file' field, a .csv or .arrow file
+    with the columns of GET /api/ver2/tasks/?format=csv|arrow. title,
+    priority, status and due_date are read; ids, timestamps and ranks are
+    not, and the tasks are appended to the end of the board.
+    """
+    authentication_classes =[CsrfExemptSessionAuthentication,BasicAuthentication]
+    permission_classes =[IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, project_id):
+        from . import bom_import
+        try:
+            project = Project.objects.get(pk=project_id,owner=request.user)
+        except Project.DoesNotExist:
+            return Response({"detail": "Project not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        file_obj = request.FILES.get("file")
+        if file_obj is None:
+            return Response({"detail":"No file uploaded (expected field name 'file')"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        source = (file_obj.temporary_file_path() if hasattr(file_obj,"temporary_file_path")
+                  else file_obj.read())
+        result = bom_import.parse_tasks(source,file_obj.name)
+        if result["detail"]:
+            return Response({"detail": result["detail"]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not result["rows"]:
+            return Response({"detail": "No valid task rows found","skipped": result["skipped"],
+                             "errors": result["errors"]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        imported = bom_import.merge_tasks(project,result["rows"])
+        return Response({"imported": imported,"skipped": result["skipped"],
+                         "errors": result["errors"]},
                         status=status.HTTP_201_CREATED)
 
 class LoginView(APIView):
@@ -608,63 +1175,111 @@ class CurrenUserView(APIView):
                 "username": user.username,
                 "is_authenticated": True,
         },status=status.HTTP_200_OK )
-    
-
-
-
-
-
-
-
-
-
-
-     
-         
-         
-    
-         
-             
-     
-     
-
-        
-            
-
-
-    
-    
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
 
 
+class ResponseCacheStats(APIView):
+    """
+    Hit / miss counters of the response cache (staff only).
+    URL: GET /api/ver2/cache/stats/
+    """
+    authentication_classes=[CsrfExemptSessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAdminUser]
 
+    def get(self,request):
+        return Response(get_stats())
 
 
+class CompressionStats(APIView):
+    """
+    Bytes in / out and CPU time per codec of this worker's compressed
+    responses (staff only).
+    URL: GET /api/ver2/compression/stats/
+    """
+    authentication_classes=[CsrfExemptSessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAdminUser]
 
+    def get(self,request):
+        from .compression import stats
+        return Response(stats.snapshot())
 
 
+class DashboardBootstrap(APIView):
+    """
+    Everything the dashboard needs on load, in one request.
+    URL: GET /api/ver2/bootstrap/?project=<id>&sections=user,projects,overview,tasks
+
+    - user:     current user (no extra query)
+    - projects: id / name / description of the user's projects (1 query,
+                also used to check ownership of the active project)
+    - overview: task counters of the active project (cached, 3 queries on a miss)
+    - tasks:    first page of the active project's tasks, in TaskList's
+                default order (1 query); ?page_size=, at most MAX_PAGE_SIZE
+
+    The active project is ?project=<id>, or the first project by name.
+    ?sections=... limits the response to some sections for partial refreshes.
+    """
+    authentication_classes=[CsrfExemptSessionAuthentication, BasicAuthentication]
+    permission_classes = [AllowAny]
+    SECTIONS = ("user","projects","overview","tasks")
+    MAX_PAGE_SIZE = 200
 
+    def get(self,request):
+        user = request.user
+        if not user.is_authenticated:
+            return Response({"user":{"is_authenticated": False}})
 
+        sections = request.GET.get("sections")
+        sections = set(sections.split(",")) if sections else set(self.SECTIONS)
+        try:
+            page_size = min(int(request.GET.get("page_size",50)),self.MAX_PAGE_SIZE)
+        except ValueError:
+            page_size = 50
+        if page_size <= 0:
+            page_size = 50
+        data = {}
 
+        if "user" in sections:
+            data["user"] = {
+                "id": user.id,
+                "username": user.username,
+                "is_authenticated": True,
+            }
 
-    
+        try:
+            project_id = int(request.GET["project"]) if request.GET.get("project") else None
+        except ValueError:
+            return Response({"detail":"project must be an integer"},
+                            status=status.HTTP_400_BAD_REQUEST)
 
+        owned_ids = None
+        if "projects" in sections:
+            projects = list(
+                Project.objects.filter(owner=user).order_by("name")
+                .values("id","name","description")
+            )
+            data["projects"] = projects
+            owned_ids = [p["id"] for p in projects]
+
+        if not sections & {"overview","tasks"}:
+            return Response(data)
+        if owned_ids is None:
+            owned_ids = list(Project.objects.filter(owner=user).order_by("name")
+                             .values_list("id",flat=True))
+        if project_id is None and owned_ids:
+            project_id = owned_ids[0]
+        elif project_id is not None and project_id not in owned_ids:
+            return Response({"detail":"Project not found"},
+                            status=status.HTTP_404_NOT_FOUND)
+        data["active_project"] = project_id
+        if project_id is None:
+            return Response(data)
+
+        if "overview" in sections:
+            key = f"overview:p{project_id}:g{get_generation('project',project_id)}"
+            overview = get_or_compute(key,lambda: project_overview(project_id))
+            data["overview"] = overview
+        if "tasks" in sections:
+            rows = (Task.objects.filter(project_id=project_id)
+                    .order_by(*TaskList.DEFAULT_ORDER).values_list(*TASK_ROWS.columns)[:page_size])
+            data["tasks"] = {"results":TASK_ROWS.format(rows),"page":1,"page_size":page_size}
+        return Response(data)
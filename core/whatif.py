@@ -0,0 +1,227 @@
+"""
+Vectorized BOM what-if costing.
+
+A project's BOM is loaded once into NumPy column arrays and a whole batch
+of price scenarios is evaluated as one (scenarios x rows) matrix.
+
+Money is integer thousandths (the 3 decimal places of BOM.price) in
+int64, never float: baseline totals match BOMRollup / the Decimal rollup
+to the last digit. A scenario's percent change is applied as parts per
+million of the price and the new unit price rounded half up to 3 places,
+like Decimal.quantize(ROUND_HALF_UP). Should a block's worst case not fit
+in int64, it is evaluated with Python integers instead (slower, exact).
+
+Columns are cached per process, keyed by the project's "bom" generation
+(core.response_cache), which only BOM writes bump; the cache holds one
+entry per project and at most WHATIF_CACHE_BYTES of arrays.
+
+Scenario fields:
+    name            label echoed back
+    category_pct    {"Mechanical": 10, ...}  percent price change per category
+    model_price     {"M-100": 2.5, ...}      absolute price per model; replaces
+                                             the row price, category_pct is not
+                                             applied on top of it
+    units           number of units built (multiplies every qty), default 1
+
+Rows without a price stay at zero cost unless a model_price covers them.
+Costs are returned as decimal strings with 3 places, like /bom/rollup/.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from django.conf import settings
+
+from .models import BOM
+from .response_cache import get_generation
+
+# Max scenario x row cells evaluated at once; bounds temporary memory to
+# a few tens of MB whatever the BOM size.
+MAX_CELLS_PER_BLOCK = 4_000_000
+
+SCALE = 1000  # money in thousandths
+PPM = 1_000_000  # percent factors in parts per million
+INT64_MAX = np.iinfo(np.int64).max
+
+
+def _milli(value):
+    """Decimal / float / None price -> int thousandths (half up)."""
+    if value is None:
+        return 0
+    return int(Decimal(str(value)).quantize(Decimal("0.001"), rounding=ROUND_HALF_UP) * SCALE)
+
+
+def _money(milli):
+    # Same rendering as the DecimalField(decimal_places=3) serializers
+    milli = int(milli)
+    sign = "-" if milli < 0 else ""
+    whole, frac = divmod(abs(milli), SCALE)
+    return f"{sign}{whole}.{frac:03d}"
+
+
+def _round_div(values, divisor):
+    """values / divisor rounded half away from zero, for int64 or object arrays."""
+    half = divisor // 2
+    return np.where(values >= 0, (values + half) // divisor, -((half - values) // divisor))
+
+
+class BOMColumns:
+    def __init__(self, rows):
+        categories, models, qty, price = zip(*rows) if rows else ((), (), (), ())
+        self.size = len(qty)
+        self.categories, cat_codes = np.unique(np.array(categories, dtype=object), return_inverse=True)
+        self.models, model_codes = np.unique(np.array(models, dtype=object), return_inverse=True)
+        self.category_index = {c: i for i, c in enumerate(self.categories)}
+        self.model_index = {m: i for i, m in enumerate(self.models)}
+
+        # Group rows by category so each category is one contiguous slice
+        # and per-category sums are a single np.add.reduceat
+        order = np.argsort(cat_codes, kind="stable")
+        self.cat_codes = cat_codes[order].astype(np.intp)
+        self.model_codes = model_codes[order].astype(np.intp)
+        self.qty = np.asarray(qty, dtype=np.int64)[order]
+        self.price = np.array([_milli(p) for p in price], dtype=np.int64)[order]
+        self.cat_starts = np.flatnonzero(np.r_[True, self.cat_codes[1:] != self.cat_codes[:-1]])[:len(self.categories)]
+        # Bounds for the int64 overflow check
+        self.max_price = int(np.abs(self.price).max()) if self.size else 0
+        self.total_qty = int(self.qty.sum())
+
+    @property
+    def nbytes(self):
+        """Approximate memory held, for the cache budget."""
+        arrays = (self.cat_codes, self.model_codes, self.qty, self.price, self.cat_starts,
+                  self.categories, self.models)
+        strings = sum(sys.getsizeof(s) for s in self.categories) + sum(sys.getsizeof(s) for s in self.models)
+        # The labels are also keys of the two index dicts
+        return sum(a.nbytes for a in arrays) + 2 * strings
+
+    def evaluate(self, scenarios):
+        """
+        Return [{"name", "units", "total_cost", "by_category"}]: the
+        unchanged "baseline" first, then the scenarios in order. Unnamed
+        scenarios are called "scenario <n>", numbered from 1.
+        """
+        scenarios = [{"name": "baseline"}] + list(scenarios)
+        results = []
+        block = max(1, MAX_CELLS_PER_BLOCK // max(self.size, 1))
+        for start in range(0, len(scenarios), block):
+            results.extend(self._evaluate_block(scenarios[start:start + block], start))
+        return results
+
+    def _evaluate_block(self, scenarios, offset):
+        # offset: index of scenarios[0] in the full list, where the
+        # baseline is 0, so it is also the number of the first scenario
+        n_scen = len(scenarios)
+        factor = [[PPM] * len(self.categories) for _ in range(n_scen)]
+        override = [[-1] * len(self.models) for _ in range(n_scen)]
+        units = [1] * n_scen
+        for s, scenario in enumerate(scenarios):
+            for category, pct in scenario.get("category_pct", {}).items():
+                if category in self.category_index:
+                    factor[s][self.category_index[category]] = PPM + round(pct * (PPM // 100))
+            for model, price in scenario.get("model_price", {}).items():
+                if model in self.model_index:
+                    override[s][self.model_index[model]] = _milli(price)
+            units[s] = scenario.get("units", 1)
+
+        # Largest |unit price| and |cost sum| this block can produce
+        max_factor = max((max(row) for row in factor if row), default=PPM)
+        max_override = max((max(row) for row in override if row), default=0)
+        unit_bound = max(self.max_price * max_factor // PPM + 1, max_override)
+        fits = (self.max_price * max_factor <= INT64_MAX
+                and unit_bound * self.total_qty * max(units) <= INT64_MAX)
+        dtype = np.int64 if fits else object
+
+        factor = np.array(factor, dtype=dtype).reshape(n_scen, len(self.categories))
+        override = np.array(override, dtype=dtype).reshape(n_scen, len(self.models))
+        units = np.array(units, dtype=dtype)
+        price_col, qty_col = self.price.astype(dtype), self.qty.astype(dtype)
+
+        # (scenarios x rows) effective unit price in thousandths
+        row_override = override[:, self.model_codes]
+        scaled = _round_div(price_col * factor[:, self.cat_codes], PPM)
+        price = np.where(row_override >= 0, row_override, scaled)
+        cost = price * qty_col * units[:, None]
+
+        if self.size:
+            by_category = np.add.reduceat(cost, self.cat_starts, axis=1)
+        else:
+            by_category = np.zeros((n_scen, 0), dtype=dtype)
+        totals = by_category.sum(axis=1)
+
+        return [
+            {
+                "name": scenario.get("name", f"scenario {offset + s}"),
+                "units": int(units[s]),
+                "total_cost": _money(totals[s]),
+                "by_category": {
+                    str(category): _money(value)
+                    for category, value in zip(self.categories, by_category[s])
+                },
+            }
+            for s, scenario in enumerate(scenarios)
+        ]
+
+
+class ColumnCache:
+    """
+    project_id -> (generation, BOMColumns), least recently used first.
+    A newer generation replaces the project's entry; old entries are
+    evicted once the total exceeds settings.WHATIF_CACHE_BYTES.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def get(self, project_id, generation):
+        with self.lock:
+            entry = self.entries.get(project_id)
+            if entry is None or entry[0] != generation:
+                return None
+            self.entries.move_to_end(project_id)
+            return entry[1]
+
+    def put(self, project_id, generation, columns):
+        limit = settings.WHATIF_CACHE_BYTES
+        with self.lock:
+            old = self.entries.pop(project_id, None)
+            if old is not None:
+                self.total -= old[1].nbytes
+            if columns.nbytes > limit:
+                return
+            self.entries[project_id] = (generation, columns)
+            self.total += columns.nbytes
+            while self.total > limit:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.total -= evicted.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total = 0
+
+
+_cache = ColumnCache()
+
+
+def load_columns(project_id):
+    """
+    Columns of one project's BOM, from the cache while the project's "bom"
+    generation is unchanged. The generation is read before the rows, so a
+    concurrent write can only make the cached entry newer than its key.
+    """
+    generation = get_generation("bom", project_id)
+    columns = _cache.get(project_id, generation)
+    if columns is None:
+        rows = list(
+            BOM.objects.filter(project_id=project_id)
+            .order_by()
+            .values_list("category", "model", "qty", "price")
+        )
+        columns = BOMColumns(rows)
+        _cache.put(project_id, generation, columns)
+    return columns